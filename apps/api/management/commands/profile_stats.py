@@ -0,0 +1,67 @@
+import json
+import pathlib
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregates the profiles written by ProfilingMiddleware and prints the "
+        "top functions across all of them. See apps.api.middleware"
+    )
+
+    SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=settings.PROFILING_DIR)
+        parser.add_argument("--limit", type=int, default=30)
+        parser.add_argument("--sort", choices=self.SORT_KEYS, default="cumulative")
+        parser.add_argument(
+            "--path", default=None, help="Only profiles of paths containing this."
+        )
+        parser.add_argument(
+            "--min-duration",
+            type=float,
+            default=0,
+            help="Only profiles of requests slower than this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+
+        directory = pathlib.Path(options["dir"])
+
+        profiles = []
+        for profile in sorted(directory.glob("*.prof")):
+
+            try:
+                metadata = json.loads(profile.with_suffix(".json").read_text())
+            except (FileNotFoundError, ValueError):
+                metadata = {}
+
+            if options["path"] and options["path"] not in metadata.get("path", ""):
+                continue
+
+            if metadata.get("duration_ms", 0) < options["min_duration"]:
+                continue
+
+            profiles.append((profile, metadata))
+
+        if not profiles:
+            raise CommandError(f"No matching profiles in {directory}.")
+
+        stats = pstats.Stats(str(profiles[0][0]), stream=self.stdout)
+        for profile, _ in profiles[1:]:
+            stats.add(str(profile))
+
+        durations = sorted(m["duration_ms"] for _, m in profiles if "duration_ms" in m)
+
+        self.stdout.write(f"{len(profiles)} profiles from {directory}.")
+        if durations:
+            self.stdout.write(
+                f"Request duration: median {durations[len(durations) // 2]}ms "
+                f"max {durations[-1]}ms."
+            )
+
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
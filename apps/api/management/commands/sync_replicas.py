@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ...replicas import get_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database into each SQLite replica in "
+        "REPLICA_DATABASES, once or every --every seconds to mimic replication "
+        "lag locally. See apps.api.replicas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=None,
+            help="Keep copying every this many seconds until interrupted.",
+        )
+
+    def handle(self, *args, **options):
+
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError("No REPLICA_DATABASES are configured.")
+
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(
+                    f"'{alias}' is not SQLite. Replicate other databases with "
+                    "their own replication."
+                )
+
+        while True:
+
+            for alias in replicas:
+                self.copy(alias)
+
+            self.stdout.write(f"Copied {DEFAULT_DB_ALIAS} to {', '.join(replicas)}.")
+
+            if options["every"] is None:
+                break
+
+            time.sleep(options["every"])
+
+    def copy(self, alias):
+
+        # The replica is overwritten underneath any connection Django holds.
+        connections[alias].close()
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+
+        replica = sqlite3.connect(connections[alias].settings_dict["NAME"])
+        try:
+            primary.connection.backup(replica)
+        finally:
+            replica.close()
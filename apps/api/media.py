@@ -0,0 +1,187 @@
+""" Serves user media after the view has checked access to it.
+
+settings.MEDIA_SERVING picks who sends the bytes:
+
+    "x-accel-redirect"  nginx, from an internal location mapping
+                        settings.MEDIA_ACCEL_PREFIX to MEDIA_ROOT:
+
+                            location /protected-media/ {
+                                internal;
+                                alias /path/to/media/;
+                            }
+
+    "x-sendfile"        Apache with mod_xsendfile or lighttpd.
+
+    "python"            This process, as a FileResponse. Single byte ranges are
+                        answered with 206 so audio and video can seek without
+                        downloading the whole file, and an ETag lets clients
+                        revalidate with If-None-Match. Under gunicorn the file
+                        is sent with sendfile(2), without copying it through
+                        Python, for whole files and ranges alike.
+
+The proxies handle Range and ETags themselves. """
+
+import mimetypes
+import os
+import re
+import urllib.parse
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, quote_etag
+
+
+_re_range = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """ A file that reads no further than `length` bytes from `start`. The
+    underlying file is left positioned at `start` so a WSGI server's sendfile
+    begins there and sends Content-Length bytes. """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_media(request, path, name):
+    """ Returns a response sending the file at `path`, stored as `name` under
+    MEDIA_ROOT. """
+
+    mode = getattr(settings, "MEDIA_SERVING", "python")
+
+    if mode == "x-accel-redirect":
+        response = HttpResponse()
+        location = settings.MEDIA_ACCEL_PREFIX + urllib.parse.quote(name)
+        response["X-Accel-Redirect"] = location
+    elif mode == "x-sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = str(path)
+    else:
+        return serve_file(request, path)
+
+    # The proxy fills in the rest.
+    content_type, encoding = mimetypes.guess_type(str(path))
+    response["Content-Type"] = content_type or "application/octet-stream"
+    set_disposition(response, path)
+
+    return response
+
+
+def serve_file(request, path):
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{size:x}")
+    last_modified = http_date(stat.st_mtime)
+
+    def set_validators(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        response["Accept-Ranges"] = "bytes"
+        response["Cache-Control"] = "private, no-cache"
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        response = HttpResponseNotModified()
+        set_validators(response)
+        return response
+
+    byte_range = None
+
+    # A Range is ignored if the file changed since If-Range was taken.
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range is None or if_range in (etag, last_modified):
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        set_validators(response)
+        return response
+
+    file = open(path, "rb")
+
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206)
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    set_validators(response)
+    set_disposition(response, path)
+
+    return response
+
+
+def parse_range(header, size):
+    """ Returns the (first, last) byte positions of a single byte range,
+    "unsatisfiable", or None to send the whole file e.g. when there is no
+    Range or it asks for several ranges. """
+
+    if not header:
+        return None
+
+    match = _re_range.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+
+    if not first and not last:
+        return None
+
+    if size == 0:
+        return "unsatisfiable"
+
+    if not first:
+        # The final `last` bytes.
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+
+    if last and first > int(last):
+        return None
+
+    if first >= size:
+        return "unsatisfiable"
+
+    last = int(last) if last else size - 1
+
+    return first, min(last, size - 1)
+
+
+def set_disposition(response, path):
+
+    filename = os.path.basename(path)
+
+    if filename.isascii() and '"' not in filename and "\\" not in filename:
+        value = f'inline; filename="{filename}"'
+    else:
+        value = f"inline; filename*=utf-8''{urllib.parse.quote(filename)}"
+
+    response["Content-Disposition"] = value
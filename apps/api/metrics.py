@@ -0,0 +1,396 @@
+""" A minimal, dependency-free metrics registry rendered in the Prometheus text
+exposition format. See apps.api.views.MetricsView
+
+Each process records into its own in-memory registry. With several worker
+processes e.g. under gunicorn, settings.METRICS_DIR names a directory shared by
+all of them. Each process periodically writes a snapshot of its registry to
+<METRICS_DIR>/<pid>.json and a scrape, served by any one worker, sums the
+snapshots of every process. Counters and histograms of exited workers are kept
+so totals never go backwards. Gauges are only read from live processes.
+
+As each worker exits its snapshot is folded into <METRICS_DIR>/exited.json, so
+the directory holds one file per live worker however often workers are
+recycled, and a reused pid starts from zero. See Registry.fold() The directory
+should be emptied whenever the server is (re)started. """
+
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Registry:
+
+    FLUSH_INTERVAL = 1.0
+    EXITED = "exited"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.callbacks = {}
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.flushed = 0.0
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self.metrics[name] = {"kind": kind, "help": help_text, "buckets": buckets}
+
+    def register_gauge(self, name, help_text, callback):
+        """ Registers a gauge computed on scrape by `callback`, returning a
+        number or a list of (labels, number). Read by the scraping process
+        only, so suitable for values shared between processes e.g. a count of
+        database rows. """
+
+        self.describe(name, "gauge", help_text)
+        self.callbacks[name] = callback
+
+    def inc(self, name, labels=None, value=1):
+        key = _key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, labels=None, value=0):
+        with self.lock:
+            self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name, value, labels=None):
+
+        buckets = self.metrics[name]["buckets"]
+        key = _key(labels)
+
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = {"buckets": [0] * len(buckets), "sum": 0, "count": 0}
+            histogram = series[key]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    # Multiple processes ------------------------------------------------------
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(self._dump())
+
+    def _dump(self):
+        """ Returns the registry as JSON. The caller holds the lock. """
+
+        return json.dumps(
+            {
+                "counters": self.counters,
+                "histograms": self.histograms,
+                "gauges": self.gauges,
+            }
+        )
+
+    def flush(self, force=False):
+        """ Writes this process's snapshot to METRICS_DIR at most once per
+        FLUSH_INTERVAL unless forced. Threads of one process flush in turn.
+        Failing to write is logged rather than raised, as this runs at the
+        end of every request. See apps.api.middleware.MetricsMiddleware """
+
+        directory = get_directory()
+        if directory is None:
+            return
+
+        with self.lock:
+
+            now = time.monotonic()
+            if not force and now - self.flushed < self.FLUSH_INTERVAL:
+                return
+            self.flushed = now
+
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                _write(directory / f"{os.getpid()}.json", self._dump())
+            except OSError:
+                logger.exception("Failed to write metrics to %s.", directory)
+
+    def fold(self, pid):
+        """ Adds the counters and histograms of the exited process `pid` to
+        exited.json and removes its snapshot. Its gauges are dropped. Called by
+        the gunicorn master as each worker exits. See gunicorn.conf.py """
+
+        directory = get_directory()
+        if directory is None:
+            return
+
+        path = directory / f"{pid}.json"
+        exited_path = directory / f"{self.EXITED}.json"
+
+        # Scrapes never see the snapshot both folded and still there.
+        with _lock(directory, fcntl.LOCK_EX):
+
+            try:
+                snapshot = json.loads(path.read_text())
+            except (ValueError, OSError):
+                snapshot = None
+
+            if snapshot is not None:
+
+                try:
+                    exited = json.loads(exited_path.read_text())
+                except (ValueError, OSError):
+                    exited = {"counters": {}, "histograms": {}, "gauges": {}}
+
+                _merge(exited, snapshot)
+                _write(exited_path, exited)
+
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def collect(self):
+        """ Returns (pid, snapshot) of every process, this one included. The
+        folded snapshot of exited processes has a pid of None. """
+
+        directory = get_directory()
+        if directory is None:
+            return [(os.getpid(), self.snapshot())]
+
+        self.flush(force=True)
+
+        snapshots = []
+
+        with _lock(directory, fcntl.LOCK_SH):
+            for path in directory.glob("*.json"):
+
+                pid = None if path.stem == self.EXITED else path.stem
+
+                try:
+                    pid = int(pid) if pid is not None else None
+                    snapshots.append((pid, json.loads(path.read_text())))
+                except (ValueError, OSError):
+                    # A partially written file or a file removed mid-scrape.
+                    continue
+
+        return snapshots
+
+    # Exposition --------------------------------------------------------------
+
+    def render(self):
+        """ Returns every metric in the Prometheus text format. """
+
+        totals = {"counters": {}, "histograms": {}}
+        counters = totals["counters"]
+        histograms = totals["histograms"]
+        gauges = {}
+
+        for pid, snapshot in self.collect():
+
+            _merge(totals, snapshot)
+
+            if pid is not None and _is_alive(pid):
+                for name, series in snapshot["gauges"].items():
+                    values = gauges.setdefault(name, {})
+                    for key, value in series.items():
+                        values[key] = values.get(key, 0) + value
+
+        for name, callback in self.callbacks.items():
+            value = callback()
+            if not isinstance(value, list):
+                value = [(None, value)]
+            gauges[name] = {_key(labels): number for labels, number in value}
+
+        lines = []
+
+        for name, meta in sorted(self.metrics.items()):
+
+            lines.append(f"# HELP {name} {meta['help']}")
+            lines.append(f"# TYPE {name} {meta['kind']}")
+
+            if meta["kind"] == "counter":
+                for key, value in sorted(counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+
+            elif meta["kind"] == "gauge":
+                for key, value in sorted(gauges.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+
+            elif meta["kind"] == "histogram":
+                for key, histogram in sorted(histograms.get(name, {}).items()):
+                    for bound, count in zip(meta["buckets"], histogram["buckets"]):
+                        labels = _labels(key, le=_number(bound))
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _labels(key, le="+Inf")
+                    lines.append(f"{name}_bucket{labels} {histogram['count']}")
+                    lines.append(
+                        f"{name}_sum{_labels(key)} {_number(histogram['sum'])}"
+                    )
+                    lines.append(f"{name}_count{_labels(key)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def get_directory():
+    directory = getattr(settings, "METRICS_DIR", None)
+    return pathlib.Path(directory) if directory else None
+
+
+def _merge(totals, snapshot):
+    """ Adds the counters and histograms of `snapshot` to `totals`. """
+
+    for name, series in snapshot["counters"].items():
+        counters = totals["counters"].setdefault(name, {})
+        for key, value in series.items():
+            counters[key] = counters.get(key, 0) + value
+
+    for name, series in snapshot["histograms"].items():
+        histograms = totals["histograms"].setdefault(name, {})
+        for key, histogram in series.items():
+            if key not in histograms:
+                histograms[key] = {
+                    "buckets": [0] * len(histogram["buckets"]),
+                    "sum": 0,
+                    "count": 0,
+                }
+            total = histograms[key]
+            for index, count in enumerate(histogram["buckets"]):
+                total["buckets"][index] += count
+            total["sum"] += histogram["sum"]
+            total["count"] += histogram["count"]
+
+
+def _write(path, snapshot):
+    """ Replaces `path` atomically so readers never see a partial file.
+    `snapshot` is a dict or its JSON. Each write has its own temporary file,
+    named <name>.<random>.tmp so scrapes never collect it. """
+
+    if not isinstance(snapshot, str):
+        snapshot = json.dumps(snapshot)
+
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(snapshot)
+        os.replace(temp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+        raise
+
+
+@contextlib.contextmanager
+def _lock(directory, operation):
+
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with open(directory / ".lock", "a") as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _key(labels):
+    """ Labels as a hashable, JSON-serializable key. """
+    return json.dumps(sorted((labels or {}).items()))
+
+
+def _labels(key, **extra):
+
+    pairs = json.loads(key) + list(extra.items())
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value):
+    value = str(value)
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _is_alive(pid):
+
+    if pid == os.getpid():
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+registry = Registry()
+
+registry.describe(
+    "hlts_http_requests_total",
+    "counter",
+    "Requests by view, action, method and status.",
+)
+registry.describe(
+    "hlts_http_request_duration_seconds",
+    "histogram",
+    "Request latency by view and action.",
+    buckets=LATENCY_BUCKETS,
+)
+registry.describe(
+    "hlts_http_response_size_bytes",
+    "histogram",
+    "Response body size by view and action.",
+    buckets=SIZE_BUCKETS,
+)
+registry.describe(
+    "hlts_http_request_queries",
+    "histogram",
+    "Database queries per request by view and action.",
+    buckets=QUERY_BUCKETS,
+)
+registry.describe(
+    "hlts_cache_requests_total",
+    "counter",
+    "Cache lookups by cache and result i.e. hit or miss.",
+)
+registry.describe(
+    "hlts_worker_busy_seconds_total",
+    "counter",
+    "Seconds spent handling requests, summed over workers. Divided by the "
+    "number of workers, its rate is the worker pool utilization.",
+)
+registry.describe(
+    "hlts_worker_requests_in_flight",
+    "gauge",
+    "Requests being handled, summed over live workers.",
+)
+registry.describe("hlts_workers", "gauge", "Live worker processes.")
+
+
+def cache_lookup(cache, hit):
+    """ Records a cache hit or miss. The hit ratio is
+    rate(hlts_cache_requests_total{result="hit"}) / rate(hlts_cache_requests_total) """
+    result = "hit" if hit else "miss"
+    registry.inc("hlts_cache_requests_total", {"cache": cache, "result": result})
@@ -0,0 +1,331 @@
+import contextlib
+import cProfile
+import importlib
+import json
+import logging
+import pathlib
+import random
+import re
+import threading
+import time
+import types
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework import exceptions
+
+from ..users.authentication import CachedJSONWebTokenAuthentication
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """ Query count, query time and render time of a single request. """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.view = None
+        self.action = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """ A database execute wrapper. See
+        https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/ """
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def set_view(self, request, view_func):
+
+        view = getattr(view_func, "cls", None)
+        self.view = view.__name__ if view else view_func.__name__
+
+        # ViewSets are routed with a map of HTTP method to action name i.e.
+        # {"get": "list", "post": "create"}.
+        actions = getattr(view_func, "actions", None)
+        if actions:
+            self.action = actions.get(request.method.lower())
+
+    @contextlib.contextmanager
+    def wrap_connections(self):
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+
+class ServerTimingMiddleware:
+    """ Counts and times every query of a request and times rendering of the
+    response. Both are sent back as 'Server-Timing' and 'X-Query-Count'
+    headers and logged as a single line per request.
+
+        Server-Timing: db;dur=12.1;desc="31 queries", render;dur=3.4, total;dur=20.9
+        X-Query-Count: 31
+
+    Enabled with settings.SERVER_TIMING. When disabled the middleware removes
+    itself from the chain on startup so it costs nothing. """
+
+    def __init__(self, get_response):
+
+        if not getattr(settings, "SERVER_TIMING", False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        timing = RequestTiming()
+        request.timing = timing
+
+        with timing.wrap_connections():
+            response = self.get_response(request)
+
+        total = timing.total
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timing.db * 1000:.1f};desc="{timing.queries} queries"',
+                f"render;dur={timing.render * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        response["X-Query-Count"] = str(timing.queries)
+
+        logger.info(
+            "method=%s path=%s status=%s view=%s action=%s queries=%d "
+            "db_ms=%.1f render_ms=%.1f total_ms=%.1f",
+            request.method,
+            request.path,
+            response.status_code,
+            timing.view,
+            timing.action,
+            timing.queries,
+            timing.db * 1000,
+            timing.render * 1000,
+            total * 1000,
+        )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.set_view(request, view_func)
+
+    def process_template_response(self, request, response):
+        """ DRF Responses are rendered after every process_template_response()
+        hook has run. The render time is measured from the last hook to the
+        end of the post-render callbacks. """
+
+        timing = request.timing
+        start = time.perf_counter()
+
+        def measure(response):
+            timing.render += time.perf_counter() - start
+
+        response.add_post_render_callback(measure)
+
+        return response
+
+
+class ProfilingMiddleware:
+    """ Profiles a sample of requests with cProfile and writes each profile to
+    PROFILING_DIR as a .prof file, loadable with pstats or snakeviz, next to a
+    .json file of the request's metadata. Only the newest PROFILING_MAX_FILES
+    profiles are kept. See apps.api.management.commands.profile_stats
+
+    A request is profiled if it is sampled at PROFILING_SAMPLE_RATE, a
+    fraction between 0 and 1, or carries an 'X-Profile: 1' header and is made
+    by a staff user. The user of a request with the header is resolved before
+    the profiler starts, so other clients cannot slow requests down with it.
+
+    Enabled with settings.PROFILING. When disabled the middleware removes
+    itself from the chain on startup so it costs nothing. """
+
+    HEADER = "HTTP_X_PROFILE"
+
+    _re_unsafe = re.compile(r"[^\w-]+")
+
+    def __init__(self, get_response):
+
+        if not getattr(settings, "PROFILING", False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.directory = pathlib.Path(settings.PROFILING_DIR)
+        self.max_files = settings.PROFILING_MAX_FILES
+
+    def __call__(self, request):
+
+        sampled = random.random() < self.sample_rate
+        requested = request.META.get(self.HEADER) == "1"
+
+        if requested and not sampled:
+            user = self.get_user(request)
+            requested = bool(user and user.is_staff)
+
+        if not sampled and not requested:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        duration = time.perf_counter() - start
+
+        # DRF sets the authenticated user on the underlying HttpRequest.
+        user = getattr(request, "user", None)
+
+        self.dump(profiler, request, response, duration, user)
+
+        return response
+
+    def get_user(self, request):
+        """ Returns the user of a JSON Web Token or of the session cookie, or
+        None. Runs ahead of AuthenticationMiddleware and the view. A token's
+        user is cached for the view to reuse. See apps.users.authentication """
+
+        try:
+            result = CachedJSONWebTokenAuthentication().authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+
+        if result is not None:
+            return result[0]
+
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not session_key:
+            return None
+
+        engine = importlib.import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore(session_key)
+
+        user = auth.get_user(types.SimpleNamespace(session=session))
+
+        return user if user.is_authenticated else None
+
+    def dump(self, profiler, request, response, duration, user):
+
+        now = timezone.now()
+
+        path = self._re_unsafe.sub("-", request.path).strip("-") or "root"
+        name = f"{now:%Y%m%dT%H%M%S%f}-{request.method}-{path}"[:160]
+
+        metadata = {
+            "date": now.isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "query": request.META.get("QUERY_STRING", ""),
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "user": str(user.pk) if user and user.is_authenticated else None,
+        }
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(self.directory / f"{name}.prof")
+            (self.directory / f"{name}.json").write_text(json.dumps(metadata))
+            self.rotate()
+        except OSError:
+            logger.exception("Failed to write profile %s.", name)
+
+    def rotate(self):
+        """ Deletes all but the newest PROFILING_MAX_FILES profiles. File
+        names start with a timestamp so they sort oldest first. """
+
+        profiles = sorted(self.directory.glob("*.prof"))
+
+        for profile in profiles[: max(len(profiles) - self.max_files, 0)]:
+            # Another worker may be rotating the same directory.
+            with contextlib.suppress(FileNotFoundError):
+                profile.unlink()
+                profile.with_suffix(".json").unlink()
+
+
+class MetricsMiddleware:
+    """ Records request latency, response size and query count by view and
+    action, and worker utilization, into apps.api.metrics.registry. Served by
+    apps.api.views.MetricsView
+
+    Shares the RequestTiming of ServerTimingMiddleware when both are enabled.
+    Enabled with settings.METRICS. When disabled the middleware removes itself
+    from the chain on startup so it costs nothing. """
+
+    def __init__(self, get_response):
+
+        if not getattr(settings, "METRICS", False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+        metrics.registry.set("hlts_workers", value=1)
+        metrics.registry.set("hlts_worker_requests_in_flight", value=0)
+
+    def __call__(self, request):
+
+        self.track_in_flight(1)
+
+        try:
+            timing = getattr(request, "timing", None)
+
+            if timing is None:
+                timing = RequestTiming()
+                request.timing = timing
+                with timing.wrap_connections():
+                    response = self.get_response(request)
+            else:
+                response = self.get_response(request)
+
+            duration = timing.total
+
+        finally:
+            self.track_in_flight(-1)
+
+        registry = metrics.registry
+        labels = {"view": timing.view or "", "action": timing.action or ""}
+
+        registry.inc(
+            "hlts_http_requests_total",
+            {**labels, "method": request.method, "status": response.status_code},
+        )
+        registry.observe("hlts_http_request_duration_seconds", duration, labels)
+        registry.observe("hlts_http_request_queries", timing.queries, labels)
+        if not response.streaming:
+            size = len(response.content)
+            registry.observe("hlts_http_response_size_bytes", size, labels)
+        registry.inc("hlts_worker_busy_seconds_total", value=duration)
+
+        registry.flush()
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.set_view(request, view_func)
+
+    def track_in_flight(self, delta):
+        with self.lock:
+            self.in_flight += delta
+            metrics.registry.set("hlts_worker_requests_in_flight", value=self.in_flight)
@@ -0,0 +1,129 @@
+""" Sends the reads of API requests to read replicas of the primary database.
+
+settings.REPLICA_DATABASES names the aliases in settings.DATABASES that are
+replicas of 'default'. Reads made while handling a request go to a random
+replica, everything else goes to 'default'. Reads stay on 'default':
+
+    - inside a transaction on 'default', which may hold uncommitted writes,
+    - in requests with unsafe methods e.g. POST, which may write what they
+      read,
+    - outside of requests e.g. in management commands,
+    - for REPLICA_PIN_SECONDS after a client's last write, so that a client
+      always reads its own writes despite replication lag.
+
+A write is any request with an unsafe method or one that wrote through the
+ORM. The pin is kept in a cookie so it holds across worker processes without
+a shared cache. A client may set the cookie to read from the primary but
+gains nothing else by it.
+
+See apps.api.management.commands.sync_replicas to run a SQLite replica
+locally. """
+
+import contextlib
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+COOKIE = "hlts_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("replica_state", default=None)
+
+
+@contextlib.contextmanager
+def request_state(pinned=False):
+    """ Routes the reads made within to replicas unless `pinned`. Yields the
+    RequestState, which records whether anything was written. """
+
+    state = RequestState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def get_replicas():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+
+        replicas = get_replicas()
+        state = _state.get()
+
+        if not replicas or state is None or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas copy the primary's schema.
+        return db not in get_replicas()
+
+
+class ReplicaMiddleware:
+    """ Routes the reads of a request to replicas unless the client wrote
+    within the last REPLICA_PIN_SECONDS. See ReplicaRouter """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        if not get_replicas():
+            return self.get_response(request)
+
+        try:
+            pinned = float(request.COOKIES.get(COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+
+        pinned = pinned or request.method not in SAFE_METHODS
+
+        with request_state(pinned) as state:
+            response = self.get_response(request)
+
+        if state.wrote or request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                COOKIE,
+                str(int(time.time() + seconds)),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
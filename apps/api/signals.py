@@ -0,0 +1,49 @@
+""" Health checks persistent database connections. See settings.CONN_MAX_AGE """
+
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """ Closes persistent connections the database dropped while idle, e.g. on
+    a restart or an idle timeout, so that the request reconnects rather than
+    failing on its first query. Runs after Django's close_old_connections,
+    which closes connections past CONN_MAX_AGE.
+
+    Each check is a round-trip, so a connection used by a request in the last
+    DATABASE_HEALTH_CHECK_IDLE seconds is trusted without one. """
+
+    if not getattr(settings, "DATABASE_HEALTH_CHECKS", False):
+        return
+
+    now = time.monotonic()
+    idle = getattr(settings, "DATABASE_HEALTH_CHECK_IDLE", 0)
+
+    for connection in connections.all():
+
+        if connection.connection is None:
+            continue
+
+        if now - getattr(connection, "last_used", float("-inf")) < idle:
+            continue
+
+        if connection.is_usable():
+            connection.last_used = now
+        else:
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_connections(**kwargs):
+    """ Records when each open connection last served a request. """
+
+    now = time.monotonic()
+
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
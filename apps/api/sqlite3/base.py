@@ -0,0 +1,71 @@
+""" A SQLite database backend tuned for several worker processes writing to
+one database file. See config.settings.sqlite
+
+    DATABASES = {"default": {"ENGINE": "apps.api.sqlite3", "NAME": "db.sqlite3"}}
+
+Every new connection applies settings.SQLITE_PRAGMAS e.g. WAL journaling, so
+readers never block the writer, and a busy_timeout, so a writer waits for the
+lock instead of failing at once.
+
+Transactions start with BEGIN IMMEDIATE, taking the write lock up front. With
+a plain BEGIN a transaction that has read and then writes cannot wait for the
+lock and fails with "database is locked" at once if another connection wrote
+in between. A BEGIN IMMEDIATE still locked after busy_timeout is retried up
+to SQLITE_BEGIN_RETRIES times with a jittered, doubling SQLITE_BEGIN_BACKOFF.
+Nothing has run in the transaction yet, so the retry is always safe. """
+
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base
+from django.dispatch import receiver
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _set_autocommit(self, autocommit):
+        # pysqlite stays in autocommit mode and transactions are started
+        # explicitly, so it never issues a deferred BEGIN of its own.
+        with self.wrap_database_errors:
+            self.connection.isolation_level = None
+
+        if not autocommit:
+            self._start_transaction_under_autocommit()
+
+    def _start_transaction_under_autocommit(self):
+
+        retries = getattr(settings, "SQLITE_BEGIN_RETRIES", 5)
+        backoff = getattr(settings, "SQLITE_BEGIN_BACKOFF", 0.05)
+
+        for attempt in range(retries + 1):
+            try:
+                with self.wrap_database_errors:
+                    self.connection.execute("BEGIN IMMEDIATE")
+                return
+            except OperationalError as error:
+                if "locked" not in str(error) or attempt == retries:
+                    raise
+                delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning(
+                    "BEGIN IMMEDIATE on %s is locked, retrying in %.3fs.",
+                    self.alias,
+                    delay,
+                )
+                time.sleep(delay)
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
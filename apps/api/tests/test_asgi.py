@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+from config import asgi
+
+
+def call(scope, messages, application=asgi.application):
+
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    return application(scope, receive, send), sent
+
+
+def test_requests_run_on_pool(monkeypatch):
+
+    threads = set()
+    wsgi_application = asgi.application.wsgi_application
+
+    def record(environ, start_response):
+        threads.add(threading.current_thread().name)
+        return wsgi_application(environ, start_response)
+
+    monkeypatch.setattr(asgi.application, "wsgi_application", record)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/nodes",
+        "query_string": b"",
+        "http_version": "1.1",
+        "headers": [],
+    }
+
+    calls = [
+        call(scope, [{"type": "http.request", "body": b""}]) for _ in range(4)
+    ]
+
+    async def main():
+        await asyncio.gather(*(coroutine for coroutine, _ in calls))
+
+    asyncio.run(main())
+
+    for _, sent in calls:
+        assert sent[0]["type"] == "http.response.start"
+        assert sent[0]["status"] == 401
+        assert sent[-1] == {"type": "http.response.body"}
+
+    assert all(name.startswith("wsgi") for name in threads)
+
+
+def test_lifespan():
+
+    # Shutdown stops the pool so the shared application is left alone.
+    application = asgi.ThreadPoolWsgiToAsgi(
+        asgi.application.wsgi_application, threads=1
+    )
+
+    coroutine, sent = call(
+        {"type": "lifespan"},
+        [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}],
+        application,
+    )
+
+    asyncio.run(coroutine)
+
+    assert sent == [
+        {"type": "lifespan.startup.complete"},
+        {"type": "lifespan.shutdown.complete"},
+    ]
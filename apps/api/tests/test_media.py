@@ -0,0 +1,151 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.api.media import parse_range
+from apps.nodes.models import Node
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture
+def node(user, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    media = SimpleUploadedFile("audio.mp3", CONTENT)
+    return Node.objects.create(user, text="Node text.", media=media)
+
+
+def get_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def read(response):
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+class TestMedia:
+    def test_whole_file(self, user, node):
+
+        response = get_client(user).get(reverse("node-media", args=[node.pk]))
+
+        assert response.status_code == 200
+        assert read(response) == CONTENT
+        assert response["Content-Length"] == str(len(CONTENT))
+        assert response["Content-Type"] == "audio/mpeg"
+        assert response["Accept-Ranges"] == "bytes"
+        assert response["Content-Disposition"] == 'inline; filename="audio.mp3"'
+        assert response["ETag"]
+
+    def test_range(self, user, node):
+
+        client = get_client(user)
+        url = reverse("node-media", args=[node.pk])
+
+        response = client.get(url, HTTP_RANGE="bytes=10-19")
+        assert response.status_code == 206
+        assert read(response) == CONTENT[10:20]
+        assert response["Content-Length"] == "10"
+        assert response["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+
+        response = client.get(url, HTTP_RANGE="bytes=-4")
+        assert response.status_code == 206
+        assert read(response) == CONTENT[-4:]
+
+        response = client.get(url, HTTP_RANGE="bytes=1000-")
+        assert response.status_code == 206
+        assert read(response) == CONTENT[1000:]
+
+        response = client.get(url, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+        assert response.status_code == 416
+        assert response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+    def test_if_range(self, user, node):
+
+        client = get_client(user)
+        url = reverse("node-media", args=[node.pk])
+
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE=etag)
+        assert response.status_code == 206
+
+        response = client.get(url, HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE='"stale"')
+        assert response.status_code == 200
+        assert read(response) == CONTENT
+
+    def test_if_none_match(self, user, node):
+
+        client = get_client(user)
+        url = reverse("node-media", args=[node.pk])
+
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_proxies(self, user, node, settings):
+
+        client = get_client(user)
+        url = reverse("node-media", args=[node.pk])
+
+        settings.MEDIA_SERVING = "x-accel-redirect"
+        settings.MEDIA_ACCEL_PREFIX = "/protected-media/"
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response["X-Accel-Redirect"] == f"/protected-media/{node.media.name}"
+        assert response.content == b""
+
+        settings.MEDIA_SERVING = "x-sendfile"
+        response = client.get(url)
+        assert response["X-Sendfile"] == node.media.path
+
+    def test_other_user(self, node):
+
+        other = get_user_model().objects.create_user(
+            email="other@email.com", password="password"
+        )
+
+        response = get_client(other).get(reverse("node-media", args=[node.pk]))
+
+        assert response.status_code == 404
+
+    def test_no_media(self, user):
+
+        node = Node.objects.create(user, text="Node text.")
+
+        response = get_client(user).get(reverse("node-media", args=[node.pk]))
+
+        assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=5-", (5, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-200", (0, 99)),
+        ("bytes=50-500", (50, 99)),
+        ("bytes=100-", "unsatisfiable"),
+        ("bytes=-0", "unsatisfiable"),
+        ("bytes=9-0", None),
+        ("bytes=0-1,5-6", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
@@ -0,0 +1,236 @@
+import io
+import json
+import logging
+import os
+import re
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.api import metrics, middleware
+from apps.nodes.models import Node
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def get_client(user):
+    # Middleware is loaded on a client's first request. A new client picks up
+    # the current SERVER_TIMING setting.
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.django_db
+class TestServerTimingMiddleware:
+    def test_headers(self, user, settings, caplog):
+
+        settings.SERVER_TIMING = True
+
+        node = Node.objects.create(user, text="Node text.")
+
+        client = get_client(user)
+
+        with caplog.at_level(logging.INFO, logger="apps.api.middleware"):
+            response = client.get(reverse("node-detail", args=[node.pk]))
+
+        assert int(response["X-Query-Count"]) > 0
+        assert response["Server-Timing"].startswith("db;dur=")
+        assert "render;dur=" in response["Server-Timing"]
+        assert "view=NodesViewSet action=retrieve" in caplog.text
+
+    def test_disabled(self, user, settings):
+
+        settings.SERVER_TIMING = False
+
+        response = get_client(user).get(reverse("node-list"))
+
+        assert "Server-Timing" not in response
+        assert "X-Query-Count" not in response
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    @pytest.fixture
+    def profiling(self, settings, tmp_path):
+        settings.PROFILING = True
+        settings.PROFILING_SAMPLE_RATE = 0
+        settings.PROFILING_DIR = str(tmp_path)
+        settings.PROFILING_MAX_FILES = 2
+        return tmp_path
+
+    def test_sampled(self, user, settings, profiling):
+
+        settings.PROFILING_SAMPLE_RATE = 1
+
+        client = get_client(user)
+        for _ in range(3):
+            client.get(reverse("node-list"))
+
+        assert len(list(profiling.glob("*.prof"))) == 2
+        assert len(list(profiling.glob("*.json"))) == 2
+
+        output = io.StringIO()
+        call_command("profile_stats", path="/api/nodes", stdout=output)
+
+        assert "2 profiles" in output.getvalue()
+
+    def test_header_staff_only(self, user, profiling, monkeypatch):
+
+        started = []
+        monkeypatch.setattr(
+            middleware.cProfile.Profile, "enable", lambda self: started.append(1)
+        )
+
+        # Not even started for anonymous and non-staff users.
+        APIClient().get(reverse("node-list"), HTTP_X_PROFILE="1")
+
+        client = APIClient()
+        client.login(email="user@email.com", password="password")
+        client.get(reverse("node-list"), HTTP_X_PROFILE="1")
+
+        assert not started
+        assert not list(profiling.glob("*.prof"))
+
+        user.is_staff = True
+        user.save()
+
+        client.get(reverse("node-list"), HTTP_X_PROFILE="1")
+
+        assert len(started) == 1
+        assert len(list(profiling.glob("*.prof"))) == 1
+
+    def test_header_token(self, user, profiling):
+
+        user.is_staff = True
+        user.save()
+
+        client = APIClient()
+        response = client.post(
+            "/api/auth/token/", {"email": "user@email.com", "password": "password"}
+        )
+        client.credentials(HTTP_AUTHORIZATION=f"JWT {response.data['token']}")
+
+        client.get(reverse("node-list"), HTTP_X_PROFILE="1")
+
+        assert len(list(profiling.glob("*.prof"))) == 1
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    @pytest.fixture
+    def metrics_dir(self, settings, tmp_path):
+        settings.METRICS = True
+        settings.METRICS_DIR = str(tmp_path)
+        settings.METRICS_TOKEN = None
+        return tmp_path
+
+    def test_metrics(self, user, metrics_dir):
+
+        client = get_client(user)
+        client.get(reverse("node-list"))
+
+        response = client.get(reverse("metrics"))
+        text = response.content.decode()
+
+        labels = 'action="list",method="GET",status="200",view="NodesViewSet"'
+
+        assert response.status_code == 200
+        assert f"hlts_http_requests_total{{{labels}}}" in text
+        assert '# TYPE hlts_http_request_duration_seconds histogram' in text
+        assert 'hlts_http_request_queries_bucket{action="list",' in text
+        assert "hlts_workers 1" in text
+
+    def test_aggregates_processes(self, user, metrics_dir):
+
+        # An exited worker's counters are kept, its gauges are not.
+        snapshot = {
+            "counters": {"hlts_worker_busy_seconds_total": {"[]": 1000}},
+            "histograms": {},
+            "gauges": {"hlts_workers": {"[]": 1}},
+        }
+        (metrics_dir / "999999999.json").write_text(json.dumps(snapshot))
+
+        text = get_client(user).get(reverse("metrics")).content.decode()
+
+        busy = re.search(r"^hlts_worker_busy_seconds_total (\S+)$", text, re.M)
+
+        assert float(busy.group(1)) >= 1000
+        assert "hlts_workers 1" in text
+
+    def test_fold(self, user, metrics_dir):
+
+        snapshot = {
+            "counters": {"hlts_worker_busy_seconds_total": {"[]": 1000}},
+            "histograms": {},
+            "gauges": {"hlts_workers": {"[]": 1}},
+        }
+
+        for pid in (999999998, 999999999):
+            (metrics_dir / f"{pid}.json").write_text(json.dumps(snapshot))
+            metrics.registry.fold(pid)
+
+        assert not list(metrics_dir.glob("99999999*.json"))
+
+        exited = json.loads((metrics_dir / "exited.json").read_text())
+        assert exited["counters"]["hlts_worker_busy_seconds_total"]["[]"] == 2000
+
+        text = get_client(user).get(reverse("metrics")).content.decode()
+
+        busy = re.search(r"^hlts_worker_busy_seconds_total (\S+)$", text, re.M)
+
+        assert float(busy.group(1)) >= 2000
+        assert "hlts_workers 1" in text
+
+    def test_flush_concurrently(self, metrics_dir):
+
+        errors = []
+
+        def flush():
+            try:
+                for _ in range(20):
+                    metrics.registry.flush(force=True)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=flush) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert [path.name for path in metrics_dir.iterdir()] == [f"{os.getpid()}.json"]
+        assert json.loads((metrics_dir / f"{os.getpid()}.json").read_text())
+
+    def test_flush_failure(self, settings, tmp_path, caplog):
+
+        # The metrics directory cannot be created under a file.
+        (tmp_path / "file").touch()
+        settings.METRICS = True
+        settings.METRICS_DIR = str(tmp_path / "file" / "metrics")
+
+        metrics.registry.flush(force=True)
+
+        assert "Failed to write metrics" in caplog.text
+
+    def test_token(self, user, settings, metrics_dir):
+
+        settings.METRICS_TOKEN = "secret"
+
+        client = get_client(user)
+
+        assert client.get(reverse("metrics")).status_code == 401
+
+        response = client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+
+        assert response.status_code == 200
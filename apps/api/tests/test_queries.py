@@ -0,0 +1,138 @@
+""" Guards every viewset routed in apps.api.urls against N+1 queries.
+
+A library is built at SMALL rows and the number of queries of a 'list' and a
+'detail' request is recorded. The library is grown to LARGE rows and the same
+requests must not take more queries. Objects are shared between Nodes e.g. a
+Tag on every Node, so the detail of a shared object grows with the library
+too. """
+
+import collections
+import re
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.api.urls import router
+from apps.nodes.models import DeletionJob, Individual, Node, Source
+
+SMALL = 10
+LARGE = 100
+
+
+VIEWSETS = [(viewset, basename) for prefix, viewset, basename in router.registry]
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def grow_library(user, size):
+    """ Adds Nodes until the user has `size`. Each Node has its own Tag,
+    Collection, Origin, Source and Individual plus ones shared by every Node,
+    and is related to the first Node. """
+
+    nodes = list(Node.objects.filter(user=user).order_by("date_created"))
+
+    for index in range(len(nodes), size):
+
+        node = Node.objects.create(
+            user,
+            text=f"Node {index} text.",
+            tags=["shared", f"tag-{index}"],
+            collections=["shared", f"collection-{index}"],
+            origin="shared" if index % 2 else f"origin-{index}",
+            source={
+                "name": f"source-{index}",
+                "individuals": ["shared", f"individual-{index}"],
+                "url": "",
+                "date": "",
+                "notes": "",
+            },
+            related=nodes[:1],
+        )
+        nodes.append(node)
+
+    individuals = Individual.objects.filter(user=user)
+    individuals.get(name="shared").aka.set(individuals.exclude(name="shared")[:5])
+
+
+def get_detail_pk(viewset, user):
+    """ The first Node or Source, otherwise the object shared by every Node.
+    Either has the most connections. A DeletionJob has none. """
+
+    Model = viewset.queryset.model
+    queryset = Model.objects.filter(user=user)
+
+    if Model in (Node, Source):
+        return queryset.order_by("date_created").values_list("pk", flat=True)[0]
+
+    if Model is DeletionJob:
+        return DeletionJob.objects.create(user, kind=DeletionJob.TRASH).pk
+
+    return queryset.filter(name="shared").values_list("pk", flat=True)[0]
+
+
+def count_queries(client, url):
+
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+
+    assert response.status_code == 200, response.data
+
+    return [query["sql"] for query in captured.captured_queries]
+
+
+def describe(small, large):
+    """ The statements run more often at LARGE than at SMALL rows. """
+
+    def normalize(sql):
+        sql = re.sub(r"'[^']*'", "?", sql)
+        return re.sub(r"\b\d+\b", "?", sql)
+
+    small = collections.Counter(normalize(sql) for sql in small)
+    large = collections.Counter(normalize(sql) for sql in large)
+
+    lines = [
+        f"{count - small[sql]:>4}x more: {sql}"
+        for sql, count in large.most_common()
+        if count > small[sql]
+    ]
+
+    return "\n".join(lines)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("viewset, basename", VIEWSETS)
+@pytest.mark.parametrize("view", ["list", "detail"])
+def test_queries_do_not_grow(user, viewset, basename, view):
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    counts = []
+    for size in (SMALL, LARGE):
+
+        grow_library(user, size)
+
+        if view == "list":
+            url = reverse(f"{basename}-list")
+        else:
+            url = reverse(f"{basename}-detail", args=[get_detail_pk(viewset, user)])
+
+        counts.append(count_queries(client, url))
+
+    small, large = counts
+
+    if len(large) > len(small):
+        pytest.fail(
+            f"{basename}-{view} ran {len(small)} queries at {SMALL} rows and "
+            f"{len(large)} at {LARGE} rows:\n{describe(small, large)}",
+            pytrace=False,
+        )
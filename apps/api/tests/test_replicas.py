@@ -0,0 +1,126 @@
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.api import replicas
+from apps.nodes.models import Node
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture
+def routed(settings, monkeypatch):
+    """ Adds a 'replica' alias sharing the test database's connection and
+    returns the alias of every routed read. """
+
+    settings.REPLICA_DATABASES = ["replica"]
+
+    connections.databases["replica"] = connections.databases["default"]
+    connections["replica"] = connections["default"]
+
+    reads = []
+    db_for_read = replicas.ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        alias = db_for_read(self, model, **hints)
+        reads.append(alias)
+        return alias
+
+    monkeypatch.setattr(replicas.ReplicaRouter, "db_for_read", record)
+
+    yield reads
+
+    del connections.databases["replica"]
+    delattr(connections._connections, "replica")
+
+
+def get_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+# The tests' own transaction would pin every read to the primary.
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+    def test_reads(self, user, routed):
+
+        Node.objects.create(user, text="Node text.")
+        routed.clear()
+
+        response = get_client(user).get(reverse("node-list"))
+
+        assert response.status_code == 200
+        assert len(response.data) == 1
+        assert routed and set(routed) == {"replica"}
+        assert replicas.COOKIE not in response.cookies
+
+    def test_outside_requests(self, user, routed):
+
+        Node.objects.filter(user=user).count()
+
+        assert routed == ["default"]
+
+    def test_read_your_writes(self, user, routed):
+
+        node = Node.objects.create(user, text="Node text.")
+        routed.clear()
+
+        client = get_client(user)
+
+        response = client.patch(
+            reverse("node-bulk"),
+            {"ids": [str(node.pk)], "set": {"is_starred": True}},
+            format="json",
+        )
+        assert response.status_code == 200
+        assert set(routed) == {"default"}
+
+        cookie = response.cookies[replicas.COOKIE]
+        assert float(cookie.value) > time.time()
+
+        routed.clear()
+        response = client.get(reverse("node-list"))
+        assert set(routed) == {"default"}
+
+        client.cookies[replicas.COOKIE] = str(time.time() - 1)
+
+        routed.clear()
+        client.get(reverse("node-list"))
+        assert set(routed) == {"replica"}
+
+    def test_reads_after_write(self, user, routed):
+
+        with replicas.request_state() as state:
+
+            Node.objects.filter(user=user).count()
+            Node.objects.create(user, text="Node text.")
+            Node.objects.filter(user=user).count()
+
+        assert state.wrote is True
+        assert routed[0] == "replica"
+        assert routed[-1] == "default"
+
+    def test_transaction(self, user, routed):
+
+        with replicas.request_state(), transaction.atomic():
+            Node.objects.filter(user=user).count()
+
+        assert routed == ["default"]
+
+    def test_disabled(self, user, routed, settings):
+
+        settings.REPLICA_DATABASES = []
+
+        get_client(user).get(reverse("node-list"))
+
+        assert set(routed) == {"default"}
@@ -0,0 +1,76 @@
+from django.db import connections
+
+from apps.api import signals
+from config.warmup import warmup
+
+
+class Connection:
+    def __init__(self, usable, connected=True):
+        self.connection = object() if connected else None
+        self.usable = usable
+        self.closed = False
+        self.checks = 0
+
+    def is_usable(self):
+        self.checks += 1
+        return self.usable
+
+    def close(self):
+        self.closed = True
+
+
+def test_check_connections(settings, monkeypatch):
+
+    settings.DATABASE_HEALTH_CHECKS = True
+    settings.DATABASE_HEALTH_CHECK_IDLE = 0
+
+    usable = Connection(usable=True)
+    dropped = Connection(usable=False)
+    unopened = Connection(usable=False, connected=False)
+
+    monkeypatch.setattr(connections, "all", lambda: [usable, dropped, unopened])
+
+    signals.check_connections()
+
+    assert not usable.closed
+    assert dropped.closed
+    assert not unopened.closed
+
+
+def test_check_connections_disabled(settings, monkeypatch):
+
+    settings.DATABASE_HEALTH_CHECKS = False
+
+    dropped = Connection(usable=False)
+    monkeypatch.setattr(connections, "all", lambda: [dropped])
+
+    signals.check_connections()
+
+    assert not dropped.closed
+
+
+def test_check_connections_idle(settings, monkeypatch):
+
+    settings.DATABASE_HEALTH_CHECKS = True
+    settings.DATABASE_HEALTH_CHECK_IDLE = 60
+
+    used = Connection(usable=True)
+    idle = Connection(usable=True)
+
+    monkeypatch.setattr(connections, "all", lambda: [used])
+    signals.mark_connections()
+
+    monkeypatch.setattr(connections, "all", lambda: [used, idle])
+    signals.check_connections()
+
+    assert used.checks == 0
+    assert idle.checks == 1
+
+    # Checked once per idle period.
+    signals.check_connections()
+    assert idle.checks == 1
+
+
+def test_warmup():
+    # Runs without touching the database.
+    warmup()
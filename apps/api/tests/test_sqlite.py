@@ -0,0 +1,102 @@
+import pytest
+from django.db import OperationalError, connections
+
+from apps.api.sqlite3.base import DatabaseWrapper
+
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 10,
+    "mmap_size": 1024 * 1024,
+    "cache_size": -1024,
+}
+
+
+@pytest.fixture
+def connect(settings, tmp_path):
+    """ Opens connections of the tuned backend to one database file. """
+
+    settings.SQLITE_PRAGMAS = PRAGMAS
+    settings.SQLITE_BEGIN_RETRIES = 2
+    settings.SQLITE_BEGIN_BACKOFF = 0
+
+    opened = []
+
+    def connect():
+        settings_dict = {
+            **connections["default"].settings_dict,
+            "ENGINE": "apps.api.sqlite3",
+            "NAME": str(tmp_path / "db.sqlite3"),
+        }
+        connection = DatabaseWrapper(settings_dict, alias=f"sqlite{len(opened)}")
+        opened.append(connection)
+        return connection
+
+    yield connect
+
+    for connection in opened:
+        connection.close()
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+# Allows connections. The test database itself is not used.
+@pytest.mark.django_db
+class TestSQLiteBackend:
+    def test_pragmas(self, connect):
+
+        connection = connect()
+
+        assert pragma(connection, "journal_mode") == "wal"
+        assert pragma(connection, "synchronous") == 1
+        assert pragma(connection, "busy_timeout") == 10
+        assert pragma(connection, "mmap_size") == 1024 * 1024
+        assert pragma(connection, "cache_size") == -1024
+
+    def test_begin_immediate(self, connect):
+
+        first = connect()
+        second = connect()
+
+        with first.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id integer PRIMARY KEY)")
+
+        first.set_autocommit(False)
+
+        # The write lock is taken before anything is written.
+        with pytest.raises(OperationalError, match="locked"):
+            with second.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES (1)")
+
+        first.commit()
+        first.set_autocommit(True)
+
+        second.set_autocommit(False)
+        with second.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES (1)")
+        second.commit()
+        second.set_autocommit(True)
+
+        with first.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM item")
+            assert cursor.fetchone()[0] == 1
+
+    def test_begin_retries(self, connect, caplog):
+
+        first = connect()
+        second = connect()
+
+        first.set_autocommit(False)
+
+        with pytest.raises(OperationalError, match="locked"):
+            second.set_autocommit(False)
+
+        assert caplog.text.count("retrying") == 2
+
+        first.rollback()
+        first.set_autocommit(True)
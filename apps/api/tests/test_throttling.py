@@ -0,0 +1,158 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.api.throttling import TokenBucketThrottle
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture
+def rates(settings):
+    """ Sets the throttle rates and empties every bucket. """
+
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": rates,
+        }
+        caches["throttle"].clear()
+
+    return set_rates
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    def post_token(self, email, ip="10.0.0.1"):
+        return APIClient().post(
+            "/api/auth/token/",
+            {"email": email, "password": "wrong"},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_login_email(self, user, rates):
+
+        rates(login_email="3/m")
+
+        for _ in range(3):
+            assert self.post_token(user.email).status_code == 400
+
+        response = self.post_token(user.email, ip="10.0.0.2")
+        assert response.status_code == 429
+        assert 0 < int(response["Retry-After"]) <= 20
+
+        # Normalized so case does not open a new bucket.
+        assert self.post_token(user.email.upper()).status_code == 429
+
+        assert self.post_token("other@email.com").status_code == 400
+
+    def test_login_ip(self, user, rates):
+
+        rates(login_ip="2/m")
+
+        assert self.post_token("a@email.com").status_code == 400
+        assert self.post_token("b@email.com").status_code == 400
+        assert self.post_token("c@email.com").status_code == 429
+        assert self.post_token("c@email.com", ip="10.0.0.2").status_code == 400
+
+    def test_login_ip_forwarded(self, user, rates, settings):
+
+        rates(login_ip="1/m")
+
+        def post(forwarded):
+            return APIClient().post(
+                "/api/auth/token/",
+                {"email": user.email, "password": "wrong"},
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=forwarded,
+            )
+
+        # Without proxies a forged header does not open a new bucket.
+        assert post("1.1.1.1").status_code == 400
+        assert post("2.2.2.2").status_code == 429
+
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+
+        assert post("3.3.3.3").status_code == 400
+        assert post("3.3.3.3").status_code == 429
+
+    def test_password(self, user, rates):
+
+        rates(password_email="1/m")
+
+        url = reverse("password")
+        data = {
+            "email": user.email,
+            "password": "wrong",
+            "password_new": "password-new",
+            "password_confirm": "password-new",
+        }
+
+        assert APIClient().post(url, data).status_code == 400
+        assert APIClient().post(url, data).status_code == 429
+
+    def test_merge_user(self, user, rates):
+
+        rates(merge_user="1/m")
+
+        client = APIClient()
+        client.force_authenticate(user)
+
+        data = {"which": "tags", "into": "a", "merging": ["a", "b"]}
+
+        assert client.post(reverse("merge"), data).status_code != 429
+        assert client.post(reverse("merge"), data).status_code == 429
+
+        # Other views have no throttle_scope.
+        assert client.get(reverse("node-list")).status_code == 200
+
+    def test_unthrottled(self, user, rates):
+
+        rates()
+
+        for _ in range(20):
+            assert self.post_token(user.email).status_code == 400
+
+
+class TestTokenBucketThrottle:
+    class View:
+        throttle_scope = "test"
+
+    class Request:
+        META = {"REMOTE_ADDR": "10.0.0.1"}
+
+    class Throttle(TokenBucketThrottle):
+        ident_name = "ip"
+
+        def get_ident_value(self, request, view):
+            return "ident"
+
+    def test_refill(self, rates):
+
+        rates(test_ip="2/m")
+
+        now = 1000.0
+
+        def allow():
+            throttle = self.Throttle()
+            throttle.timer = lambda: now
+            return throttle.allow_request(self.Request(), self.View()), throttle
+
+        assert allow()[0] is True
+        assert allow()[0] is True
+
+        allowed, throttle = allow()
+        assert allowed is False
+        assert throttle.wait() == pytest.approx(30)
+
+        # Half a minute refills one token.
+        now += 30
+        assert allow()[0] is True
+        assert allow()[0] is False
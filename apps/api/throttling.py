@@ -0,0 +1,152 @@
+""" Token bucket throttles for expensive views.
+
+A view opts in by naming a `throttle_scope`. Each throttle class identifies the
+client its own way, by IP address, by the e-mail posted or by the
+authenticated user, and looks up the rate of '<scope>_<ident>' in
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] e.g. 'login_ip' or 'merge_user'. A
+scope without a rate for an identity is not throttled by it.
+
+    class MergeView(views.APIView):
+        throttle_scope = "merge"
+
+A rate of '10/m' is a bucket holding at most 10 tokens refilled at 10 per
+minute, so a client may burst 10 requests then sustain one every 6 seconds.
+Throttles run in APIView.initial() before the handler, so a throttled request
+never reaches e.g. password hashing. Throttled responses are a 429 with a
+'Retry-After' header.
+
+Buckets are kept in the 'throttle' cache so every worker process shares them.
+Reading and writing a bucket is not atomic, so concurrent requests may
+occasionally both take the last token. """
+
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+
+    ident_name = None
+
+    cache_format = "throttle_%(scope)s_%(ident)s"
+    timer = time.time
+
+    def __init__(self):
+        # The rate depends on the view. See allow_request()
+        self.rate = None
+        self.tokens = None
+
+    @property
+    def cache(self):
+        return caches["throttle"]
+
+    def get_ident_value(self, request, view):
+        """ Returns the value identifying the client or None to skip. """
+        raise NotImplementedError(".get_ident_value() must be overridden")
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+
+        ident = self.get_ident_value(request, view)
+        if ident is None:
+            return None
+
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return True
+
+        self.scope = f"{scope}_{self.ident_name}"
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        refill = self.num_requests / self.duration
+
+        tokens, updated = self.cache.get(self.key, (self.num_requests, self.now))
+        tokens = min(self.num_requests, tokens + (self.now - updated) * refill)
+
+        if tokens < 1:
+            self.tokens = tokens
+            return self.throttle_failure()
+
+        self.tokens = tokens - 1
+        self.cache.set(self.key, (self.tokens, self.now), self.duration)
+
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """ Seconds until the bucket holds a token again. """
+
+        if self.tokens is None or self.tokens >= 1:
+            return None
+
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class IPThrottle(TokenBucketThrottle):
+    """ Throttles by client IP address. Behind proxies, set
+    REST_FRAMEWORK["NUM_PROXIES"] to their number so the address is read from
+    'X-Forwarded-For'. Unset, the header is ignored since any client can send
+    it. """
+
+    ident_name = "ip"
+
+    def get_ident_value(self, request, view):
+
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """ Throttles by the 'email' posted e.g. to log in or change a password,
+    so one account cannot be guessed at from many addresses. Hashed so cache
+    keys hold neither addresses nor characters a cache backend may reject. """
+
+    ident_name = "email"
+
+    def get_ident_value(self, request, view):
+
+        try:
+            email = request.data.get("email")
+        except AttributeError:
+            # A JSON list or scalar.
+            return None
+
+        if not isinstance(email, str) or not email.strip():
+            return None
+
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class UserThrottle(TokenBucketThrottle):
+    """ Throttles by authenticated user. """
+
+    ident_name = "user"
+
+    def get_ident_value(self, request, view):
+
+        if not request.user.is_authenticated:
+            return None
+
+        return request.user.pk
@@ -1,9 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
-from rest_framework_jwt.views import obtain_jwt_token
 
 from ..nodes.views import (
     CollectionsViewSet,
+    DeletionJobsViewSet,
     IndividualsViewSet,
     MergeView,
     NodesViewSet,
@@ -11,7 +11,7 @@ from ..nodes.views import (
     SourcesViewSet,
     TagsViewSet,
 )
-from ..users.views import UserView, UserPasswordChangeView
+from ..users.views import ObtainTokenView, UserView, UserPasswordChangeView
 from .views import ApiRoot
 
 
@@ -22,6 +22,7 @@ router.register("individuals", IndividualsViewSet, basename="individual")
 router.register("tags", TagsViewSet, basename="tag")
 router.register("collections", CollectionsViewSet, basename="collection")
 router.register("origins", OriginsViewSet, basename="origin")
+router.register("jobs", DeletionJobsViewSet, basename="deletionjob")
 
 
 urlpatterns = [
@@ -30,6 +31,6 @@ urlpatterns = [
     path("user/", UserView.as_view(), name="user"),
     path("user/password/", UserPasswordChangeView.as_view(), name="password"),
     path("auth/", include("rest_framework.urls", namespace="rest_framework")),
-    path("auth/token/", obtain_jwt_token),
+    path("auth/token/", ObtainTokenView.as_view()),
     path("merge/", MergeView.as_view(), name="merge"),
 ]
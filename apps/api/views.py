@@ -1,7 +1,14 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views import View
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
+from . import metrics
+
 
 class ApiRoot(APIView):
     """
@@ -27,6 +34,7 @@ class ApiRoot(APIView):
         # Actions
 
         merge = reverse("merge", request=request)
+        jobs = reverse("deletionjob-list", request=request)
 
         return Response(
             {
@@ -41,6 +49,27 @@ class ApiRoot(APIView):
                         "origins": origins,
                     },
                 },
-                "actions": {"merge": merge},
+                "actions": {"merge": merge, "jobs": jobs},
             }
         )
+
+
+class MetricsView(View):
+    """ Serves apps.api.metrics.registry in the Prometheus text format for
+    scraping. Only available with settings.METRICS. If settings.METRICS_TOKEN
+    is set, scrapes must send 'Authorization: Bearer <METRICS_TOKEN>'. """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def get(self, request):
+
+        if not getattr(settings, "METRICS", False):
+            raise Http404
+
+        token = getattr(settings, "METRICS_TOKEN", None)
+        if token:
+            authorization = request.META.get("HTTP_AUTHORIZATION", "")
+            if not hmac.compare_digest(authorization, f"Bearer {token}"):
+                return HttpResponse(status=401)
+
+        return HttpResponse(metrics.registry.render(), content_type=self.CONTENT_TYPE)
@@ -1,8 +1,88 @@
+import os
+import threading
+import time
+import uuid
+
+from django.db import connections, router
+
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7():
+    """ Returns a time-ordered UUID laid out as UUIDv7 (RFC 9562): a 48-bit
+    Unix timestamp in milliseconds, a 12-bit counter, then 62 random bits.
+
+    Keys generated later sort later so inserts land at the right-hand edge of
+    the primary key index rather than on random pages, and the key order
+    follows creation order. The counter keeps keys generated within the same
+    millisecond in this process ordered. """
+
+    global _uuid7_last
+
+    with _uuid7_lock:
+
+        timestamp = time.time_ns() // 1_000_000
+        last_timestamp, counter = _uuid7_last
+
+        if timestamp > last_timestamp:
+            counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            # The clock went backwards or did not move. Keeps the previous
+            # timestamp and bumps the counter, borrowing a millisecond when
+            # the counter overflows.
+            timestamp = last_timestamp
+            counter += 1
+            if counter > 0xFFF:
+                timestamp += 1
+                counter = 0
+
+        _uuid7_last = (timestamp, counter)
+
+    random = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+
+    value = timestamp << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= random
+
+    return uuid.UUID(int=value)
+
+
+def delete_rows(model, pks):
+    """ Deletes the rows of `model` whose primary keys are in `pks` with a
+    single DELETE, without the deletion collector or signals. Nothing may still
+    reference the rows. Returns the number of rows deleted. """
+
+    if not pks:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+
+    pk_field = model._meta.pk
+    params = [pk_field.get_db_prep_value(pk, connection) for pk in pks]
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(pk_field.column)
+    placeholders = ", ".join(["%s"] * len(params))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} IN ({placeholders})", params
+        )
+        return cursor.rowcount
+
+
 class UpdateFieldsMixin:
     @staticmethod
     def update_fields(instance, data: dict, fields: list):
         """ Sets instance fields to new value if new value exists. Runs:
-        instance.field = data.get(field, instance.field) on each field. """
+        instance.field = data.get(field, instance.field) on each field.
+
+        Does not save the instance. Saving is left to the caller so each
+        update issues a single UPDATE. See DirtyFieldsMixin """
 
         for field_name in fields:
 
@@ -11,6 +91,97 @@ class UpdateFieldsMixin:
             if field_data is not None:
                 setattr(instance, field_name, field_data)
 
-        instance.save()
+        return instance
+
+
+class DirtyFieldsMixin:
+    """ Tracks the field values last loaded from or saved to the database.
 
+    Saving an existing instance writes only the fields that changed since, via
+    save(update_fields=...), and skips the UPDATE entirely if none did. Columns
+    maintained in the database e.g. with F() expressions are therefore never
+    overwritten by stale in-memory values. """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
         return instance
+
+    def save(self, *args, **kwargs):
+
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            dirty_fields = self.get_dirty_fields()
+            if dirty_fields is not None:
+                # An empty list makes Django skip the save altogether.
+                kwargs["update_fields"] = dirty_fields
+
+        super().save(*args, **kwargs)
+
+        self.set_loaded_values(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Also called to load a deferred field.
+        super().refresh_from_db(using=using, fields=fields)
+        self.set_loaded_values(fields)
+
+    def set_loaded_values(self, fields=None):
+        """ Records the current values of `fields`, or of every loaded field, as
+        the values in the database. Called after a save or a refresh, and by
+        callers writing instances in bulk e.g. with bulk_create(). """
+
+        loaded_values = dict(self.get_loaded_values())
+
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if fields is not None and not (
+                field.name in fields or field.attname in fields
+            ):
+                continue
+            # Stored as prepared values so mutable values e.g. a FieldFile are
+            # not shared with the instance.
+            value = self.__dict__[field.attname]
+            loaded_values[field.attname] = field.get_prep_value(value)
+
+        self._loaded_values = loaded_values
+
+    def get_loaded_values(self):
+        """ Returns the field values as of the last load or save keyed by
+        attname. Deferred fields are missing. """
+        return getattr(self, "_loaded_values", {})
+
+    def get_dirty_fields(self):
+        """ Returns the attnames of the fields changed since the last load or
+        save, or None if the instance has never been loaded or saved. """
+
+        loaded_values = getattr(self, "_loaded_values", None)
+
+        if loaded_values is None:
+            return None
+
+        dirty_fields = []
+
+        for field in self._meta.concrete_fields:
+
+            # Deferred fields that were never accessed are left out.
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+
+            if field.attname not in loaded_values:
+                dirty_fields.append(field.attname)
+                continue
+
+            # Values are compared as they would be written i.e. a FieldFile as
+            # its name and an ISO string as a datetime.
+            old = field.get_prep_value(loaded_values[field.attname])
+            new = field.get_prep_value(self.__dict__[field.attname])
+
+            if old != new:
+                dirty_fields.append(field.attname)
+
+        return dirty_fields
@@ -94,6 +94,7 @@ class NodeAdmin(admin.ModelAdmin):
                     "auto_ocr",
                     "auto_tags",
                     "auto_related",
+                    "duplicate_of",
                 )
             },
         ),
@@ -106,6 +107,7 @@ class NodeAdmin(admin.ModelAdmin):
         "auto_tags",
         "auto_related",
         "auto_ocr",
+        "duplicate_of",
     )
     filter_horizontal = ("tags", "collections")
     autocomplete_fields = ("origin", "source")
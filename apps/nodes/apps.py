@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class NodesConfig(AppConfig):
     name = "apps.nodes"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,140 @@
+from django.db import models
+from django.db.models.functions import Coalesce
+
+
+def adjust(queryset, counter, delta):
+    """ Atomically adds `delta` to the `counter` column of every row in the
+    queryset. A single UPDATE, safe against concurrent adjustments. """
+
+    if not delta:
+        return 0
+
+    return queryset.update(**{counter: models.F(counter) + delta})
+
+
+def count(model, field):
+    """ Returns an expression counting the rows of `model` pointing at the
+    outer row through `field`. Used as the right-hand side of an UPDATE so a
+    whole table is recounted in a single statement grouped by `field`. """
+
+    counts = (
+        model.objects.filter(**{field: models.OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=models.Count("*"))
+        .values("count")
+    )
+
+    return Coalesce(
+        models.Subquery(counts, output_field=models.IntegerField()), models.Value(0)
+    )
+
+
+def total(model, field, column):
+    """ Like count() but sums `column` of the rows. """
+
+    totals = (
+        model.objects.filter(**{field: models.OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=models.Sum(column))
+        .values("total")
+    )
+
+    return Coalesce(
+        models.Subquery(totals, output_field=models.BigIntegerField()),
+        models.Value(0),
+    )
+
+
+def recount(get_model):
+    """ Recomputes every counter column. One UPDATE per counted model.
+
+    `get_model` is either django.apps.apps.get_model or the historical
+    get_model passed to a migration. """
+
+    Node = get_model("nodes", "Node")
+    Source = get_model("nodes", "Source")
+    Individual = get_model("nodes", "Individual")
+    Tag = get_model("nodes", "Tag")
+    Collection = get_model("nodes", "Collection")
+    Origin = get_model("nodes", "Origin")
+
+    NodeTags = Node._meta.get_field("tags").remote_field.through
+    NodeCollections = Node._meta.get_field("collections").remote_field.through
+    SourceIndividuals = Source._meta.get_field("individuals").remote_field.through
+
+    return {
+        "tags": Tag.objects.all().update(node_count=count(NodeTags, "tag")),
+        "collections": Collection.objects.all().update(
+            node_count=count(NodeCollections, "collection")
+        ),
+        "origins": Origin.objects.all().update(node_count=count(Node, "origin")),
+        "sources": Source.objects.all().update(node_count=count(Node, "source")),
+        "individuals": Individual.objects.all().update(
+            source_count=count(SourceIndividuals, "individual")
+        ),
+    }
+
+
+def recount_users(get_model):
+    """ Recomputes User.node_count and User.media_bytes from Node.media_size in
+    a single UPDATE. See apps.nodes.quota """
+
+    Node = get_model("nodes", "Node")
+    User = get_model("users", "User")
+
+    return User.objects.all().update(
+        node_count=count(Node, "user"), media_bytes=total(Node, "user", "media_size")
+    )
+
+
+def adjust_many(queryset, counter, deltas):
+    """ Atomically adds a different delta to the `counter` column of each row
+    keyed by primary key in `deltas`. A single UPDATE for any number of rows. """
+
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+
+    if not deltas:
+        return 0
+
+    cases = [
+        models.When(pk=pk, then=models.Value(delta)) for pk, delta in deltas.items()
+    ]
+
+    return queryset.filter(pk__in=deltas).update(
+        **{
+            counter: models.F(counter)
+            + models.Case(
+                *cases, default=models.Value(0), output_field=models.IntegerField()
+            )
+        }
+    )
+
+
+def tally(queryset, field):
+    """ Returns {pk: rows} counting the rows of `queryset` grouped by the
+    foreign key `field`. """
+
+    counts = (
+        queryset.exclude(**{field: None})
+        .order_by()
+        .values_list(field)
+        .annotate(count=models.Count("*"))
+    )
+
+    return dict(counts)
+
+
+def tally_total(queryset, field, column):
+    """ Returns {pk: (rows, total)} counting the rows of `queryset` and summing
+    their `column` grouped by the foreign key `field`. """
+
+    totals = (
+        queryset.exclude(**{field: None})
+        .order_by()
+        .values_list(field)
+        .annotate(count=models.Count("*"), total=models.Sum(column))
+    )
+
+    return {pk: (count, total or 0) for pk, count, total in totals}
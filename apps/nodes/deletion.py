@@ -0,0 +1,337 @@
+""" Deletes large object graphs in the background, in bounded batches.
+
+Deleting a User, or a Source whose Nodes cascade, through Django's deletion
+collector loads every related object into memory and sends signals for each
+one, in a single transaction. Here a DeletionJob is queued instead and its
+Nodes are deleted DELETION_BATCH_SIZE at a time with NodeManager.delete_many(),
+each batch in its own transaction, followed by their media files. The job's
+progress is written after each batch. An interrupted job is resumed from where
+it stopped since each batch only selects what is left.
+
+settings.DELETION_JOBS picks where jobs run:
+
+    "thread"  A background thread of the process that queued the job, once the
+              queuing transaction commits. Each gunicorn worker also checks for
+              jobs every DELETION_JOB_TIMEOUT seconds. See watch()
+    "worker"  `manage.py run_deletions`, polling for jobs.
+
+A running job not updated for DELETION_JOB_TIMEOUT seconds, e.g. because the
+process running it exited, is claimed again by the next run. Media files left
+behind by an interruption are collected by `manage.py gc_media`. """
+
+import concurrent.futures
+import datetime
+import logging
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from ..api import metrics
+from ..helpers import delete_rows
+from .models import Collection, DeletionJob, Individual, Node, Origin, Source, Tag
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_watcher = None
+
+
+def queue(user, kind, target=None):
+    """ Returns a new DeletionJob, or the same job if it is already pending or
+    running. A running job selects what is left on each batch, so it also
+    deletes Nodes added to its selection since it started. """
+
+    existing = DeletionJob.objects.filter(
+        user=user,
+        kind=kind,
+        target=target,
+        status__in=(DeletionJob.PENDING, DeletionJob.RUNNING),
+    ).first()
+    if existing is not None:
+        return existing
+
+    job = DeletionJob.objects.create(
+        user, kind=kind, target=target, total=get_nodes(kind, user.pk, target).count()
+    )
+
+    if settings.DELETION_JOBS == "thread":
+        transaction.on_commit(_submit)
+
+    return job
+
+
+def get_nodes(kind, user_pk, target):
+
+    if kind == DeletionJob.USER:
+        return Node.objects.filter(user_id=target)
+    elif kind == DeletionJob.SOURCE:
+        return Node.objects.filter(user_id=user_pk, source_id=target)
+    elif kind == DeletionJob.TRASH:
+        return Node.objects.filter(user_id=user_pk, in_trash=True)
+
+    raise ValueError(f"Unknown kind of DeletionJob '{kind}'.")
+
+
+def claim():
+    """ Marks the oldest pending, or interrupted, job as running and returns
+    it. Returns None when there is none. Safe to call from several processes:
+    a job is only claimed by the one whose UPDATE still sees it unclaimed. """
+
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.DELETION_JOB_TIMEOUT)
+
+    candidates = DeletionJob.objects.filter(
+        models.Q(status=DeletionJob.PENDING)
+        | models.Q(status=DeletionJob.RUNNING, date_updated__lt=stale)
+    ).order_by("date_created")
+
+    for job in candidates[:10]:
+
+        claimed = DeletionJob.objects.filter(
+            pk=job.pk, status=job.status, date_updated=job.date_updated
+        ).update(
+            status=DeletionJob.RUNNING,
+            date_started=job.date_started or now,
+            date_updated=now,
+        )
+
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def run(job):
+    """ Runs a claimed job to completion. Returns True if it succeeded. """
+
+    runners = {
+        DeletionJob.USER: _delete_user,
+        DeletionJob.SOURCE: _delete_source,
+        DeletionJob.TRASH: _delete_trash,
+    }
+
+    try:
+        runners[job.kind](job)
+    except Exception:
+        logger.exception("%r failed.", job)
+        _finish(job, DeletionJob.FAILED, error=traceback.format_exc())
+        return False
+
+    _finish(job, DeletionJob.DONE)
+    return True
+
+
+def run_pending():
+    """ Runs jobs until none is left. Returns the number of jobs run. """
+
+    count = 0
+
+    while True:
+        job = claim()
+        if job is None:
+            return count
+        run(job)
+        count += 1
+
+
+def watch(interval=None):
+    """ Runs pending and interrupted jobs now and then every `interval`
+    seconds, DELETION_JOB_TIMEOUT by default, from a daemon thread. Without it
+    a job cut off by a restart of the process running it is only resumed when
+    another job is queued. Called once per gunicorn worker. See
+    gunicorn.conf.py """
+
+    global _watcher
+
+    if _watcher is not None:
+        return
+
+    interval = interval or settings.DELETION_JOB_TIMEOUT
+
+    def loop():
+        while True:
+            _submit()
+            time.sleep(interval)
+
+    _watcher = threading.Thread(target=loop, name="deletion-watch", daemon=True)
+    _watcher.start()
+
+
+def _submit():
+
+    global _executor
+
+    # Created on first use so a server forking after import, e.g. gunicorn
+    # with preload_app, starts the thread in each worker.
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="deletion"
+        )
+
+    _executor.submit(_run_in_thread)
+
+
+def _run_in_thread():
+    try:
+        run_pending()
+    except Exception:
+        logger.exception("Running deletion jobs failed.")
+    finally:
+        # The connections opened by this thread.
+        connections.close_all()
+
+
+def _delete_trash(job):
+    _delete_nodes(job, get_nodes(job.kind, job.user_id, job.target))
+
+
+def _delete_source(job):
+
+    _delete_nodes(job, get_nodes(job.kind, job.user_id, job.target))
+
+    # Only its Individuals are left, through one row each.
+    Source.objects.filter(pk=job.target).delete()
+
+
+def _delete_user(job):
+
+    user_pk = job.target
+
+    _delete_nodes(job, get_nodes(job.kind, None, user_pk))
+
+    # Their Nodes are gone so every other relation is between the user's own
+    # objects. Counters are left alone since every counted row goes too.
+    SourceIndividuals = Source.individuals.through
+    IndividualsAka = Individual.aka.through
+
+    _delete_rows(
+        Source.objects.filter(user_id=user_pk),
+        lambda pks: SourceIndividuals.objects.filter(source__in=pks).delete(),
+    )
+    _delete_rows(
+        Individual.objects.filter(user_id=user_pk),
+        lambda pks: IndividualsAka.objects.filter(
+            models.Q(from_individual__in=pks) | models.Q(to_individual__in=pks)
+        ).delete(),
+    )
+
+    for Model in (Tag, Collection, Origin):
+        _delete_rows(Model.objects.filter(user_id=user_pk))
+
+    get_user_model().objects.filter(pk=user_pk).delete()
+
+
+def _delete_nodes(job, queryset):
+
+    batch_size = settings.DELETION_BATCH_SIZE
+
+    while True:
+
+        with transaction.atomic():
+
+            batch = queryset.order_by("pk").values_list("pk", "media")
+            batch = list(batch[:batch_size])
+            if not batch:
+                return
+
+            pks = [pk for pk, _ in batch]
+            names = {media for _, media in batch if media}
+
+            deleted = Node.objects.delete_many(Node.objects.filter(pk__in=pks))
+            _update_progress(job, deleted)
+
+        # Once the Nodes are gone for good.
+        _delete_files(names)
+
+
+def _delete_rows(queryset, delete_relations=None):
+    """ Deletes the queryset in batches with plain DELETEs. Every relation to
+    the rows must be removed by `delete_relations`, called with each batch's
+    pks. """
+
+    batch_size = settings.DELETION_BATCH_SIZE
+
+    while True:
+
+        with transaction.atomic():
+
+            pks = queryset.order_by("pk").values_list("pk", flat=True)
+            pks = list(pks[:batch_size])
+            if not pks:
+                return
+
+            if delete_relations is not None:
+                delete_relations(pks)
+
+            delete_rows(queryset.model, pks)
+
+
+def _delete_files(names):
+
+    if not names:
+        return
+
+    # Files are not shared between Nodes, but are kept if one still points at
+    # them.
+    referenced = set(
+        Node.objects.filter(media__in=names).values_list("media", flat=True)
+    )
+
+    for name in names - referenced:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.exception("Could not delete %s.", name)
+
+
+def _update_progress(job, deleted):
+
+    job.deleted += deleted
+    job.date_updated = timezone.now()
+
+    DeletionJob.objects.filter(pk=job.pk).update(
+        deleted=models.F("deleted") + deleted, date_updated=job.date_updated
+    )
+
+
+def _finish(job, status, error=""):
+
+    job.status = status
+    job.error = error
+    job.date_finished = job.date_updated = timezone.now()
+
+    DeletionJob.objects.filter(pk=job.pk).update(
+        status=status,
+        error=error,
+        date_finished=job.date_finished,
+        date_updated=job.date_updated,
+    )
+
+
+def _count_jobs():
+
+    statuses = (DeletionJob.PENDING, DeletionJob.RUNNING)
+    counts = dict(
+        DeletionJob.objects.filter(status__in=statuses)
+        .values_list("status")
+        .annotate(count=models.Count("*"))
+        .order_by()
+    )
+
+    return [
+        ({"status": status}, counts.get(status, 0))
+        for status in statuses
+    ]
+
+
+metrics.registry.register_gauge(
+    "hlts_deletion_jobs", "Deletion jobs waiting or running, by status.", _count_jobs
+)
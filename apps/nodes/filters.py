@@ -0,0 +1,187 @@
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import exceptions, filters
+
+from .models import MediaManager, Node, Source
+
+
+class NodeFilter(filters.BaseFilterBackend):
+    """ Filters Nodes by query parameters. Every filter is optional and all
+    given filters must match.
+
+        ?tags=a,b               tagged with any of the Tags
+        ?tags_all=a,b           tagged with all of the Tags
+        ?collections=a,b        in any of the Collections
+        ?source=<uuid>
+        ?individual=<uuid>      from a Source by the Individual
+        ?origin=name
+        ?is_starred=true|false
+        ?in_trash=true|false
+        ?node_type=text|link|image|audio|video|document|misc
+        ?created_after=<iso date/datetime>
+        ?created_before=<iso date/datetime>
+        ?modified_after=<iso date/datetime>
+        ?modified_before=<iso date/datetime>
+
+    Tags, Collections and Individuals are matched with subqueries against
+    their through tables rather than joins. This avoids duplicate rows and,
+    for 'tags_all', compiles to a single grouped subquery no matter how many
+    Tags are passed. """
+
+    NODE_TYPES = ("text", "link", "image", "audio", "video", "document", "misc")
+
+    MEDIA_TYPES = {
+        "image": MediaManager.VALID_IMAGE_TYPES,
+        "audio": MediaManager.VALID_AUDIO_TYPES,
+        "video": MediaManager.VALID_VIDEO_TYPES,
+        "document": MediaManager.VALID_DOCUMENT_TYPES,
+    }
+
+    DATE_FILTERS = {
+        "created_after": "date_created__gte",
+        "created_before": "date_created__lt",
+        "modified_after": "date_modified__gte",
+        "modified_before": "date_modified__lt",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        return self.filter_params(request.user, request.query_params, queryset)
+
+    def filter_params(self, user, params, queryset):
+        """ Filters the queryset by any mapping of parameters i.e. the query
+        parameters or the 'filter' of a bulk request. """
+
+        tags = self._get_list(params, "tags")
+        if tags:
+            queryset = queryset.filter(pk__in=self._tagged_any(user, tags))
+
+        tags_all = self._get_list(params, "tags_all")
+        if tags_all:
+            queryset = queryset.filter(pk__in=self._tagged_all(user, tags_all))
+
+        collections = self._get_list(params, "collections")
+        if collections:
+            through = Node.collections.through.objects.filter(
+                collection__user=user, collection__name__in=collections
+            )
+            queryset = queryset.filter(pk__in=through.values("node"))
+
+        if "source" in params:
+            queryset = queryset.filter(source=self._get_uuid(params, "source"))
+
+        if "individual" in params:
+            individual = self._get_uuid(params, "individual")
+            through = Source.individuals.through.objects
+            sources = through.filter(individual=individual).values("source")
+            queryset = queryset.filter(source__in=sources)
+
+        if "origin" in params:
+            queryset = queryset.filter(origin__name=params["origin"])
+
+        for name in ("is_starred", "in_trash"):
+            if name in params:
+                queryset = queryset.filter(**{name: self._get_bool(params, name)})
+
+        if "node_type" in params:
+            queryset = queryset.filter(self._node_type(params["node_type"]))
+
+        for name, lookup in self.DATE_FILTERS.items():
+            if name in params:
+                queryset = queryset.filter(**{lookup: self._get_date(params, name)})
+
+        return queryset
+
+    def _tagged_any(self, user, names):
+        through = Node.tags.through.objects.filter(
+            tag__user=user, tag__name__in=names
+        )
+        return through.values("node")
+
+    def _tagged_all(self, user, names):
+        return (
+            Node.tags.through.objects.filter(tag__user=user, tag__name__in=names)
+            .values("node")
+            .annotate(count=models.Count("tag", distinct=True))
+            .filter(count=len(names))
+            .values("node")
+        )
+
+    def _node_type(self, node_type):
+
+        if node_type not in self.NODE_TYPES:
+            raise exceptions.ValidationError(
+                {"node_type": f"Must be one of: {', '.join(self.NODE_TYPES)}."}
+            )
+
+        if node_type == "text":
+            return ~models.Q(text="")
+
+        if node_type == "link":
+            return ~models.Q(link="")
+
+        if node_type == "misc":
+            known = models.Q()
+            for suffixes in self.MEDIA_TYPES.values():
+                known |= self._media_suffix(suffixes)
+            return ~models.Q(media="") & ~known
+
+        return self._media_suffix(self.MEDIA_TYPES[node_type])
+
+    @staticmethod
+    def _media_suffix(suffixes):
+        query = models.Q()
+        for suffix in suffixes:
+            query |= models.Q(media__endswith=suffix)
+        return query
+
+    @staticmethod
+    def _get_list(params, name):
+        # Tags and friends are unique to their user so duplicates are dropped
+        # to keep the 'tags_all' count honest.
+        values = {value.strip() for value in params.get(name, "").split(",")}
+        values.discard("")
+        return sorted(values)
+
+    @staticmethod
+    def _get_uuid(params, name):
+        try:
+            return Node._meta.pk.to_python(params[name])
+        except ValidationError:
+            raise exceptions.ValidationError({name: "Must be a valid UUID."})
+
+    @staticmethod
+    def _get_bool(params, name):
+
+        value = params[name].lower()
+
+        if value in ("true", "1"):
+            return True
+        if value in ("false", "0"):
+            return False
+
+        raise exceptions.ValidationError({name: "Must be 'true' or 'false'."})
+
+    @staticmethod
+    def _get_date(params, name):
+
+        value = params[name]
+
+        try:
+            date = parse_datetime(value)
+            if date is None:
+                date = parse_date(value)
+                date = date and datetime.datetime.combine(date, datetime.time.min)
+        except ValueError:
+            date = None
+
+        if date is None:
+            raise exceptions.ValidationError({name: "Must be an ISO 8601 date."})
+
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+
+        return date
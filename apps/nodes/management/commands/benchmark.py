@@ -0,0 +1,260 @@
+import datetime
+import json
+import pathlib
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from ...models import Node, Tag
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the API against a library built with 'gen_library'. "
+        "Reports p50/p95 latency, queries per request and peak memory per "
+        "scenario and stores the results as JSON for comparison between "
+        "commits. Writes are rolled back so runs are repeatable."
+    )
+
+    SCENARIOS = ("list", "detail", "create", "bulk", "search", "merge")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", default="library0@example.com")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(self.SCENARIOS),
+            help=f"Comma separated. Default: {','.join(self.SCENARIOS)}",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Default: tmp/benchmarks/<commit>.json",
+        )
+        parser.add_argument(
+            "--compare", default=None, help="A previous results file to compare to."
+        )
+
+    def handle(self, *args, **options):
+
+        User = get_user_model()
+
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(
+                f"User {options['email']} does not exist. Run 'gen_library' first."
+            )
+
+        scenarios = [name for name in options["scenarios"].split(",") if name]
+        for name in scenarios:
+            if name not in self.SCENARIOS:
+                raise CommandError(f"Unknown scenario '{name}'.")
+
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        results = {}
+        for name in scenarios:
+            request = getattr(self, f"request_{name}")
+            results[name] = self.measure(
+                request, options["iterations"], options["warmup"]
+            )
+            self.stdout.write(self.format_result(name, results[name]))
+
+        commit = self.get_commit()
+
+        report = {
+            "commit": commit,
+            "date": timezone.now().isoformat(),
+            "vendor": connection.vendor,
+            "library": {
+                "email": user.email,
+                "nodes": Node.objects.filter(user=user).count(),
+                "tags": Tag.objects.filter(user=user).count(),
+            },
+            "results": results,
+        }
+
+        output = options["output"]
+        if output is None:
+            output = settings.SITE_ROOT / "tmp" / "benchmarks" / f"{commit}.json"
+
+        output = pathlib.Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+        self.stdout.write(f"Results written to {output}.")
+
+        if options["compare"]:
+            before = json.loads(pathlib.Path(options["compare"]).read_text())
+            self.compare(before, report)
+
+    # Scenarios ---------------------------------------------------------------
+
+    def request_list(self):
+        return self.client.get(reverse("node-list"))
+
+    def request_detail(self):
+        node = self.get_node()
+        return self.client.get(reverse("node-detail", args=[node.pk]))
+
+    def request_create(self):
+        tags = list(self.get_tags(3).values_list("name", flat=True))
+        data = {
+            "id": None,
+            "text": "A benchmark highlight, written and rolled back.",
+            "media": None,
+            "link": "",
+            "source": {
+                "name": "benchmark",
+                "individuals": ["benchmark"],
+                "url": "",
+                "date": "",
+                "notes": "",
+            },
+            "notes": "",
+            "tags": tags,
+            "collections": [],
+            "origin": "benchmark",
+            "in_trash": False,
+            "is_starred": False,
+            "related": [str(self.get_node().pk)],
+            "date_created": None,
+            "date_modified": None,
+        }
+        return self.client.post(reverse("node-list"), data, format="json")
+
+    def request_bulk(self):
+        ids = Node.objects.filter(user=self.user).values_list("pk", flat=True)[:100]
+        data = {
+            "ids": [str(pk) for pk in ids],
+            "set": {"is_starred": True},
+            "add": {"tags": ["benchmark"]},
+        }
+        return self.client.patch(reverse("node-bulk"), data, format="json")
+
+    def request_search(self):
+        tags = ",".join(self.get_tags(2).values_list("name", flat=True))
+        after = (timezone.now() - datetime.timedelta(days=365)).date().isoformat()
+        return self.client.get(
+            reverse("node-list"), {"tags": tags, "created_after": after}
+        )
+
+    def request_merge(self):
+        names = list(self.get_tags(4).values_list("name", flat=True))
+        data = {"which": "tags", "into": names[0], "merging": names[1:]}
+        return self.client.post(reverse("merge"), data, format="json")
+
+    def get_node(self):
+        return Node.objects.filter(user=self.user).order_by("pk").first()
+
+    def get_tags(self, count):
+        return Tag.objects.filter(user=self.user).order_by("-node_count")[:count]
+
+    # Measurement -------------------------------------------------------------
+
+    def measure(self, request, iterations, warmup):
+
+        for _ in range(warmup):
+            self.run(request)
+
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                self.run(request)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+
+        # Measured separately as tracing slows every allocation down.
+        tracemalloc.start()
+        try:
+            self.run(request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+
+        return {
+            "iterations": iterations,
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[int((len(timings) - 1) * 0.95)], 3),
+            "queries": max(queries),
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def run(self, request):
+        """ Runs the request in a transaction that is always rolled back. """
+
+        try:
+            with transaction.atomic():
+                response = request()
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f"{response.status_code} {response.request['PATH_INFO']}: "
+                        f"{getattr(response, 'data', '')}"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    # Reporting ---------------------------------------------------------------
+
+    @staticmethod
+    def format_result(name, result):
+        return (
+            f"{name:<8} "
+            f"p50 {result['p50_ms']:>9.2f}ms  "
+            f"p95 {result['p95_ms']:>9.2f}ms  "
+            f"{result['queries']:>4} queries  "
+            f"{result['peak_kib']:>9.1f}KiB"
+        )
+
+    def compare(self, before, after):
+
+        self.stdout.write(f"Compared to {before['commit']}:")
+
+        for name, result in after["results"].items():
+
+            previous = before["results"].get(name)
+            if previous is None:
+                continue
+
+            changes = []
+            for key in ("p50_ms", "p95_ms", "queries", "peak_kib"):
+                if previous[key]:
+                    change = (result[key] - previous[key]) / previous[key] * 100
+                    changes.append(f"{key} {change:+.0f}%")
+
+            self.stdout.write(f"{name:<8} {'  '.join(changes)}")
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.SITE_ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return "unknown"
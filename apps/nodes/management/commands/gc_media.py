@@ -0,0 +1,216 @@
+import collections
+import concurrent.futures
+import os
+import pathlib
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Node
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes, or moves to --quarantine, the files under MEDIA_ROOT/user_<pk>/ "
+        "that no Node references and that are older than --grace hours. User "
+        "directories are scanned in parallel and only the names referenced by "
+        "the user being collected are held in memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=float,
+            default=24,
+            help=(
+                "Only collect files last modified this many hours ago. Uploads "
+                "are written before their Node is saved. Default: 24"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be collected without touching any file.",
+        )
+        parser.add_argument(
+            "--quarantine",
+            default=None,
+            help="Move files to this directory, keeping their paths, instead.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(8, os.cpu_count() or 1),
+            help="Directories scanned at once.",
+        )
+        parser.add_argument("--verbose", action="store_true")
+
+    def handle(self, *args, **options):
+
+        root = pathlib.Path(settings.MEDIA_ROOT)
+        if not root.is_dir():
+            raise CommandError(f"MEDIA_ROOT {root} is not a directory.")
+
+        quarantine = options["quarantine"]
+        if quarantine is not None:
+            quarantine = pathlib.Path(quarantine).resolve()
+            if quarantine == root.resolve() or root.resolve() in quarantine.parents:
+                raise CommandError("--quarantine must be outside of MEDIA_ROOT.")
+
+        self.root = root
+        self.quarantine = quarantine
+        self.dry_run = options["dry_run"]
+        self.verbose = options["verbose"]
+        self.cutoff = time.time() - options["grace"] * 3600
+        self.stats = collections.Counter()
+
+        start = time.perf_counter()
+
+        with concurrent.futures.ThreadPoolExecutor(options["workers"]) as executor:
+            for user_pk, files in bounded_map(
+                executor, scan_user, get_user_dirs(root), options["workers"] * 2
+            ):
+                self.collect(user_pk, files)
+
+        self.report(time.perf_counter() - start)
+
+    def collect(self, user_pk, files):
+        """ `files` are the (name, size, mtime) of a user's directory. Names are
+        relative to MEDIA_ROOT as in Node.media """
+
+        referenced = set(
+            Node.objects.filter(user_id=user_pk)
+            .exclude(media="")
+            .values_list("media", flat=True)
+            .iterator()
+        )
+
+        for name, size, mtime in files:
+
+            self.stats["scanned"] += 1
+            self.stats["scanned_bytes"] += size
+
+            if name in referenced:
+                continue
+
+            if mtime > self.cutoff:
+                self.stats["recent"] += 1
+                continue
+
+            self.stats["unreferenced"] += 1
+            self.stats["unreferenced_bytes"] += size
+
+            if self.verbose:
+                self.stdout.write(name)
+
+            if self.dry_run:
+                continue
+
+            try:
+                self.remove(name)
+            except OSError as error:
+                self.stats["errors"] += 1
+                self.stderr.write(f"{name}: {error}")
+
+    def remove(self, name):
+
+        path = self.root / name
+
+        if self.quarantine is None:
+            path.unlink()
+        else:
+            destination = self.quarantine / name
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), str(destination))
+
+    def report(self, elapsed):
+
+        stats = self.stats
+
+        if self.dry_run:
+            action = "Would collect"
+        elif self.quarantine:
+            action = "Quarantined"
+        else:
+            action = "Deleted"
+
+        self.stdout.write(
+            f"Scanned {stats['scanned']} files ({format_size(stats['scanned_bytes'])}) "
+            f"in {elapsed:.1f}s, {stats['scanned'] / max(elapsed, 1e-6):.0f} files/s."
+        )
+        self.stdout.write(
+            f"{action} {stats['unreferenced'] - stats['errors']} unreferenced files "
+            f"({format_size(stats['unreferenced_bytes'])}). Kept {stats['recent']} "
+            f"unreferenced files within the grace period."
+        )
+
+        if stats["errors"]:
+            self.stdout.write(f"Failed on {stats['errors']} files.")
+
+
+def get_user_dirs(root):
+    """ Yields the (user pk, path) of the MEDIA_ROOT/user_<pk>/ directories. See
+    apps.users.models.User.dir_media """
+
+    with os.scandir(root) as entries:
+        for entry in entries:
+
+            if not entry.name.startswith("user_") or not entry.is_dir():
+                continue
+
+            try:
+                user_pk = uuid.UUID(entry.name[len("user_") :])
+            except ValueError:
+                continue
+
+            yield user_pk, entry.path
+
+
+def scan_user(user_dir):
+    """ Returns the user pk and the (name, size, mtime) of every file under the
+    user's directory. """
+
+    user_pk, path = user_dir
+    root = pathlib.Path(path).parent
+    files = []
+
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    name = pathlib.Path(entry.path).relative_to(root).as_posix()
+                    files.append((name, stat.st_size, stat.st_mtime))
+
+    return user_pk, files
+
+
+def bounded_map(executor, function, iterable, size):
+    """ Like executor.map() but with at most `size` calls pending, so results
+    are not accumulated faster than they are consumed. """
+
+    pending = collections.deque()
+
+    for item in iterable:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= size:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def format_size(size):
+
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+    return f"{size:.1f}TB"
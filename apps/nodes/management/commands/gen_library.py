@@ -0,0 +1,221 @@
+import datetime
+import itertools
+import random
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ... import counters
+from ...models import Collection, Individual, Node, Origin, Source, Tag
+
+
+WORDS = (
+    "the of and to in is was that for it as with his on be at by had are but "
+    "from or have an they which one you were her all she there would their we "
+    "him been has when who will more no if out so said what up its about into "
+    "than them can only other new some could time these two may then do first "
+    "any my now such like our over man me even most made after also did many "
+    "before must through back years where much your way well down should "
+    "because each just those people how too little state good very make world "
+    "still own see men work long get here between both life being under never "
+    "day same another know while last might us great old year off come since "
+    "against go came right used take three light memory river silence garden "
+    "winter letter mirror window shadow stone ocean forest morning evening"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic libraries for benchmarking. Tags, Collections "
+        "and Sources are drawn from Zipfian distributions so a few are used "
+        "by most Nodes and most are used by a few. Everything is written "
+        "with bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1)
+        parser.add_argument("--nodes", type=int, default=1000, help="Per user.")
+        parser.add_argument("--tags", type=int, default=200, help="Per user.")
+        parser.add_argument("--tags-per-node", type=int, default=3)
+        parser.add_argument("--collections", type=int, default=20, help="Per user.")
+        parser.add_argument("--sources", type=int, default=100, help="Per user.")
+        parser.add_argument("--individuals", type=int, default=50, help="Per user.")
+        parser.add_argument("--origins", type=int, default=5, help="Per user.")
+        parser.add_argument("--related-per-node", type=int, default=1)
+        parser.add_argument(
+            "--zipf", type=float, default=1.1, help="Zipf exponent. Default: 1.1"
+        )
+        parser.add_argument("--email", default="library{}@example.com")
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per INSERT. Default: the largest the database allows.",
+        )
+
+    def handle(self, *args, **options):
+
+        if "{}" not in options["email"]:
+            raise CommandError("--email must contain '{}' e.g. library{}@example.com")
+
+        self.random = random.Random(options["seed"])
+        self.options = options
+
+        User = get_user_model()
+
+        for index in range(options["users"]):
+
+            email = options["email"].format(index)
+
+            if User.objects.filter(email=email).exists():
+                raise CommandError(f"User {email} already exists.")
+
+            with transaction.atomic():
+                user = User.objects.create_user(email, options["password"])
+                nodes = self.generate(user)
+
+            self.stdout.write(f"Generated {nodes} Nodes for {email}.")
+
+        with transaction.atomic():
+            counters.recount(apps.get_model)
+            counters.recount_users(apps.get_model)
+
+    def generate(self, user):
+
+        options = self.options
+        batch_size = options["batch_size"]
+
+        tags = self.bulk_create_named(Tag, user, "tag", options["tags"])
+        collections = self.bulk_create_named(
+            Collection, user, "collection", options["collections"]
+        )
+        origins = self.bulk_create_named(Origin, user, "origin", options["origins"])
+        individuals = self.bulk_create_named(
+            Individual, user, "individual", options["individuals"]
+        )
+        sources = self.bulk_create_named(Source, user, "source", options["sources"])
+
+        # Most Sources have a single Individual, a few have several.
+        if individuals:
+            Source.individuals.through.objects.bulk_create(
+                [
+                    Source.individuals.through(source=source, individual=individual)
+                    for source in sources
+                    for individual in set(
+                        self.zipf_sample(individuals, self.zipf_count(3))
+                    )
+                ],
+                batch_size=batch_size,
+            )
+
+        now = timezone.now()
+        span = datetime.timedelta(days=3 * 365).total_seconds()
+
+        nodes = []
+        for _ in range(options["nodes"]):
+            node = Node(
+                user=user,
+                text=self.sentence(),
+                notes=self.sentence() if self.random.random() < 0.2 else "",
+                source=self.zipf_choice(sources),
+                origin=self.zipf_choice(origins),
+                is_starred=self.random.random() < 0.1,
+                in_trash=self.random.random() < 0.02,
+                date_created=now
+                - datetime.timedelta(seconds=self.random.random() * span),
+            )
+            # Node.save() is skipped by bulk_create().
+            node.set_simhash()
+            nodes.append(node)
+
+        Node.objects.bulk_create(nodes, batch_size=batch_size)
+
+        tags_per_node = options["tags_per_node"]
+        if tags and tags_per_node:
+            Node.tags.through.objects.bulk_create(
+                [
+                    Node.tags.through(node=node, tag=tag)
+                    for node in nodes
+                    for tag in set(
+                        self.zipf_sample(tags, self.zipf_count(tags_per_node))
+                    )
+                ],
+                batch_size=batch_size,
+            )
+
+        if collections:
+            Node.collections.through.objects.bulk_create(
+                [
+                    Node.collections.through(node=node, collection=collection)
+                    for node in nodes
+                    if self.random.random() < 0.3
+                    for collection in set(self.zipf_sample(collections, 1))
+                ],
+                batch_size=batch_size,
+            )
+
+        # Symmetric relations are written in both directions.
+        # See NodeManager.set_related()
+        pairs = {
+            pair
+            for node in nodes
+            for other in self.random.sample(
+                nodes, min(len(nodes), options["related_per_node"])
+            )
+            if other is not node
+            for pair in ((node.pk, other.pk), (other.pk, node.pk))
+        }
+        Node.related.through.objects.bulk_create(
+            [Node.related.through(from_node_id=a, to_node_id=b) for a, b in pairs],
+            batch_size=batch_size,
+        )
+
+        return len(nodes)
+
+    def bulk_create_named(self, Model, user, prefix, count):
+
+        width = len(str(count))
+        objs = [
+            Model(user=user, name=f"{prefix}-{index:0{width}}")
+            for index in range(count)
+        ]
+
+        return Model.objects.bulk_create(objs, batch_size=self.options["batch_size"])
+
+    def zipf_weights(self, population):
+
+        key = len(population)
+        cache = self.__dict__.setdefault("_zipf_weights", {})
+
+        if key not in cache:
+            exponent = self.options["zipf"]
+            weights = (1 / rank ** exponent for rank in range(1, key + 1))
+            cache[key] = list(itertools.accumulate(weights))
+
+        return cache[key]
+
+    def zipf_sample(self, population, count):
+        if not population or not count:
+            return []
+        return self.random.choices(
+            population, cum_weights=self.zipf_weights(population), k=count
+        )
+
+    def zipf_choice(self, population):
+        sample = self.zipf_sample(population, 1)
+        return sample[0] if sample else None
+
+    def zipf_count(self, mean):
+        """ A count between 1 and 2 * mean, skewed towards 1. """
+        if mean < 1:
+            return 0
+        return 1 + min(int(self.random.expovariate(1 / mean)), 2 * mean - 1)
+
+    def sentence(self):
+        words = self.random.choices(WORDS, k=self.random.randint(8, 40))
+        return " ".join(words).capitalize() + "."
@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ... import counters, quota
+from ...models import Node
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every user's node_count and media_bytes storage counters in "
+        "a single UPDATE. With --measure, first re-reads each Node's media size "
+        "from storage. See apps.nodes.quota"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--measure",
+            action="store_true",
+            help="Re-read the size of every media file from storage.",
+        )
+
+    def handle(self, *args, **options):
+
+        if options["measure"]:
+            changed = quota.measure(Node.objects.all())
+            self.stdout.write(f"Corrected the media size of {changed} Nodes.")
+
+        with transaction.atomic():
+            recounted = counters.recount_users(apps.get_model)
+
+        self.stdout.write(f"Recounted {recounted} users.")
@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ... import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the denormalized node_count, source_count and media_bytes "
+        "columns."
+    )
+
+    def handle(self, *args, **options):
+
+        with transaction.atomic():
+            recounted = counters.recount(apps.get_model)
+            recounted["users"] = counters.recount_users(apps.get_model)
+
+        for name, rows in recounted.items():
+            self.stdout.write(f"Recounted {rows} {name}.")
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ... import deletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued deletions of users, sources and trash, once or every "
+        "--every seconds until interrupted. Needed with DELETION_JOBS='worker'. "
+        "See apps.nodes.deletion"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=None,
+            help="Keep polling for jobs every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+
+        while True:
+
+            while True:
+                job = deletion.claim()
+                if job is None:
+                    break
+
+                self.stdout.write(f"Running {job.kind} job {job.pk}.")
+                succeeded = deletion.run(job)
+                self.stdout.write(
+                    f"{'Finished' if succeeded else 'Failed'} {job.kind} job "
+                    f"{job.pk}: {job.deleted}/{job.total} Nodes deleted."
+                )
+
+            if options["every"] is None:
+                break
+
+            time.sleep(options["every"])
@@ -0,0 +1,76 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.nodes.simhash import SimHash
+
+
+def set_simhashes(apps, schema_editor):
+    Node = apps.get_model("nodes", "Node")
+
+    for node in Node.objects.exclude(text="").only("id", "text").iterator():
+        simhash = SimHash.from_text(node.text)
+        if simhash is None:
+            continue
+        fields = {"simhash": simhash.signed}
+        for band, value in enumerate(simhash.bands):
+            fields[f"simhash_band{band}"] = value
+        Node.objects.filter(pk=node.pk).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0002_auto_20190708_0308'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='nodes.Node'),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='simhash_band0',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='simhash_band1',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='simhash_band2',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='simhash_band3',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'simhash_band0'], name='nodes_node_user_id_890083_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'simhash_band1'], name='nodes_node_user_id_262045_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'simhash_band2'], name='nodes_node_user_id_92e89a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'simhash_band3'], name='nodes_node_user_id_c0e06a_idx'),
+        ),
+        migrations.RunPython(set_simhashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:45
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count(model, field):
+    """ A frozen copy of apps.nodes.counters.count() so later edits to it do
+    not change this migration. """
+
+    counts = (
+        model.objects.filter(**{field: models.OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=models.Count("*"))
+        .values("count")
+    )
+
+    return Coalesce(
+        models.Subquery(counts, output_field=models.IntegerField()), models.Value(0)
+    )
+
+
+def recount(apps, schema_editor):
+
+    Node = apps.get_model("nodes", "Node")
+    Source = apps.get_model("nodes", "Source")
+
+    NodeTags = Node._meta.get_field("tags").remote_field.through
+    NodeCollections = Node._meta.get_field("collections").remote_field.through
+    SourceIndividuals = Source._meta.get_field("individuals").remote_field.through
+
+    apps.get_model("nodes", "Tag").objects.all().update(
+        node_count=count(NodeTags, "tag")
+    )
+    apps.get_model("nodes", "Collection").objects.all().update(
+        node_count=count(NodeCollections, "collection")
+    )
+    apps.get_model("nodes", "Origin").objects.all().update(
+        node_count=count(Node, "origin")
+    )
+    Source.objects.all().update(node_count=count(Node, "source"))
+    apps.get_model("nodes", "Individual").objects.all().update(
+        source_count=count(SourceIndividuals, "individual")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0003_node_simhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='individual',
+            name='source_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='origin',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
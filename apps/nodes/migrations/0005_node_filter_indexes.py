@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'in_trash', 'date_created'], name='nodes_node_user_id_6ec872_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='node',
+            index=models.Index(fields=['user', 'is_starred'], name='nodes_node_user_id_9bc6a4_idx'),
+        ),
+    ]
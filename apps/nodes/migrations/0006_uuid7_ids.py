@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:59
+
+import apps.helpers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0005_node_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='collection',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='individual',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='node',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='origin',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='source',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='id',
+            field=models.UUIDField(default=apps.helpers.uuid7, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-19 00:51
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_nodes(apps, schema_editor):
+    """ Sets User.node_count in a single UPDATE. A frozen copy of
+    apps.nodes.counters.recount_users() so later edits to it do not change this
+    migration.
+
+    Media sizes start at 0 and are not read from storage here, which would take
+    one call per Node on object storage. Run `manage.py reconcile_storage
+    --measure` once deployed. """
+
+    Node = apps.get_model("nodes", "Node")
+    User = apps.get_model("users", "User")
+
+    counts = (
+        Node.objects.filter(user=models.OuterRef("pk"))
+        .order_by()
+        .values("user")
+        .annotate(count=models.Count("*"))
+        .values("count")
+    )
+
+    User.objects.all().update(
+        node_count=Coalesce(
+            models.Subquery(counts, output_field=models.IntegerField()),
+            models.Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nodes', '0007_deletion_job'),
+        ('users', '0002_storage_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='media_size',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_nodes, migrations.RunPython.noop),
+    ]
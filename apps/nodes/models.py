@@ -3,18 +3,19 @@ from __future__ import annotations
 # https://stackoverflow.com/a/49872353
 
 import pathlib
-import uuid
 from typing import List
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.db import connections, models, router, transaction
 from django.utils import timezone
 
-from ..helpers import UpdateFieldsMixin
+from ..helpers import DirtyFieldsMixin, UpdateFieldsMixin, delete_rows, uuid7
+from . import counters, quota
+from .simhash import SimHash
 
 
-class TimestampedModel(models.Model):
+class TimestampedModel(DirtyFieldsMixin, models.Model):
 
     date_created = models.DateTimeField(default=timezone.now)
     date_modified = models.DateTimeField(null=True, blank=True)
@@ -26,8 +27,21 @@ class TimestampedModel(models.Model):
         return self.__str__()
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            self.modified = timezone.now()
+
+        # 'date_modified' is only set when something is actually written and
+        # was not set explicitly. See apps.helpers.DirtyFieldsMixin
+        if not self._state.adding:
+
+            update_fields = kwargs.get("update_fields")
+            changed = (
+                self.get_dirty_fields() if update_fields is None else update_fields
+            )
+
+            if changed is None or (changed and "date_modified" not in changed):
+                self.date_modified = timezone.now()
+                if update_fields is not None:
+                    kwargs["update_fields"] = [*update_fields, "date_modified"]
+
         super().save(*args, **kwargs)
 
 
@@ -83,7 +97,6 @@ class IndividualManager(UpdateFieldsMixin, models.Manager):
 
         obj = super().create(user=user, **data)
         obj.aka.set(aka_objs)
-        obj.save()
 
         return obj
 
@@ -107,7 +120,7 @@ class Individual(TimestampedModel, models.Model):
         get_user_model(), related_name="individuals", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
     name = models.CharField(max_length=256)
     first_name = models.CharField(max_length=256, blank=True)
     last_name = models.CharField(max_length=256, blank=True)
@@ -122,6 +135,8 @@ class Individual(TimestampedModel, models.Model):
     # If related, all variants would be considered the same individual.
     aka = models.ManyToManyField("self", blank=True)
 
+    source_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = IndividualManager()
 
     class Meta:
@@ -153,145 +168,179 @@ class Individual(TimestampedModel, models.Model):
 
         return items
 
-    @classmethod
-    def get_pks(cls, user, individuals):
-        """ Returns a set of primary keys from a list of various types of
-        Individuals. Types include integers, model instances and strings.
 
-        Used in Source.ojects.get() and Source.validate_unique_together() for
-        checking the uniqueness between one set of Source/Individuals and
-        another."""
+class SourceResolution:
+    """ Resolves a Source's Individuals and finds any existing Source with the
+    same user, name and set of Individuals. Built once per request and shared
+    between validation and creation so neither repeats the other's queries.
 
-        individuals = cls.validate_type(individuals)
+    See apps.nodes.serializers.SourceSerializer and
+    Source.validate_unique_together() """
 
-        # Case List[int]:
-        # ---------------------------------------------------------------------
-        # Individual were passed as a list of primary keys. Returns unchanged.
-        #
-        # Case List[str]:
-        # ---------------------------------------------------------------------
-        # Individuals were passed as a list of (presumably) Individual names.
-        # Compiles a list of all existing Individuals that match the list of
-        # name. If no Individual exists (for this current user) then appends
-        # None to the list in its place. This is done to make sure that if the
-        # user is creating a Source that has the same name as an existing
-        # Source but a slighlty different set of Individuals the validation
-        # will not misfire. i.e.
-        #
-        #    Existing Source and Individuals:
-        #    Source: "The Source"
-        #    Individuals: ("John Doe", "Jane Doe")
-        #
-        #    Existing Source with one new Individual:
-        #    Source: "The Source"
-        #    Individuals: ("John Doe", "Jane Doe", "Jinny Doe")
-        #              == ("John Doe", "Jane Doe", None)
-        #              != ("John Doe", "Jane Doe")
-        #
-        # 'None' is appended as a placeholder for a not yet created Individual
-        # object. Otherwise the two Sources would be considered the same and
-        # validation would misfire, returning the existing Source rather than
-        # creating a new Source with a different set of Individuals.
-        #
-        # Case List[obj]:
-        # ---------------------------------------------------------------------
-        # Individuals were passed as a list of Individual objects. Compiles a
-        # set of their primary keys and returns.
-        #
-        # NOTE: This method accomidates a mixed list of Individual pks, names
-        # and objects. Not sure if Django allows or supports mixing model
-        # objects with other types of data.
+    def __init__(self, user, name, individuals):
 
-        individual_pks = []
+        self.user = user
+        self.name = name
+        self.individuals = Individual.validate_type(individuals)
 
-        for individual in individuals:
+        self._candidates = None
 
-            if isinstance(individual, int):
-                pk = individual
+        self._resolve()
 
-            elif isinstance(individual, str):
-                try:
-                    obj = cls.objects.get(name=individual, user=user)
-                    pk = obj.pk
-                except cls.DoesNotExist:
-                    pk = None
+    def _resolve(self):
+        """ Resolves every Individual with a single query. Names without an
+        existing Individual are kept in self.missing to be created. """
+
+        names = {i for i in self.individuals if isinstance(i, str)}
+        pks = {i for i in self.individuals if isinstance(i, int)}
+
+        existing = []
+        if names or pks:
+            existing = Individual.objects.filter(user=self.user).filter(
+                models.Q(name__in=names) | models.Q(pk__in=pks)
+            )
 
-            elif isinstance(individual, cls):
-                pk = individual.pk
+        by_name = {}
+        by_pk = {}
+        for obj in existing:
+            by_name[obj.name] = obj
+            by_pk[obj.pk] = obj
 
-            individual_pks.append(pk)
+        self.resolved = []
+        self.missing = []
 
-        return individual_pks
+        for individual in self.individuals:
+
+            if isinstance(individual, Individual):
+                self.resolved.append(individual)
+
+            elif isinstance(individual, int):
+                if individual not in by_pk:
+                    raise Individual.DoesNotExist(
+                        f"Individual {individual} does not exist."
+                    )
+                self.resolved.append(by_pk[individual])
+
+            elif individual in by_name:
+                self.resolved.append(by_name[individual])
+
+            elif individual not in self.missing:
+                self.missing.append(individual)
+
+    @property
+    def fingerprint(self):
+        """ The set of Individual primary keys or None if any Individual does
+        not exist yet, in which case no existing Source can match. """
+
+        if self.missing:
+            return None
+
+        return frozenset(individual.pk for individual in self.resolved)
+
+    @property
+    def candidates(self):
+        """ Every Source of the user with the same name and exactly the same
+        set of Individuals. A single query. """
+
+        if self._candidates is None:
+
+            fingerprint = self.fingerprint
+
+            if fingerprint is None:
+                self._candidates = []
+            else:
+                matching = models.Q(individuals__in=fingerprint)
+                self._candidates = list(
+                    Source.objects.filter(user=self.user, name=self.name)
+                    .annotate(
+                        total=models.Count("individuals"),
+                        matching=models.Count("individuals", filter=matching),
+                    )
+                    .filter(total=len(fingerprint), matching=len(fingerprint))
+                )
+
+        return self._candidates
+
+    def get_match(self, exclude_pk=None):
+        for source in self.candidates:
+            if source.pk != exclude_pk:
+                return source
+        return None
+
+    def get_or_create_individuals(self):
+        """ Returns every Individual, creating the missing ones with a single
+        INSERT. """
+
+        if self.missing:
+            created = Individual.objects.bulk_create(
+                [Individual(user=self.user, name=name) for name in self.missing]
+            )
+            # So a later save writes only what changed. See
+            # apps.helpers.DirtyFieldsMixin
+            for individual in created:
+                individual.set_loaded_values()
+            self.resolved.extend(created)
+            self.missing = []
+            self._candidates = None
+
+        return self.resolved
 
 
 class SourceManager(UpdateFieldsMixin, models.Manager):
     def get_queryset(self):
         return super().get_queryset()
 
-    def get_or_create(self, user, **data):
+    def get_or_create(self, user, resolution=None, **data):
         """ Overwrites the QuerySet.get_or_create() function:
         via https://github.com/django/django/blob/master/django/db/models/query.py#L536
         """
 
-        source = self.get(user, **data)
+        if resolution is None:
+            resolution = SourceResolution(
+                user, data.get("name", None), data.get("individuals", None)
+            )
+
+        source = resolution.get_match()
 
         if source:
             return source
 
-        return self.create(user, **data)
+        return self.create(user, resolution=resolution, **data)
 
     def get(self, user, **data):
-        """ Returns a Source with a specific set of Individuals. """
-
-        name = data.get("name", None)
-        individuals = data.get("individuals", None)
-        individuals = Individual.validate_type(individuals)
+        """ Returns a Source with a specific set of Individuals. See
+        SourceResolution """
 
-        # Compiles a list of Sources that match the target Source name and
-        # user. Filters the list down by comparing the number of Individuals in
-        # each matching Source to the target Source.
-        sources = (
-            self.get_queryset()
-            .filter(name=name, user=user)
-            .annotate(count=models.Count("individuals"))
-            .filter(count=len(individuals))
+        resolution = SourceResolution(
+            user, data.get("name", None), data.get("individuals", None)
         )
 
-        # Compiles a set of primary keys of the target Souce Individuals.
-        # Compares them against a set from every matching Source. The first
-        # Source with an idential Individual primary key set is returned.
-        #
-        # Seeing as the uniquness of a Source to its Individuals is enforced
-        # with the Source.validate_unique_together() method, we can be sure the
-        # first match is the only match.
-        if sources:
-            new_pks = Individual.get_pks(user, individuals)
-            for source in sources:
-                source_pks = {i.pk for i in source.individuals.all()}
-                if source_pks == new_pks:
-                    return source
+        return resolution.get_match()
 
-        return None
-
-    def create(self, user, **data):
+    def create(self, user, resolution=None, **data):
 
         individuals = data.pop("individuals", None)
-        individuals = Individual.validate_type(individuals)
-        individual_objs = Individual.objects.bulk_get_or_create(user, individuals)
+
+        if resolution is None:
+            resolution = SourceResolution(user, data.get("name", None), individuals)
+
+        individual_objs = resolution.get_or_create_individuals()
 
         obj = super().create(user=user, **data)
-        obj.individuals.set(individual_objs)
-        obj.save()
+        obj.individuals.add(*individual_objs)
 
         return obj
 
-    def update(self, user, instance, **data):
+    def update(self, user, instance, resolution=None, **data):
 
         fields = ["name", "url", "date", "notes"]
 
-        individuals = data.get("individuals")
-        individuals = Individual.validate_type(individuals)
-        individual_objs = Individual.objects.bulk_get_or_create(user, individuals)
+        if resolution is None:
+            resolution = SourceResolution(
+                user, data.get("name", instance.name), data.get("individuals")
+            )
+
+        individual_objs = resolution.get_or_create_individuals()
 
         instance = self.update_fields(instance, data, fields)
         instance.individuals.set(individual_objs)
@@ -306,13 +355,15 @@ class Source(TimestampedModel, models.Model):
         get_user_model(), related_name="sources", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
     name = models.CharField(max_length=256, blank=True)
     individuals = models.ManyToManyField(Individual, blank=True)
     url = models.TextField(blank=True)
     date = models.CharField(max_length=256, blank=True)
     notes = models.TextField(blank=True)
 
+    node_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = SourceManager()
 
     def __str__(self):
@@ -332,9 +383,12 @@ class Source(TimestampedModel, models.Model):
     def validate_unique_together(user, name, individuals, source_pk=None):
         """ Validates that no two sources have the same set of Individuals.
 
-        Raises a bare ValidationError. It is expected that this error is caught
+        Raises a ValidationError. It is expected that this error is caught
         and a message is appeneded to it at the form/serializer level.
 
+        Returns the SourceResolution so callers can create the Source without
+        resolving its Individuals again.
+
         This validator *must* be run anytime a Source is created or updated. """
 
         if not individuals:
@@ -352,39 +406,18 @@ class Source(TimestampedModel, models.Model):
                     f"Unrecognized type {type(individuals[0])} in {individuals}."
                 )
 
-        # Compiles a list of Sources that match the target Source name and user.
-        sources = Source.objects.filter(name=name, user=user)
-
-        # In the case where a Source is being updated, we remove it from the
-        # list of matches. Otherwise it would raise a ValidationError if the
-        # Source's Individuals are not part of the data being updated. It would
-        # find a Source with the same user, name and set of Individuals without
+        # In the case where a Source is being updated, it is excluded from the
+        # matches. Otherwise it would raise a ValidationError if the Source's
+        # Individuals are not part of the data being updated. It would find a
+        # Source with the same user, name and set of Individuals without
         # realizing it had just found the target Source.
-        if source_pk:
-            sources = sources.exclude(pk=source_pk)
-
-        # Filters the list down by comparing the number of Individuals in each
-        # matching Source to the target Source.
-        sources = sources.annotate(count=models.Count("individuals")).filter(
-            count=len(individuals)
-        )
-
-        if not sources:
-            return
-
-        # Compiles a set of primary keys of the target Souce Individuals.
-        # Compares them against a set from every matching Source. A
-        # ValidationError is raised if any of existing Source Individual
-        # primary key sets are idential to the target Source's Individual
-        # primary key set.
+        resolution = SourceResolution(user, name, individuals)
 
-        new_pks = Individual.get_pks(user, individuals)
+        if resolution.get_match(exclude_pk=source_pk):
+            # Target Source already exists with the selected individuals.
+            raise ValidationError("Source already exists.")
 
-        for source in sources:
-            source_pks = {i.pk for i in source.individuals.all()}
-            if source_pks == new_pks:
-                # Target Source already exists with the selected individuals.
-                raise ValidationError()
+        return resolution
 
 
 class TagManager(UpdateFieldsMixin, models.Manager):
@@ -407,9 +440,11 @@ class Tag(TimestampedModel, models.Model):
         get_user_model(), related_name="tags", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
     name = models.CharField(max_length=64)
 
+    node_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = TagManager()
 
     class Meta:
@@ -439,11 +474,13 @@ class Collection(TimestampedModel, models.Model):
         get_user_model(), related_name="collections", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
     name = models.CharField(max_length=64)
     color = models.CharField(max_length=32, blank=True)
     description = models.TextField(blank=True)
 
+    node_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = CollectionManager()
 
     class Meta:
@@ -473,9 +510,11 @@ class Origin(TimestampedModel, models.Model):
         get_user_model(), related_name="origins", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
     name = models.CharField(max_length=64)
 
+    node_count = models.PositiveIntegerField(default=0, editable=False)
+
     objects = OriginManager()
 
     class Meta:
@@ -545,10 +584,24 @@ class NodeManager(UpdateFieldsMixin, models.Manager):
         origin = data.pop("origin", None)
         related = data.pop("related", None)
 
-        obj = super().create(user=user, **data)
+        # Near-duplicates are flagged rather than rejected. Callers that want
+        # to skip them look the duplicate up beforehand and pass it in. See
+        # apps.nodes.views.NodesViewSet.create()
+        if "duplicate_of" not in data:
+            simhash = SimHash.from_text(data.get("text"))
+            data["duplicate_of"] = self.get_duplicate(user, simhash)
 
+        # Foreign keys are resolved before the INSERT so the Node is written
+        # once. Many-to-many relations need the Node to exist.
         if source and any(source.values()):
-            self._set_source(obj, source, user)
+            data["source"] = Source.objects.get_or_create(user, **source)
+
+        if origin:
+            data["origin"], created = Origin.objects.get_or_create(
+                user=user, name=origin
+            )
+
+        obj = super().create(user=user, **data)
 
         if tags:
             self._set_tags(obj, tags, user)
@@ -556,13 +609,8 @@ class NodeManager(UpdateFieldsMixin, models.Manager):
         if collections:
             self._set_collections(obj, collections, user)
 
-        if origin:
-            self._set_origin(obj, origin, user)
-
         if related:
-            obj.related.set(related)
-
-        obj.save()
+            self.set_related(obj, related, created=True)
 
         return obj
 
@@ -599,12 +647,401 @@ class NodeManager(UpdateFieldsMixin, models.Manager):
             self._set_origin(instance, origin, user)
 
         if related:
-            instance.related.set(related)
+            self.set_related(instance, related)
 
         instance.save()
 
         return instance
 
+    def update_many(self, user, queryset, values=None, add=None, remove=None):
+        """ Updates every Node in `queryset` in a single transaction.
+
+        values: {"is_starred": bool, "in_trash": bool}
+            Applied with one UPDATE.
+        add/remove: {"tags": [name, ...], "collections": [name, ...]}
+            Applied with one INSERT or DELETE on each through table.
+
+        Returns a dict of affected row counts. Counters are adjusted in bulk.
+        See apps.nodes.counters """
+
+        values = values or {}
+        add = add or {}
+        remove = remove or {}
+
+        results = {}
+
+        with transaction.atomic():
+
+            pks = list(queryset.values_list("pk", flat=True))
+            queryset = self.get_queryset().filter(pk__in=pks)
+            results["matched"] = len(pks)
+
+            if values:
+                results["updated"] = queryset.update(
+                    **values, date_modified=timezone.now()
+                )
+
+            for name, Model in (("tags", Tag), ("collections", Collection)):
+
+                through = getattr(self.model, name).through
+
+                if add.get(name):
+                    objs = self._bulk_get_or_create_by_name(Model, user, add[name])
+                    results[f"{name}_added"] = self._add_relations(
+                        through, Model, pks, objs
+                    )
+
+                if remove.get(name):
+                    objs = Model.objects.filter(user=user, name__in=remove[name])
+                    results[f"{name}_removed"] = self._remove_relations(
+                        through, Model, pks, objs
+                    )
+
+        return results
+
+    def delete_many(self, queryset, batch_size=500):
+        """ Deletes every Node in `queryset` without loading them.
+
+        Django's deletion collector fetches every Node and sends a pre_delete
+        signal for each one. Here the Nodes are deleted `batch_size` at a time:
+        each batch is locked, its through rows deleted and the counters adjusted
+        with one statement per table, then the Nodes are deleted with a single
+        DELETE. A concurrent delete of the same Nodes waits on the lock and
+        then finds them gone, so counters are adjusted once. Returns the number
+        of Nodes deleted. """
+
+        deleted = 0
+
+        with transaction.atomic():
+
+            pks = list(queryset.values_list("pk", flat=True))
+
+            for start in range(0, len(pks), batch_size):
+                deleted += self._delete_batch(pks[start : start + batch_size])
+
+        return deleted
+
+    def _delete_batch(self, pks):
+
+        pks = list(
+            self.get_queryset()
+            .filter(pk__in=pks)
+            .select_for_update()
+            .values_list("pk", flat=True)
+        )
+        queryset = self.get_queryset().filter(pk__in=pks)
+
+        for field, Model in (("source", Source), ("origin", Origin)):
+            deltas = counters.tally(queryset, field)
+            counters.adjust_many(
+                Model.objects.all(),
+                "node_count",
+                {pk: -count for pk, count in deltas.items()},
+            )
+
+        # See apps.nodes.quota
+        totals = counters.tally_total(queryset, "user", "media_size")
+        for user_pk, (count, media_bytes) in totals.items():
+            quota.adjust(user_pk, nodes=-count, media_bytes=-media_bytes)
+
+        for field, Model in (("tags", Tag), ("collections", Collection)):
+            through = getattr(self.model, field).through
+            self._remove_relations(through, Model, pks, Model.objects.all())
+
+        self.model.auto_tags.through.objects.filter(node__in=pks).delete()
+
+        for field in ("related", "auto_related"):
+            through = getattr(self.model, field).through.objects
+            through.filter(
+                models.Q(from_node__in=pks) | models.Q(to_node__in=pks)
+            ).delete()
+
+        self.get_queryset().filter(duplicate_of__in=pks).update(duplicate_of=None)
+
+        # Every relation to the Nodes has been removed above.
+        return delete_rows(self.model, pks)
+
+    def _bulk_get_or_create_by_name(self, Model, user, names):
+
+        names = set(names)
+        existing = Model.objects.filter(user=user, name__in=names)
+        existing = set(existing.values_list("name", flat=True))
+
+        Model.objects.bulk_create(
+            [Model(user=user, name=name) for name in names - existing],
+            ignore_conflicts=True,
+        )
+
+        return Model.objects.filter(user=user, name__in=names)
+
+    def _add_relations(self, through, Model, node_pks, objs):
+        """ Relates every Node to every object with one INSERT. Returns the
+        number of new relations. """
+
+        field = self._get_through_field(through)
+
+        objs = list(objs)
+        existing = set(
+            through.objects.filter(
+                node__in=node_pks, **{f"{field}__in": objs}
+            ).values_list("node_id", f"{field}_id")
+        )
+
+        new = [
+            through(**{"node_id": node_pk, f"{field}_id": obj.pk})
+            for node_pk in node_pks
+            for obj in objs
+            if (node_pk, obj.pk) not in existing
+        ]
+
+        through.objects.bulk_create(new)
+
+        deltas = {}
+        for row in new:
+            pk = getattr(row, f"{field}_id")
+            deltas[pk] = deltas.get(pk, 0) + 1
+
+        counters.adjust_many(Model.objects.all(), "node_count", deltas)
+
+        return len(new)
+
+    def _remove_relations(self, through, Model, node_pks, objs):
+        """ Removes the relations between the Nodes and objects with one
+        DELETE. Returns the number of removed relations. """
+
+        field = self._get_through_field(through)
+
+        rows = through.objects.filter(node__in=node_pks, **{f"{field}__in": objs})
+        deltas = counters.tally(rows, field)
+        deleted, _ = rows.delete()
+
+        counters.adjust_many(
+            Model.objects.all(),
+            "node_count",
+            {pk: -count for pk, count in deltas.items()},
+        )
+
+        return deleted
+
+    @staticmethod
+    def _get_through_field(through):
+        """ Returns the name of the through model field that is not 'node'
+        i.e. 'tag' or 'collection'. """
+
+        for field in through._meta.get_fields():
+            if field.is_relation and field.name != "node":
+                return field.name
+
+    def set_related(self, instance, nodes, field="related", created=False):
+        """ Sets the symmetric relation `field`, either 'related' or
+        'auto_related', of `instance` to `nodes`, a list of Nodes or primary
+        keys.
+
+        RelatedManager.set() writes each direction of a symmetric relation row
+        by row. Here the current relations are read with one query, diffed
+        against `nodes`, then removed with one DELETE and added, in both
+        directions, with one INSERT. `created` skips the read for a Node that
+        cannot have relations yet. Returns (added, removed) as sets of primary
+        keys. """
+
+        through = getattr(self.model, field).through
+
+        new = {getattr(node, "pk", node) for node in nodes}
+
+        if created:
+            old = set()
+        else:
+            old = set(
+                through.objects.filter(from_node=instance.pk).values_list(
+                    "to_node_id", flat=True
+                )
+            )
+
+        added = new - old
+        removed = old - new
+
+        if removed:
+            rows = through.objects.filter(
+                models.Q(from_node=instance.pk, to_node__in=removed)
+                | models.Q(from_node__in=removed, to_node=instance.pk)
+            )
+            # Fast-deleted with a single DELETE since nothing points at the
+            # through rows and no signal listens to them. See apps.nodes.signals
+            rows.delete()
+
+        if added:
+            through.objects.bulk_create(
+                [
+                    through(from_node_id=a, to_node_id=b)
+                    for pk in added
+                    for a, b in ((instance.pk, pk), (pk, instance.pk))
+                ],
+                ignore_conflicts=True,
+            )
+
+        return added, removed
+
+    def link_source(self, user, source, field="auto_related"):
+        """ Relates every Node of `source` to every other Node of `source`
+        through the symmetric relation `field` with a single INSERT ... SELECT.
+        Existing relations are left untouched. Returns the number of relations
+        written, counting each direction. """
+
+        through = getattr(self.model, field).through
+
+        node_table = self.model._meta.db_table
+        through_table = through._meta.db_table
+
+        # A raw query is not routed by Django. See apps.api.replicas
+        connection = connections[router.db_for_write(through)]
+
+        source_pk = getattr(source, "pk", source)
+        source_pk = Source._meta.pk.get_db_prep_value(source_pk, connection)
+        user_pk = user._meta.pk.get_db_prep_value(user.pk, connection)
+
+        sql = f"""
+            INSERT INTO {through_table} (from_node_id, to_node_id)
+            SELECT a.id, b.id
+            FROM {node_table} a
+            JOIN {node_table} b ON b.source_id = a.source_id AND b.id <> a.id
+            WHERE a.source_id = %s AND a.user_id = %s AND b.user_id = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM {through_table} t
+                WHERE t.from_node_id = a.id AND t.to_node_id = b.id
+            )
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [source_pk, user_pk, user_pk])
+            return cursor.rowcount
+
+    def get_duplicate(self, user, simhash):
+        """ Returns an existing Node whose text is a near-duplicate of the
+        text fingerprinted by `simhash` or None. See apps.nodes.simhash.SimHash
+
+        Candidates are Nodes sharing at least one SimHash band. Each band is
+        indexed so this is a single indexed lookup regardless of how many
+        Nodes the user has. Candidates are then compared bit-wise. """
+
+        if simhash is None:
+            return None
+
+        bands = models.Q()
+        for band, value in enumerate(simhash.bands):
+            bands |= models.Q(**{f"simhash_band{band}": value})
+
+        candidates = (
+            self.get_queryset()
+            .filter(bands, user=user)
+            .only("id", "simhash")
+            .order_by("date_created")
+        )
+
+        for candidate in candidates:
+            if simhash.is_near(SimHash.from_signed(candidate.simhash)):
+                return candidate
+
+        return None
+
+    def get_graph(self, user, pk, depth, limit):
+        """ Returns the neighbourhood of the Node `pk` reached by following
+        'related' and 'auto_related' up to `depth` hops as (nodes, edges).
+
+        The traversal runs in the database as a single recursive query. Each
+        step joins the through tables on the Nodes reached so far, so only
+        their indexed rows are read. UNION discards repeated (node, depth)
+        pairs and `depth` bounds the recursion so cycles terminate.
+
+        The recursion is breadth-first, so rows come out by depth. A Node
+        appears at most once per depth, so the first `limit` * (`depth` + 1)
+        rows hold at least `limit` distinct Nodes and the recursion stops
+        there. At most `limit` Nodes are returned, nearest first. Edges are
+        read from the through tables for the visited Nodes only.
+
+        Nodes are unsaved Node instances carrying only 'id', 'text', 'link',
+        'media' and a 'depth' attribute. Edges are (from_pk, to_pk, kind)
+        tuples where kind is 'related' or 'auto_related'. Returns None if the
+        Node does not exist for the user. """
+
+        node_table = self.model._meta.db_table
+        related_table = self.model.related.through._meta.db_table
+        auto_related_table = self.model.auto_related.through._meta.db_table
+
+        # A raw query is not routed by Django. See apps.api.replicas
+        connection = connections[router.db_for_read(self.model)]
+
+        pk_field = self.model._meta.pk
+        pk = pk_field.get_db_prep_value(pk, connection)
+        user_pk = user._meta.pk.get_db_prep_value(user.pk, connection)
+
+        sql = f"""
+            WITH RECURSIVE
+            graph(id, depth) AS (
+                SELECT id, 0 FROM {node_table} WHERE id = %s AND user_id = %s
+                UNION
+                SELECT edge.to_id, graph.depth + 1
+                FROM graph
+                JOIN (
+                    SELECT from_node_id AS from_id, to_node_id AS to_id
+                    FROM {related_table}
+                    UNION ALL
+                    SELECT from_node_id, to_node_id FROM {auto_related_table}
+                ) edge ON edge.from_id = graph.id
+                JOIN {node_table} node ON node.id = edge.to_id AND node.user_id = %s
+                WHERE graph.depth < %s
+            ),
+            reached(id, depth) AS (
+                SELECT id, depth FROM graph LIMIT %s
+            ),
+            visited(id, depth) AS (
+                SELECT id, MIN(depth) FROM reached
+                GROUP BY id ORDER BY MIN(depth), id LIMIT %s
+            )
+            SELECT
+                'node', node.id, NULL, visited.depth,
+                node.text, node.link, node.media
+            FROM visited
+            JOIN {node_table} node ON node.id = visited.id
+            UNION ALL
+            SELECT 'related', from_node_id, to_node_id, NULL, NULL, NULL, NULL
+            FROM {related_table}
+            WHERE from_node_id < to_node_id
+            AND from_node_id IN (SELECT id FROM visited)
+            AND to_node_id IN (SELECT id FROM visited)
+            UNION ALL
+            SELECT 'auto_related', from_node_id, to_node_id, NULL, NULL, NULL, NULL
+            FROM {auto_related_table}
+            WHERE from_node_id < to_node_id
+            AND from_node_id IN (SELECT id FROM visited)
+            AND to_node_id IN (SELECT id FROM visited)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [pk, user_pk, user_pk, depth, limit * (depth + 1), limit]
+            )
+            rows = cursor.fetchall()
+
+        nodes = []
+        edges = []
+
+        for kind, a, b, _depth, text, link, media in rows:
+            if kind == "node":
+                node = self.model(
+                    id=pk_field.to_python(a), text=text, link=link, media=media
+                )
+                node.depth = _depth
+                nodes.append(node)
+            else:
+                edges.append((pk_field.to_python(a), pk_field.to_python(b), kind))
+
+        if not nodes:
+            return None
+
+        nodes.sort(key=lambda node: node.depth)
+
+        return nodes, edges
+
     def _set_source(self, _obj, source, user):
         source_obj = Source.objects.get_or_create(user, **source)
         _obj.source = source_obj
@@ -646,11 +1083,13 @@ class Node(TimestampedModel, models.Model):
         get_user_model(), related_name="nodes", on_delete=models.CASCADE
     )
 
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True)
+    id = models.UUIDField(default=uuid7, primary_key=True)
 
     text = models.TextField(blank=True)
     link = models.URLField(blank=True)
     media = models.FileField(upload_to=MediaManager.get_folder, blank=True)
+    # Counted into User.media_bytes. See apps.nodes.quota
+    media_size = models.BigIntegerField(default=0, editable=False)
 
     source = models.ForeignKey(Source, on_delete=models.CASCADE, null=True, blank=True)
     notes = models.TextField(blank=True)
@@ -671,8 +1110,35 @@ class Node(TimestampedModel, models.Model):
         "self", blank=True, related_name="auto_related"
     )
 
+    # Near-duplicate detection. See apps.nodes.simhash.SimHash
+    simhash = models.BigIntegerField(null=True, blank=True, editable=False)
+    simhash_band0 = models.IntegerField(null=True, blank=True, editable=False)
+    simhash_band1 = models.IntegerField(null=True, blank=True, editable=False)
+    simhash_band2 = models.IntegerField(null=True, blank=True, editable=False)
+    simhash_band3 = models.IntegerField(null=True, blank=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="duplicates",
+    )
+
     objects = NodeManager()
 
+    class Meta:
+        indexes = [
+            # See apps.nodes.filters.NodeFilter
+            models.Index(fields=["user", "in_trash", "date_created"]),
+            models.Index(fields=["user", "is_starred"]),
+            # See NodeManager.get_duplicate()
+            models.Index(fields=["user", "simhash_band0"]),
+            models.Index(fields=["user", "simhash_band1"]),
+            models.Index(fields=["user", "simhash_band2"]),
+            models.Index(fields=["user", "simhash_band3"]),
+        ]
+
     def __str__(self):
         return f"<{self.__class__.__name__}:{self.display_name}>"
 
@@ -690,6 +1156,44 @@ class Node(TimestampedModel, models.Model):
 
         return ":".join(name)
 
+    def save(self, *args, **kwargs):
+        self.set_simhash()
+        self.set_media_size()
+        super().save(*args, **kwargs)
+
+    def set_media_size(self):
+        """ Records the size of newly set media. Existing files are not read
+        from storage again. """
+
+        dirty_fields = self.get_dirty_fields()
+        if dirty_fields is not None and "media" not in dirty_fields:
+            return
+
+        if not self.media:
+            self.media_size = 0
+            return
+
+        try:
+            self.media_size = self.media.size
+        except (OSError, SuspiciousFileOperation):
+            # A name assigned directly, with no such file in storage.
+            self.media_size = 0
+
+    def set_simhash(self):
+        """ Fingerprints the Node's text. See apps.nodes.simhash.SimHash """
+
+        simhash = SimHash.from_text(self.text)
+
+        if simhash is None:
+            self.simhash = None
+            bands = [None] * SimHash.BANDS
+        else:
+            self.simhash = simhash.signed
+            bands = simhash.bands
+
+        for band, value in enumerate(bands):
+            setattr(self, f"simhash_band{band}", value)
+
     @property
     def node_type(self):
 
@@ -703,3 +1207,72 @@ class Node(TimestampedModel, models.Model):
             _type.append(MediaManager.get_type(self.media.name))
 
         return "/".join(_type)
+
+
+""" Jobs """
+
+
+class DeletionJobManager(models.Manager):
+    def create(self, user, **data):
+        return super().create(user=user, **data)
+
+
+class DeletionJob(models.Model):
+    """ A deletion run in the background, in batches. See apps.nodes.deletion
+
+    Progress is written with UPDATEs rather than save() since a User job
+    deletes the User it points to. """
+
+    USER = "user"
+    SOURCE = "source"
+    TRASH = "trash"
+
+    KIND_CHOICES = [(USER, "User"), (SOURCE, "Source"), (TRASH, "Trash")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        get_user_model(),
+        related_name="deletion_jobs",
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+
+    id = models.UUIDField(default=uuid7, primary_key=True)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    # The pk of the deleted User or Source.
+    target = models.UUIDField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+
+    # Nodes to delete when queued, and deleted so far.
+    total = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    date_created = models.DateTimeField(default=timezone.now)
+    date_started = models.DateTimeField(null=True, blank=True)
+    # Set after every batch. A running job not updated for a while was
+    # interrupted.
+    date_updated = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    objects = DeletionJobManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "date_created"])]
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return f"<{self.__class__.__name__}:{self.kind}:{self.status}>"
@@ -0,0 +1,162 @@
+""" Per-user media storage quota.
+
+User.media_bytes and User.node_count are maintained incrementally as Nodes are
+created, their media replaced and deleted: by signals for single Nodes and by
+NodeManager.delete_many() for many. Each Node records the size of its media in
+Node.media_size when it is set, so deletes never read storage. `manage.py
+reconcile_storage` recomputes both counters in bulk. Media added before
+Node.media_size existed is only measured by `reconcile_storage --measure`.
+
+Uploads are refused with 413 in two places:
+
+    As the media part starts, before any of the file is read, when the
+    request's Content-Length alone exceeds the space left. It includes the
+    multipart framing and other fields so it only ever over-estimates the file.
+    See QuotaUploadHandler
+
+    Once parsed, from the file's exact size. See NodeSerializer.validate_media()
+
+Both read the counter before writing, so concurrent uploads can each pass and
+together go over the quota by at most their own sizes. """
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import uploadhandler
+from django.core.files.storage import default_storage
+from django.db import models
+from rest_framework import exceptions, status
+
+
+class QuotaExceeded(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Storage quota exceeded."
+    default_code = "quota_exceeded"
+
+
+class QuotaUploadHandler(uploadhandler.FileUploadHandler):
+    """ Refuses an upload to `field_name` over the user's quota as soon as its
+    part starts, before any of the file is read. Installed first so no other
+    handler receives the file. `get_freed(user)` returns the bytes a replaced
+    file frees.
+
+    The user is read from the HttpRequest. AuthenticationMiddleware sets it
+    from the session cookie, so it is known while SessionAuthentication parses
+    the body for its CSRF check. REST framework sets it once it authenticates
+    any other request, before the body is parsed. """
+
+    def __init__(self, request, field_name="media", get_freed=None):
+        super().__init__(request)
+        self.field_name = field_name
+        self.get_freed = get_freed
+        self.content_length = None
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        self.content_length = content_length
+
+    def new_file(self, field_name, *args, **kwargs):
+
+        if field_name != self.field_name or not self.content_length:
+            return
+
+        user = getattr(self.request, "user", None)
+        if user is None or not user.is_authenticated:
+            return
+
+        freed = self.get_freed(user) if self.get_freed is not None else 0
+        check(user, self.content_length, freed)
+
+    def receive_data_chunk(self, raw_data, start):
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def get_quota(user):
+    """ Returns the user's quota in bytes, or None if unlimited. """
+
+    quota = user.storage_quota
+    if quota is None:
+        quota = settings.STORAGE_QUOTA
+
+    return quota or None
+
+
+def get_usage(user):
+    """ Reads the counter from the database. request.user may be a cached copy.
+    See apps.users.authentication """
+
+    return (
+        get_user_model()
+        .objects.filter(pk=user.pk)
+        .values_list("media_bytes", flat=True)
+        .get()
+    )
+
+
+def check(user, size, freed=0):
+    """ Raises QuotaExceeded if storing `size` more bytes, once `freed` bytes
+    are released, would put the user over their quota. """
+
+    quota = get_quota(user)
+    if quota is None:
+        return
+
+    available = quota - get_usage(user) + freed
+
+    if size > available:
+        raise QuotaExceeded(
+            f"Storage quota exceeded. {max(available, 0)} of {quota} bytes left."
+        )
+
+
+def adjust(user_pk, nodes=0, media_bytes=0):
+    """ Atomically adds to the user's counters in a single UPDATE. """
+
+    values = {}
+
+    if nodes:
+        values["node_count"] = models.F("node_count") + nodes
+    if media_bytes:
+        values["media_bytes"] = models.F("media_bytes") + media_bytes
+
+    if not values:
+        return 0
+
+    return get_user_model().objects.filter(pk=user_pk).update(**values)
+
+
+def measure(queryset, batch_size=1000):
+    """ Sets Node.media_size from the files in storage, for the Nodes of
+    `queryset`. Missing files count as empty. Returns the number of Nodes whose
+    size changed. """
+
+    Node = queryset.model
+
+    changed = queryset.filter(media="").exclude(media_size=0).update(media_size=0)
+    batch = []
+
+    rows = queryset.exclude(media="").values_list("pk", "media", "media_size")
+
+    for pk, name, size in rows.iterator():
+
+        try:
+            actual = default_storage.size(name)
+        except OSError:
+            actual = 0
+
+        if actual != size:
+            batch.append(Node(pk=pk, media_size=actual))
+
+        if len(batch) >= batch_size:
+            Node.objects.bulk_update(batch, ["media_size"])
+            changed += len(batch)
+            batch = []
+
+    if batch:
+        Node.objects.bulk_update(batch, ["media_size"])
+        changed += len(batch)
+
+    return changed
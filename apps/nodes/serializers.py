@@ -1,19 +1,40 @@
 from django.core.exceptions import FieldDoesNotExist, ValidationError
 from rest_framework import exceptions, serializers, validators
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.reverse import reverse
 
-from .models import Collection, Individual, Node, Origin, Source, Tag
+from . import quota
+from .models import (
+    Collection,
+    DeletionJob,
+    Individual,
+    Node,
+    Origin,
+    Source,
+    Tag,
+)
 
 
 class MetadataMixin:
     def _get_metadata(
-        self, obj, obj_view, connection_queryset, connection_view, request
+        self,
+        obj,
+        obj_view,
+        connection_queryset,
+        connection_view,
+        request,
+        connections_count=None,
     ):
         # TODO: Make this accept connection_queryset and _view as a list.
         # TODO: Make "pk" customizable
 
         url = reverse(obj_view, kwargs={"pk": obj.pk})
-        connections_count = connection_queryset.count()
+
+        # Counted models pass their denormalized counter. See
+        # apps.nodes.counters
+        if connections_count is None:
+            connections_count = connection_queryset.count()
+
         connections = [
             reverse(connection_view, args=[n.pk])  # , request=request)
             for n in connection_queryset
@@ -41,16 +62,76 @@ HiddenCurrentUserField = serializers.HiddenField(
 )
 
 
-class PrimaryKeyToUserField(serializers.PrimaryKeyRelatedField):
-    """ A field requiring a user for retrieveing and appending objects based on
-    their primary keys. """
+class UserQuerySetMixin:
+    """ Filters the field's queryset to the request's user. The filtered
+    queryset is built once per request rather than once per value. """
 
     def get_queryset(self):
         request = self.context.get("request")
-        return self.queryset.filter(user=request.user)
 
+        cached = getattr(self, "_user_queryset", None)
+        if cached is None or cached[0] is not request:
+            cached = (request, self.queryset.filter(user=request.user))
+            self._user_queryset = cached
+
+        # A fresh clone so an evaluated result cache is never shared.
+        return cached[1].all()
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyToUserField(**list_kwargs)
+
+
+class ManyToUserField(serializers.ManyRelatedField):
+    """ The many=True counterpart of the fields below. Validates the whole list
+    with the child's to_internal_value_many() i.e. a single query rather than
+    one per item. """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        return self.child_relation.to_internal_value_many(data)
+
+
+class PrimaryKeyToUserField(UserQuerySetMixin, serializers.PrimaryKeyRelatedField):
+    """ A field requiring a user for retrieveing and appending objects based on
+    their primary keys. """
+
+    default_error_messages = {
+        "does_not_exist_many": 'Invalid pks "{pk_values}" - objects do not exist.'
+    }
 
-class UniqueToUserField(serializers.RelatedField):
+    def to_internal_value_many(self, data):
+        """ Returns the objects for a list of primary keys in the order given,
+        fetched with a single pk__in query. Every missing primary key is
+        reported at once. """
+
+        pks = []
+        for item in data:
+            if self.pk_field is not None:
+                item = self.pk_field.to_internal_value(item)
+            try:
+                pks.append(self.queryset.model._meta.pk.to_python(item))
+            except (ValidationError, TypeError, ValueError):
+                self.fail("incorrect_type", data_type=type(item).__name__)
+
+        objs = {obj.pk: obj for obj in self.get_queryset().filter(pk__in=set(pks))}
+
+        missing = [str(pk) for pk in pks if pk not in objs]
+        if missing:
+            self.fail("does_not_exist_many", pk_values=", ".join(missing))
+
+        return [objs[pk] for pk in pks]
+
+
+class UniqueToUserField(UserQuerySetMixin, serializers.RelatedField):
     """ A field requiring a user for retrieveing objects. Implicitly enfores a
     unique_together contraint with the "user" when creating nested objects in a
     serializer.
@@ -78,13 +159,13 @@ class UniqueToUserField(serializers.RelatedField):
         except FieldDoesNotExist:
             raise
 
-    def get_queryset(self):
-        request = self.context.get("request")
-        return self.queryset.filter(user=request.user)
-
     def to_internal_value(self, data):
         return data
 
+    def to_internal_value_many(self, data):
+        # Values are resolved, or created, by the model managers.
+        return [self.to_internal_value(item) for item in data]
+
     def to_representation(self, obj):
         return getattr(obj, self._unique_field)
 
@@ -96,6 +177,7 @@ class IndividualSerializer(CreateUpdateMixin, MetadataMixin, serializers.Seriali
     name = serializers.CharField(max_length=256)
     first_name = serializers.CharField(max_length=256, allow_blank=True)
     last_name = serializers.CharField(max_length=256, allow_blank=True)
+    source_count = serializers.IntegerField(read_only=True)
 
     date_created = serializers.DateTimeField(read_only=True)
     date_modified = serializers.DateTimeField(read_only=True)
@@ -116,6 +198,7 @@ class IndividualSerializer(CreateUpdateMixin, MetadataMixin, serializers.Seriali
             connection_queryset=obj.source_set.all(),
             connection_view="source-detail",
             request=self.context.get("request"),
+            connections_count=obj.source_count,
         )
 
     class Meta:
@@ -142,6 +225,7 @@ class SourceSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer)
     url = serializers.CharField(allow_blank=True)
     date = serializers.CharField(max_length=256, allow_blank=True)
     notes = serializers.CharField(allow_blank=True)
+    node_count = serializers.IntegerField(read_only=True)
 
     date_created = serializers.DateTimeField(read_only=True)
     date_modified = serializers.DateTimeField(read_only=True)
@@ -155,6 +239,7 @@ class SourceSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer)
             connection_queryset=obj.node_set.all(),
             connection_view="node-detail",
             request=self.context.get("request"),
+            connections_count=obj.node_count,
         )
 
     class Meta:
@@ -174,10 +259,17 @@ class SourceSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer)
             )
 
         try:
-            Source.validate_unique_together(request.user, name, individuals)
+            # The resolution is handed on to SourceManager.create/update so the
+            # Individuals are not looked up a second time.
+            data["resolution"] = Source.validate_unique_together(
+                request.user,
+                name,
+                individuals,
+                source_pk=self.instance.pk if self.instance else None,
+            )
         except ValidationError:
             raise exceptions.ValidationError(
-                f"Source {name} already exists with {', '.join(individuals)}."
+                f"Source {name} already exists with {', '.join(individuals or [])}."
             )
 
         return data
@@ -188,6 +280,7 @@ class TagSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer):
     user = HiddenCurrentUserField
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=64)
+    node_count = serializers.IntegerField(read_only=True)
 
     date_created = serializers.DateTimeField(read_only=True)
     date_modified = serializers.DateTimeField(read_only=True)
@@ -201,6 +294,7 @@ class TagSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer):
             connection_queryset=obj.node_set.all(),
             connection_view="node-detail",
             request=self.context.get("request"),
+            connections_count=obj.node_count,
         )
 
     class Meta:
@@ -221,6 +315,7 @@ class CollectionSerializer(CreateUpdateMixin, MetadataMixin, serializers.Seriali
     name = serializers.CharField(max_length=64)
     color = serializers.CharField(max_length=32, allow_blank=True)
     description = serializers.CharField(allow_blank=True)
+    node_count = serializers.IntegerField(read_only=True)
 
     date_created = serializers.DateTimeField(read_only=True)
     date_modified = serializers.DateTimeField(read_only=True)
@@ -234,6 +329,7 @@ class CollectionSerializer(CreateUpdateMixin, MetadataMixin, serializers.Seriali
             connection_queryset=obj.node_set.all(),
             connection_view="node-detail",
             request=self.context.get("request"),
+            connections_count=obj.node_count,
         )
 
     class Meta:
@@ -252,6 +348,7 @@ class OriginSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer)
     user = HiddenCurrentUserField
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=64)
+    node_count = serializers.IntegerField(read_only=True)
 
     date_created = serializers.DateTimeField(read_only=True)
     date_modified = serializers.DateTimeField(read_only=True)
@@ -265,6 +362,7 @@ class OriginSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer)
             connection_queryset=obj.node_set.all(),
             connection_view="node-detail",
             request=self.context.get("request"),
+            connections_count=obj.node_count,
         )
 
     class Meta:
@@ -329,6 +427,7 @@ class NodeSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer):
     auto_ocr = serializers.CharField(read_only=True)
     auto_tags = serializers.StringRelatedField(many=True, read_only=True)
     auto_related = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    duplicate_of = serializers.PrimaryKeyRelatedField(read_only=True)
 
     date_created = serializers.DateTimeField(allow_null=True)
     date_modified = serializers.DateTimeField(allow_null=True)
@@ -336,17 +435,42 @@ class NodeSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer):
     metadata = serializers.SerializerMethodField()
 
     def get_metadata(self, obj):
+
+        # Combined in Python rather than with a query so prefetched relations
+        # are used. See apps.nodes.views.NodesViewSet
+        connections = list(
+            {
+                node.pk: node
+                for node in [*obj.related.all(), *obj.auto_related.all()]
+            }.values()
+        )
+
         return self._get_metadata(
             obj=obj,
             obj_view="node-detail",
-            connection_queryset=obj.related.all() | obj.auto_related.all(),
+            connection_queryset=connections,
             connection_view="node-detail",
             request=self.context.get("request"),
+            connections_count=len(connections),
         )
 
     class Meta:
         model = Node
 
+    def validate_media(self, value):
+        """ Refuses files that would put the user over their storage quota. A
+        replaced file frees its space. See apps.nodes.quota """
+
+        request = self.context.get("request")
+
+        if value is None or request is None:
+            return value
+
+        freed = self.instance.media_size if isinstance(self.instance, Node) else 0
+        quota.check(request.user, value.size, freed)
+
+        return value
+
     def validate(self, data):
 
         text = data.get("text", None)
@@ -366,6 +490,47 @@ class NodeSerializer(CreateUpdateMixin, MetadataMixin, serializers.Serializer):
         return data
 
 
+class NodeBulkValuesSerializer(serializers.Serializer):
+
+    is_starred = serializers.BooleanField(required=False)
+    in_trash = serializers.BooleanField(required=False)
+
+
+class NodeBulkRelationsSerializer(serializers.Serializer):
+
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=64), required=False
+    )
+    collections = serializers.ListField(
+        child=serializers.CharField(max_length=64), required=False
+    )
+
+
+class NodeBulkSerializer(serializers.Serializer):
+    """ Selects Nodes either by 'ids' or by a 'filter' of the same parameters
+    accepted by apps.nodes.filters.NodeFilter. See
+    apps.nodes.views.NodesViewSet.bulk() """
+
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    filter = serializers.DictField(child=serializers.CharField(), required=False)
+
+    set = NodeBulkValuesSerializer(required=False)
+    add = NodeBulkRelationsSerializer(required=False)
+    remove = NodeBulkRelationsSerializer(required=False)
+
+    def validate(self, data):
+
+        ids = data.get("ids")
+        filter_ = data.get("filter")
+
+        if bool(ids) == bool(filter_):
+            raise exceptions.ValidationError(
+                "Exactly one of 'ids' or 'filter' must be given and not be empty."
+            )
+
+        return data
+
+
 class MergeSerializer(MetadataMixin, serializers.Serializer):
 
     CHOICES = ("sources", "tags", "collections", "origins")
@@ -413,3 +578,26 @@ class MergeSerializer(MetadataMixin, serializers.Serializer):
     def create(self, validated_data):
         # TODO: Process merge here...
         return validated_data
+
+
+class DeletionJobSerializer(serializers.Serializer):
+    """ Read-only. Jobs are queued by the views deleting things. See
+    apps.nodes.deletion """
+
+    id = serializers.ReadOnlyField()
+    url = serializers.SerializerMethodField()
+    kind = serializers.ReadOnlyField()
+    target = serializers.ReadOnlyField()
+    status = serializers.ReadOnlyField()
+    total = serializers.ReadOnlyField()
+    deleted = serializers.ReadOnlyField()
+
+    date_created = serializers.DateTimeField(read_only=True)
+    date_started = serializers.DateTimeField(read_only=True)
+    date_finished = serializers.DateTimeField(read_only=True)
+
+    def get_url(self, obj):
+        return reverse("deletionjob-detail", kwargs={"pk": obj.pk})
+
+    class Meta:
+        model = DeletionJob
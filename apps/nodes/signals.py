@@ -0,0 +1,154 @@
+""" Maintains the denormalized counter columns. See apps.nodes.counters """
+
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters, quota
+from .models import Collection, Individual, Node, Origin, Source, Tag
+
+
+# Through model: (counted model, counter column)
+COUNTED_RELATIONS = {
+    Node.tags.through: (Tag, "node_count"),
+    Node.collections.through: (Collection, "node_count"),
+    Source.individuals.through: (Individual, "source_count"),
+}
+
+# Node foreign key: (counted model, counter column)
+COUNTED_FOREIGN_KEYS = {
+    "source_id": (Source, "node_count"),
+    "origin_id": (Origin, "node_count"),
+}
+
+
+# Connected to the counted relations only. A listener on any other through
+# model would keep the deletion collector from fast-deleting its rows.
+@receiver(m2m_changed, sender=Node.tags.through)
+@receiver(m2m_changed, sender=Node.collections.through)
+@receiver(m2m_changed, sender=Source.individuals.through)
+def count_relations(sender, instance, action, reverse, model, pk_set, **kwargs):
+
+    if sender not in COUNTED_RELATIONS:
+        return
+
+    Counted, counter = COUNTED_RELATIONS[sender]
+
+    # Case reverse=False:
+    # -------------------------------------------------------------------------
+    # i.e. node.tags.add(*tags). 'pk_set' holds the counted objects. Each one
+    # gains or loses a single Node.
+    #
+    # Case reverse=True:
+    # -------------------------------------------------------------------------
+    # i.e. tag.node_set.add(*nodes). 'instance' is the counted object. It gains
+    # or loses len(pk_set) Nodes.
+
+    instance_field = _through_field(sender, instance)
+    model_field = _through_field(sender, model)
+
+    if action == "pre_remove":
+        # Django does not filter 'pk_set' down to existing relations before a
+        # remove. Narrowing it here also narrows the DELETE that follows.
+        related = sender.objects.filter(
+            **{instance_field: instance.pk, f"{model_field}__in": pk_set}
+        ).values_list(f"{model_field}_id", flat=True)
+        related = set(related)
+        pk_set.clear()
+        pk_set.update(related)
+
+    elif action == "pre_clear":
+        related = sender.objects.filter(**{instance_field: instance.pk}).values_list(
+            f"{model_field}_id", flat=True
+        )
+        instance._cleared_pks = set(related)
+
+    elif action in ("post_add", "post_remove", "post_clear"):
+
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_cleared_pks", set())
+
+        delta = -1 if action != "post_add" else 1
+
+        if reverse:
+            counters.adjust(
+                Counted.objects.filter(pk=instance.pk), counter, delta * len(pk_set)
+            )
+        else:
+            counters.adjust(Counted.objects.filter(pk__in=pk_set), counter, delta)
+
+
+@receiver(post_save, sender=Node)
+def count_foreign_keys(sender, instance, created, update_fields, **kwargs):
+
+    # The values loaded before this save. See apps.helpers.DirtyFieldsMixin
+    loaded_values = instance.get_loaded_values()
+
+    for field, (Counted, counter) in COUNTED_FOREIGN_KEYS.items():
+
+        name = field[: -len("_id")]
+        if update_fields is not None and not {name, field} & update_fields:
+            continue
+
+        if created:
+            old = None
+        elif field in loaded_values:
+            old = loaded_values[field]
+        else:
+            continue
+
+        new = getattr(instance, field)
+
+        if old != new:
+            if old is not None:
+                counters.adjust(Counted.objects.filter(pk=old), counter, -1)
+            if new is not None:
+                counters.adjust(Counted.objects.filter(pk=new), counter, 1)
+
+
+@receiver(post_save, sender=Node)
+def count_user(sender, instance, created, update_fields, **kwargs):
+    """ See apps.nodes.quota """
+
+    if created:
+        quota.adjust(instance.user_id, nodes=1, media_bytes=instance.media_size)
+        return
+
+    if update_fields is not None and "media_size" not in update_fields:
+        return
+
+    loaded_values = instance.get_loaded_values()
+    if "media_size" not in loaded_values:
+        return
+
+    quota.adjust(
+        instance.user_id, media_bytes=instance.media_size - loaded_values["media_size"]
+    )
+
+
+@receiver(pre_delete, sender=Node)
+def uncount_node(sender, instance, **kwargs):
+
+    for field, (Counted, counter) in COUNTED_FOREIGN_KEYS.items():
+        pk = getattr(instance, field)
+        if pk is not None:
+            counters.adjust(Counted.objects.filter(pk=pk), counter, -1)
+
+    counters.adjust(Tag.objects.filter(node=instance), "node_count", -1)
+    counters.adjust(Collection.objects.filter(node=instance), "node_count", -1)
+
+    quota.adjust(instance.user_id, nodes=-1, media_bytes=-instance.media_size)
+
+
+@receiver(pre_delete, sender=Source)
+def uncount_source(sender, instance, **kwargs):
+    counters.adjust(Individual.objects.filter(source=instance), "source_count", -1)
+
+
+def _through_field(through, model):
+    """ Returns the name of the through model's foreign key to `model`. """
+
+    model = model if isinstance(model, type) else model.__class__
+
+    for field in through._meta.get_fields():
+        if getattr(field, "related_model", None) is model:
+            return field.name
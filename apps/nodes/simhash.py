@@ -0,0 +1,104 @@
+import hashlib
+import re
+
+
+class SimHash:
+    """ A 64-bit SimHash fingerprint of a Node's text.
+
+    Texts that differ only in whitespace, punctuation or case normalize to the
+    same features and therefore the same fingerprint. Texts that differ by a
+    few words land within a small Hamming distance of one another.
+
+    The fingerprint is split into BANDS equal bands. If two fingerprints are
+    within DISTANCE bits of each other, where DISTANCE < BANDS, then at least
+    one of their bands must be identical. Each band is stored in its own
+    indexed column so near-duplicate candidates can be found with an indexed
+    equality lookup rather than by scanning every Node. See
+    apps.nodes.models.NodeManager.get_duplicate() """
+
+    BITS = 64
+    BANDS = 4
+    BAND_BITS = BITS // BANDS
+    DISTANCE = 3
+
+    _re_non_word = re.compile(r"[\W_]+", re.UNICODE)
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}:{self.value:016x}>"
+
+    def __eq__(self, other):
+        return isinstance(other, SimHash) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    @classmethod
+    def from_text(cls, text):
+        """ Returns a SimHash of the text or None if the text contains no
+        words. """
+
+        features = cls.features(text)
+
+        if not features:
+            return None
+
+        weights = [0] * cls.BITS
+
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            feature_hash = int.from_bytes(digest, "big")
+            for bit in range(cls.BITS):
+                weights[bit] += 1 if feature_hash >> bit & 1 else -1
+
+        value = 0
+        for bit, weight in enumerate(weights):
+            if weight > 0:
+                value |= 1 << bit
+
+        return cls(value)
+
+    @classmethod
+    def from_signed(cls, value):
+        """ Returns a SimHash from a value stored in a signed 64-bit column. """
+
+        if value is None:
+            return None
+
+        return cls(value & ((1 << cls.BITS) - 1))
+
+    @classmethod
+    def features(cls, text):
+        """ Returns the word unigrams and bigrams of the normalized text. """
+
+        if not text:
+            return []
+
+        words = cls._re_non_word.sub(" ", text.lower()).split()
+        bigrams = [" ".join(pair) for pair in zip(words, words[1:])]
+
+        return words + bigrams
+
+    @property
+    def signed(self):
+        """ The value as a signed 64-bit integer i.e. what fits in a
+        BigIntegerField. """
+
+        if self.value >= 1 << (self.BITS - 1):
+            return self.value - (1 << self.BITS)
+        return self.value
+
+    @property
+    def bands(self):
+        mask = (1 << self.BAND_BITS) - 1
+        return [
+            self.value >> (band * self.BAND_BITS) & mask for band in range(self.BANDS)
+        ]
+
+    def distance(self, other):
+        return bin(self.value ^ other.value).count("1")
+
+    def is_near(self, other):
+        return self.distance(other) <= self.DISTANCE
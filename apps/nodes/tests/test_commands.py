@@ -0,0 +1,103 @@
+import io
+import os
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from ..models import Node
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    os.makedirs(settings.MEDIA_ROOT)
+    return tmp_path / "media"
+
+
+def write(path, content=b"content", age=None):
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+    if age is not None:
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    return path
+
+
+@pytest.mark.django_db
+class TestGcMedia:
+    @pytest.fixture
+    def files(self, user, media_root):
+
+        node = Node.objects.create(
+            user, text="Node", media=SimpleUploadedFile("kept.mp3", b"kept")
+        )
+        kept = media_root / node.media.name
+        os.utime(kept, (0, 0))
+
+        day = 24 * 3600
+
+        return {
+            "kept": kept,
+            "orphan": write(media_root / f"user_{user.pk}/audios/old.mp3", age=2 * day),
+            "recent": write(media_root / f"user_{user.pk}/images/new.png", age=60),
+            "deleted_user": write(
+                media_root / "user_00000000-0000-0000-0000-000000000000/misc/a.bin",
+                age=2 * day,
+            ),
+            "foreign": write(media_root / "static/old.css", age=2 * day),
+        }
+
+    def test_delete(self, files):
+
+        output = io.StringIO()
+        call_command("gc_media", stdout=output)
+
+        assert files["kept"].exists()
+        assert not files["orphan"].exists()
+        assert files["recent"].exists()
+        assert not files["deleted_user"].exists()
+        assert files["foreign"].exists()
+
+        assert "Scanned 4 files" in output.getvalue()
+        assert "Deleted 2 unreferenced files" in output.getvalue()
+        assert "Kept 1 unreferenced files" in output.getvalue()
+
+    def test_dry_run(self, files, media_root):
+
+        output = io.StringIO()
+        call_command("gc_media", dry_run=True, verbose=True, stdout=output)
+
+        assert all(path.exists() for path in files.values())
+        assert "Would collect 2 unreferenced files" in output.getvalue()
+        assert files["orphan"].relative_to(media_root).as_posix() in output.getvalue()
+
+    def test_quarantine(self, files, media_root, tmp_path):
+
+        quarantine = tmp_path / "quarantine"
+        call_command("gc_media", quarantine=str(quarantine), stdout=io.StringIO())
+
+        name = files["orphan"].relative_to(media_root)
+
+        assert not files["orphan"].exists()
+        assert (quarantine / name).read_bytes() == b"content"
+        assert files["kept"].exists()
+
+    def test_grace(self, files):
+
+        call_command("gc_media", grace=0, stdout=io.StringIO())
+
+        assert not files["recent"].exists()
+        assert files["kept"].exists()
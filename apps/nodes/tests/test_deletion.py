@@ -0,0 +1,231 @@
+import datetime
+import os
+import threading
+import types
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from .. import deletion
+from ..models import DeletionJob, Individual, Node, Source, Tag
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture
+def other():
+    email = "other@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.DELETION_BATCH_SIZE = 2
+    return tmp_path
+
+
+def get_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def create_nodes(user, count, **data):
+    return [Node.objects.create(user, text=f"Node {i}", **data) for i in range(count)]
+
+
+@pytest.mark.django_db
+class TestDeletion:
+    def test_empty_trash(self, user, media_root):
+
+        trashed = create_nodes(user, 5, in_trash=True, tags=["tag"])
+        kept = create_nodes(user, 2, tags=["tag"])
+
+        with_media = Node.objects.create(
+            user,
+            text="Media",
+            in_trash=True,
+            media=SimpleUploadedFile("audio.mp3", b"audio"),
+        )
+        path = media_root / with_media.media.name
+        assert path.exists()
+
+        response = get_client(user).post(reverse("node-empty-trash"))
+
+        assert response.status_code == 202
+        assert response.data["kind"] == DeletionJob.TRASH
+        assert response.data["status"] == DeletionJob.PENDING
+        assert response.data["total"] == len(trashed) + 1
+
+        assert deletion.run_pending() == 1
+
+        job = DeletionJob.objects.get()
+        assert job.status == DeletionJob.DONE
+        assert job.deleted == len(trashed) + 1
+
+        assert set(Node.objects.all()) == set(kept)
+        assert Tag.objects.get().node_count == len(kept)
+        assert not path.exists()
+
+    def test_queue_pending_once(self, user):
+
+        create_nodes(user, 1, in_trash=True)
+
+        first = deletion.queue(user, DeletionJob.TRASH)
+        second = deletion.queue(user, DeletionJob.TRASH)
+
+        assert first == second
+
+    def test_queue_running_once(self, user):
+
+        create_nodes(user, 1, in_trash=True)
+
+        first = deletion.queue(user, DeletionJob.TRASH)
+        assert deletion.claim() == first
+
+        second = deletion.queue(user, DeletionJob.TRASH)
+
+        assert first == second
+        assert DeletionJob.objects.count() == 1
+
+    def test_destroy_source(self, user):
+
+        create_nodes(user, 3, source={"name": "Source", "individuals": ["A"]})
+        kept = create_nodes(user, 1, source={"name": "Other", "individuals": ["A"]})
+        source = Source.objects.filter(name="Source").get()
+
+        response = get_client(user).delete(reverse("source-detail", args=[source.pk]))
+
+        assert response.status_code == 202
+        assert Source.objects.filter(pk=source.pk).exists()
+
+        deletion.run_pending()
+
+        assert not Source.objects.filter(pk=source.pk).exists()
+        assert list(Node.objects.all()) == kept
+        assert Individual.objects.get().source_count == 1
+
+    def test_delete_user(self, user, other, media_root):
+
+        source = {"name": "Source", "individuals": ["A", "B"]}
+        create_nodes(user, 5, source=source, tags=["tag"], collections=["c"])
+        Node.objects.create(
+            user, text="Media", media=SimpleUploadedFile("image.png", b"image")
+        )
+        kept = create_nodes(other, 1, tags=["tag"])
+
+        deletion.queue(user, DeletionJob.USER, user.pk)
+        deletion.run_pending()
+
+        job = DeletionJob.objects.get()
+        assert job.status == DeletionJob.DONE
+        assert job.deleted == 6
+        assert job.user is None
+
+        assert not get_user_model().objects.filter(pk=user.pk).exists()
+        assert list(Node.objects.all()) == kept
+        assert not Source.objects.exists()
+        assert not Individual.objects.exists()
+        assert list(Tag.objects.values_list("user", "node_count")) == [(other.pk, 1)]
+        assert not os.listdir(media_root / f"user_{user.pk}" / "images")
+
+    def test_admin_delete(self, user, admin_client):
+
+        create_nodes(user, 1)
+
+        response = admin_client.post(
+            reverse("admin:users_user_delete", args=[user.pk]), {"post": "yes"}
+        )
+
+        assert response.status_code == 302
+
+        user.refresh_from_db()
+        assert not user.is_active
+        assert DeletionJob.objects.get().kind == DeletionJob.USER
+
+        deletion.run_pending()
+
+        assert not get_user_model().objects.filter(pk=user.pk).exists()
+
+    def test_failed(self, user, monkeypatch):
+
+        create_nodes(user, 1, in_trash=True)
+        deletion.queue(user, DeletionJob.TRASH)
+
+        def fail(queryset):
+            raise RuntimeError("Failed.")
+
+        monkeypatch.setattr(Node.objects, "delete_many", fail)
+
+        deletion.run_pending()
+
+        job = DeletionJob.objects.get()
+        assert job.status == DeletionJob.FAILED
+        assert "RuntimeError" in job.error
+        assert Node.objects.count() == 1
+
+    def test_claim_interrupted(self, user, settings):
+
+        settings.DELETION_JOB_TIMEOUT = 60
+
+        job = DeletionJob.objects.create(
+            user,
+            kind=DeletionJob.TRASH,
+            status=DeletionJob.RUNNING,
+            date_updated=timezone.now(),
+        )
+
+        assert deletion.claim() is None
+
+        DeletionJob.objects.filter(pk=job.pk).update(
+            date_updated=timezone.now() - datetime.timedelta(seconds=61)
+        )
+
+        assert deletion.claim() == job
+        assert deletion.claim() is None
+
+    def test_watch(self, monkeypatch):
+
+        submitted = threading.Event()
+        sleeping = threading.Event()
+
+        def sleep(seconds):
+            assert seconds == 60
+            sleeping.set()
+            # Parks the thread for good.
+            threading.Event().wait()
+
+        monkeypatch.setattr(deletion, "_watcher", None)
+        monkeypatch.setattr(deletion, "_submit", submitted.set)
+        monkeypatch.setattr(deletion, "time", types.SimpleNamespace(sleep=sleep))
+
+        deletion.watch(interval=60)
+
+        assert submitted.wait(timeout=5)
+        assert sleeping.wait(timeout=5)
+
+    def test_jobs(self, user, other):
+
+        job = deletion.queue(user, DeletionJob.TRASH)
+        deletion.queue(other, DeletionJob.TRASH)
+
+        response = get_client(user).get(reverse("deletionjob-list"))
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.data] == [job.pk]
+
+        response = get_client(user).get(response.data[0]["url"])
+
+        assert response.status_code == 200
+        assert response.data["status"] == DeletionJob.PENDING
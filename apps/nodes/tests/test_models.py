@@ -1,9 +1,25 @@
+import io
+
 import pytest
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from ..models import Collection, Individual, Node, Origin, Source, Tag
+from .. import counters
+from ..models import (
+    Collection,
+    Individual,
+    Node,
+    Origin,
+    Source,
+    SourceResolution,
+    Tag,
+)
+from ..simhash import SimHash
 
 
 @pytest.fixture
@@ -52,6 +68,16 @@ class TestSource:
         assert isinstance(source.__str__(), str)
         assert isinstance(source.__repr__(), str)
 
+    def test_created_individuals_not_dirty(self, user):
+
+        resolution = SourceResolution(user, self.name, self.individuals)
+        individuals = resolution.get_or_create_individuals()
+
+        assert [individual.get_dirty_fields() for individual in individuals] == [
+            [],
+            [],
+        ]
+
     def test_create_minimum(self, user):
         """ Test user can create Source with name or individuals only. """
 
@@ -524,7 +550,69 @@ class TestNode:
             Node.objects.create(user=None, text=self.text)
 
     def test_update(self, user):
-        pass
+
+        node = Node.objects.create(user, text=self.text, is_starred=False)
+
+        node = Node.objects.get(pk=node.pk)
+        updated = Node.objects.update(
+            user, node, text="Node text updated.", is_starred=True
+        )
+
+        assert updated.pk == node.pk
+        assert updated.text == "Node text updated."
+        assert updated.is_starred
+        assert updated.date_modified is not None
+
+    def test_create_writes_once(self, user):
+
+        source = {"name": self.source_name}
+
+        with CaptureQueriesContext(connection) as captured:
+            Node.objects.create(user, text=self.text, source=source, origin="app")
+
+        node_writes = ('INSERT INTO "nodes_node" ', 'UPDATE "nodes_node" ')
+        writes = [
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith(node_writes)
+        ]
+
+        assert len(writes) == 1
+
+    def test_update_writes_changed_fields(self, user, django_assert_num_queries):
+
+        node = Node.objects.create(user, text=self.text)
+        node = Node.objects.get(pk=node.pk)
+
+        with django_assert_num_queries(1) as captured:
+            Node.objects.update(user, node, is_starred=True)
+
+        sql = captured.captured_queries[0]["sql"]
+
+        assert '"is_starred"' in sql
+        assert '"date_modified"' in sql
+        assert '"text"' not in sql
+
+    def test_update_no_op(self, user, django_assert_num_queries):
+
+        node = Node.objects.create(user, text=self.text)
+        node = Node.objects.get(pk=node.pk)
+
+        with django_assert_num_queries(0):
+            Node.objects.update(user, node, text=self.text, is_starred=False)
+
+        assert Node.objects.get(pk=node.pk).date_modified is None
+
+    def test_refresh_not_dirty(self, user):
+
+        node = Node.objects.create(user, text=self.text)
+        Node.objects.filter(pk=node.pk).update(text="Changed.", is_starred=True)
+
+        node.refresh_from_db(fields=["text"])
+        assert node.get_dirty_fields() == []
+
+        node.refresh_from_db()
+        assert node.get_dirty_fields() == []
 
     def test_related(self, user):
 
@@ -536,3 +624,189 @@ class TestNode:
 
         assert node_a in node_b.related.all()
         assert node_b in node_a.related.all()
+
+    def test_ids_time_ordered(self, user):
+
+        nodes = [Node.objects.create(user, text=f"Node {i}.") for i in range(20)]
+
+        assert nodes[0].id.version == 7
+        assert list(Node.objects.order_by("id")) == nodes
+
+    def test_set_related(self, user, django_assert_num_queries):
+
+        node = Node.objects.create(user, text=self.text)
+        node_a, node_b, node_c = [
+            Node.objects.create(user, text=f"Node {i}.") for i in range(3)
+        ]
+
+        Node.objects.set_related(node, [node_a, node_b])
+
+        # One SELECT to diff, one DELETE and one INSERT.
+        with django_assert_num_queries(3):
+            added, removed = Node.objects.set_related(node, [node_b.pk, node_c.pk])
+
+        assert added == {node_c.pk}
+        assert removed == {node_a.pk}
+        assert set(node.related.all()) == {node_b, node_c}
+        assert node in node_c.related.all()
+        assert node not in node_a.related.all()
+
+    def test_link_source(self, user):
+
+        source = {"name": self.source_name}
+        nodes = [
+            Node.objects.create(user, text=f"Node {i}.", source=source)
+            for i in range(3)
+        ]
+        other = Node.objects.create(user, text=self.text)
+
+        nodes[0].auto_related.add(nodes[1])
+
+        written = Node.objects.link_source(user, nodes[0].source)
+
+        assert written == 4
+        for node in nodes:
+            assert set(node.auto_related.all()) == set(nodes) - {node}
+        assert not other.auto_related.exists()
+
+    def test_simhash(self, user):
+        """ Test Node text is fingerprinted on save. """
+
+        node = Node.objects.create(user, text=self.text)
+
+        assert node.simhash is not None
+        assert node.simhash_band0 is not None
+
+        node_link = Node.objects.create(user, link=self.link)
+
+        assert node_link.simhash is None
+        assert node_link.simhash_band0 is None
+
+    def test_simhash_near_duplicate(self):
+        """ Test texts differing in whitespace, punctuation or a single word
+        are near-duplicates. """
+
+        text = "It was the best of times, it was the worst of times, it was the age of wisdom."
+        text_spacing = "It  was the best of times it was the worst of times -- it was the age of wisdom"
+        text_word = "It was the best of times, it was the worst of times, it was the age of wisdom, indeed."
+        text_other = "Call me Ishmael. Some years ago, never mind how long precisely."
+
+        simhash = SimHash.from_text(text)
+
+        assert simhash == SimHash.from_text(text_spacing)
+        assert simhash.is_near(SimHash.from_text(text_word))
+        assert not simhash.is_near(SimHash.from_text(text_other))
+        assert SimHash.from_signed(simhash.signed) == simhash
+
+    def test_get_duplicate(self, user):
+
+        original = Node.objects.create(user, text="Some highlight, worth keeping.")
+        duplicate = Node.objects.create(user, text="some highlight  worth keeping")
+        unique = Node.objects.create(user, text="An entirely different passage.")
+
+        assert original.duplicate_of is None
+        assert duplicate.duplicate_of == original
+        assert unique.duplicate_of is None
+
+        simhash = SimHash.from_text("Some highlight; worth keeping!")
+        assert Node.objects.get_duplicate(user, simhash) == original
+
+    def test_get_duplicate_unique_to_user(self, user):
+
+        other_user = get_user_model().objects.create_user(
+            email="other@email.com", password="password"
+        )
+
+        Node.objects.create(other_user, text=self.text)
+        node = Node.objects.create(user, text=self.text)
+
+        assert node.duplicate_of is None
+
+
+@pytest.mark.django_db
+class TestCounters:
+    def test_tags(self, user):
+
+        node_a = Node.objects.create(user, text="Node A", tags=["tag1", "tag2"])
+        node_b = Node.objects.create(user, text="Node B", tags=["tag1"])
+
+        assert Tag.objects.get(name="tag1").node_count == 2
+        assert Tag.objects.get(name="tag2").node_count == 1
+
+        tag2 = Tag.objects.get(name="tag2")
+        node_b.tags.add(tag2)
+        node_b.tags.remove(tag2)
+        node_b.tags.remove(tag2)
+        assert Tag.objects.get(name="tag2").node_count == 1
+
+        node_a.tags.clear()
+        assert Tag.objects.get(name="tag1").node_count == 1
+        assert Tag.objects.get(name="tag2").node_count == 0
+
+        tag2.node_set.add(node_a, node_b)
+        assert Tag.objects.get(name="tag2").node_count == 2
+
+        node_a.delete()
+        assert Tag.objects.get(name="tag1").node_count == 1
+        assert Tag.objects.get(name="tag2").node_count == 1
+
+    def test_collections(self, user):
+
+        node = Node.objects.create(user, text="Node", collections=["collection"])
+        assert Collection.objects.get().node_count == 1
+
+        Node.objects.update(user, node, collections=["collection-other"])
+        assert Collection.objects.get(name="collection").node_count == 0
+        assert Collection.objects.get(name="collection-other").node_count == 1
+
+    def test_origins_and_sources(self, user):
+
+        source = {"name": "Source", "individuals": ["Individual"]}
+        node = Node.objects.create(user, text="Node", origin="app", source=source)
+
+        assert Origin.objects.get(name="app").node_count == 1
+        assert Source.objects.all().get().node_count == 1
+        assert Individual.objects.get().source_count == 1
+
+        Node.objects.update(user, node, origin="other")
+        assert Origin.objects.get(name="app").node_count == 0
+        assert Origin.objects.get(name="other").node_count == 1
+
+        node.delete()
+        assert Origin.objects.get(name="other").node_count == 0
+        assert Source.objects.all().get().node_count == 0
+
+        Source.objects.all().get().delete()
+        assert Individual.objects.get().source_count == 0
+
+    def test_save_does_not_write_counters(self, user):
+
+        Node.objects.create(user, text="Node", tags=["tag"])
+
+        tag = Tag.objects.get()
+        Node.objects.create(user, text="Another Node", tags=["tag"])
+        Tag.objects.update(user, tag, name="tag-updated")
+
+        assert Tag.objects.get().node_count == 2
+
+    def test_recount(self, user):
+
+        Node.objects.create(user, text="Node", tags=["tag"], origin="app")
+        Tag.objects.all().update(node_count=100)
+        Origin.objects.all().update(node_count=100)
+
+        counters.recount(apps.get_model)
+
+        assert Tag.objects.get().node_count == 1
+        assert Origin.objects.get().node_count == 1
+
+    def test_gen_library(self):
+
+        call_command("gen_library", nodes=50, tags=10, seed=1, stdout=io.StringIO())
+
+        user = get_user_model().objects.filter(email="library0@example.com").get()
+
+        assert Node.objects.filter(user=user).count() == 50
+        assert sum(Tag.objects.values_list("node_count", flat=True)) == (
+            Node.tags.through.objects.count()
+        )
@@ -0,0 +1,248 @@
+import io
+import types
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from .. import deletion, quota
+from ..models import DeletionJob, Node
+from ..serializers import NodeSerializer
+
+
+@pytest.fixture
+def user():
+    email = "user@email.com"
+    password = "password"
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.STORAGE_QUOTA = 0
+    return tmp_path
+
+
+def get_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def upload(name, size):
+    return SimpleUploadedFile(name, b"x" * size)
+
+
+def get_counters(user):
+    user.refresh_from_db()
+    return user.node_count, user.media_bytes
+
+
+@pytest.mark.django_db
+class TestCounters:
+    def test_create(self, user):
+
+        Node.objects.create(user, text="Node")
+        node = Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+
+        assert node.media_size == 100
+        assert get_counters(user) == (2, 100)
+
+    def test_replace(self, user):
+
+        node = Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+
+        Node.objects.update(user, node, media=upload("b.mp3", 30))
+        assert get_counters(user) == (1, 30)
+
+        # Not touching the media leaves the counters alone.
+        Node.objects.update(user, node, text="Text")
+        assert get_counters(user) == (1, 30)
+
+    def test_delete(self, user):
+
+        node = Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+        Node.objects.create(user, text="Node", media=upload("b.mp3", 10))
+        Node.objects.create(user, text="Node")
+
+        node.delete()
+        assert get_counters(user) == (2, 10)
+
+        Node.objects.delete_many(Node.objects.all())
+        assert get_counters(user) == (0, 0)
+
+    def test_delete_batches(self, user):
+
+        nodes = [
+            Node.objects.create(user, text="Node", media=upload(f"{i}.mp3", 10))
+            for i in range(5)
+        ]
+        pks = [node.pk for node in nodes]
+
+        assert Node.objects.delete_many(Node.objects.all(), batch_size=2) == 5
+        assert get_counters(user) == (0, 0)
+
+        # Nodes deleted meanwhile by another delete are not counted again.
+        Node.objects.create(user, text="Node", media=upload("a.mp3", 10))
+        assert Node.objects._delete_batch(pks) == 0
+        assert get_counters(user) == (1, 10)
+
+    def test_empty_trash(self, user):
+
+        Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+        Node.objects.create(user, text="Node", media=upload("b.mp3", 10), in_trash=True)
+
+        deletion.queue(user, DeletionJob.TRASH)
+        deletion.run_pending()
+
+        assert get_counters(user) == (1, 100)
+
+    def test_reconcile(self, user, media_root):
+
+        node = Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+        get_user_model().objects.all().update(node_count=5, media_bytes=5)
+
+        call_command("reconcile_storage", stdout=io.StringIO())
+        assert get_counters(user) == (1, 100)
+
+        (media_root / node.media.name).write_bytes(b"x" * 40)
+
+        output = io.StringIO()
+        call_command("reconcile_storage", measure=True, stdout=output)
+
+        assert "Corrected the media size of 1 Nodes." in output.getvalue()
+        assert get_counters(user) == (1, 40)
+
+
+@pytest.mark.django_db
+class TestQuota:
+    def test_user(self, user, settings):
+
+        settings.STORAGE_QUOTA = 1000
+        Node.objects.create(user, text="Node", media=upload("a.mp3", 100))
+
+        response = get_client(user).get(reverse("user"))
+
+        assert response.data["node_count"] == 1
+        assert response.data["media_bytes"] == 100
+        assert response.data["storage_quota"] == 1000
+
+        user.storage_quota = 5000
+        user.save()
+
+        response = get_client(user).get(reverse("user"))
+        assert response.data["storage_quota"] == 5000
+
+    @pytest.fixture
+    def unread(self, monkeypatch):
+        """ Fails if any of an uploaded file reaches the default handlers. """
+
+        def receive_data_chunk(*args, **kwargs):
+            raise AssertionError("The file was read.")
+
+        for handler in (MemoryFileUploadHandler, TemporaryFileUploadHandler):
+            monkeypatch.setattr(handler, "receive_data_chunk", receive_data_chunk)
+
+    def test_reject_before_reading(self, user, settings, unread):
+
+        settings.STORAGE_QUOTA = 1000
+
+        response = get_client(user).post(
+            reverse("node-list"),
+            {"text": "Node", "media": upload("a.mp3", 2000)},
+            format="multipart",
+        )
+
+        assert response.status_code == 413
+        assert not Node.objects.exists()
+
+    def test_reject_before_csrf(self, user, settings, unread):
+
+        settings.STORAGE_QUOTA = 1000
+
+        # Session authentication parses the body for its CSRF check.
+        client = APIClient(enforce_csrf_checks=True)
+        client.login(email="user@email.com", password="password")
+        client.cookies[settings.CSRF_COOKIE_NAME] = "a" * 64
+
+        response = client.post(
+            reverse("node-list"),
+            {"text": "Node", "media": upload("a.mp3", 2000)},
+            format="multipart",
+        )
+
+        assert response.status_code == 413
+
+    def test_over_quota_without_media(self, user, settings):
+
+        settings.STORAGE_QUOTA = 1000
+        node = Node.objects.create(user, text="Node", media=upload("a.mp3", 1000))
+
+        response = get_client(user).patch(
+            reverse("node-detail", args=[node.pk]), {"text": "Text"}, format="multipart"
+        )
+
+        assert response.status_code == 200
+
+    def test_within_quota(self, user, settings):
+
+        settings.STORAGE_QUOTA = 10_000
+        client = get_client(user)
+
+        node = Node.objects.create(user, text="Node")
+        other = Node.objects.create(user, text="Other")
+
+        response = client.patch(
+            reverse("node-detail", args=[node.pk]),
+            {"media": upload("a.mp3", 3000)},
+            format="multipart",
+        )
+        assert response.status_code == 200
+        assert get_counters(user) == (2, 3000)
+
+        response = client.patch(
+            reverse("node-detail", args=[other.pk]),
+            {"media": upload("b.mp3", 8000)},
+            format="multipart",
+        )
+        assert response.status_code == 413
+        assert get_counters(user) == (2, 3000)
+
+        # A replaced file frees its space.
+        response = client.patch(
+            reverse("node-detail", args=[node.pk]),
+            {"media": upload("c.mp3", 8000)},
+            format="multipart",
+        )
+        assert response.status_code == 200
+        assert get_counters(user) == (2, 8000)
+
+    def test_exact_size(self, user, settings):
+
+        settings.STORAGE_QUOTA = 1000
+        Node.objects.create(user, text="Node", media=upload("a.mp3", 900))
+
+        request = types.SimpleNamespace(user=user)
+
+        serializer = NodeSerializer(context={"request": request})
+        assert serializer.validate_media(upload("b.mp3", 100))
+
+        with pytest.raises(quota.QuotaExceeded):
+            serializer.validate_media(upload("b.mp3", 101))
+
+    def test_unlimited(self, user, settings):
+
+        settings.STORAGE_QUOTA = 1000
+        user.storage_quota = 0
+        user.save()
+
+        assert quota.get_quota(user) is None
+        quota.check(user, 10 ** 12)
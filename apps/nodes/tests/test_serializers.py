@@ -1,10 +1,14 @@
+import uuid
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 
-from ..models import Tag
+from ..models import Collection, Individual, Node, Source, Tag
 from ..serializers import TagSerializer
 from ..views import TagsViewSet
 
@@ -67,3 +71,320 @@ class TestTagSerializer:
 
         assert response.data == serializer.data
         assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestSourceSerializer:
+    def test_create(self, user):
+
+        Individual.objects.create(user, name="Jane Doe")
+
+        url = reverse("source-list")
+        data = {
+            "name": "The Source",
+            "individuals": ["Jane Doe", "John Doe", "Jinny Doe"],
+            "url": "",
+            "date": "",
+            "notes": "",
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data, format="json")
+
+        individual_selects = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "nodes_individual"')
+        ]
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Individual.objects.count() == 3
+        assert Source.objects.all().get().individuals.count() == 3
+        # Individuals are resolved once, not once for validation and once per
+        # Individual for creation.
+        assert len(individual_selects) <= 2
+
+    def test_create_existing(self, user):
+
+        Source.objects.create(user, name="The Source", individuals=["Jane Doe"])
+
+        url = reverse("source-list")
+        data = {
+            "name": "The Source",
+            "individuals": ["Jane Doe"],
+            "url": "",
+            "date": "",
+            "notes": "",
+        }
+        response = client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Source.objects.count() == 1
+
+    def test_update_unchanged(self, user):
+
+        source = Source.objects.create(user, name="The Source", individuals=["Jane Doe"])
+
+        url = reverse("source-detail", args=[source.pk])
+        data = {
+            "name": "The Source",
+            "individuals": ["Jane Doe"],
+            "url": "",
+            "date": "",
+            "notes": "Some notes.",
+        }
+        response = client.put(url, data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Source.objects.all().get().notes == "Some notes."
+
+    def test_link(self, user):
+
+        nodes = [
+            Node.objects.create(user, text=f"Node {i}.", source={"name": "The Source"})
+            for i in range(3)
+        ]
+
+        url = reverse("source-link", args=[nodes[0].source.pk])
+        response = client.post(url, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"linked": 6}
+        for node in nodes:
+            assert set(node.auto_related.all()) == set(nodes) - {node}
+
+
+def node_data(**data):
+    fields = {
+        "id": None,
+        "text": "",
+        "media": None,
+        "link": "",
+        "source": None,
+        "notes": "",
+        "tags": [],
+        "collections": [],
+        "origin": None,
+        "in_trash": False,
+        "is_starred": False,
+        "related": [],
+        "date_created": None,
+        "date_modified": None,
+    }
+    fields.update(data)
+    return fields
+
+
+@pytest.mark.django_db
+class TestNodeSerializer:
+    def test_create_duplicates_skip(self, user):
+
+        Node.objects.create(user, text="Some highlight, worth keeping.")
+        original = Node.objects.get()
+
+        url = reverse("node-list")
+        data = [
+            node_data(text="some highlight  worth keeping"),
+            node_data(text="An entirely different passage."),
+            node_data(text="An entirely different passage!"),
+        ]
+        response = client.post(f"{url}?duplicates=skip", data, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data["created"]) == 1
+        assert response.data["skipped"][0] == {"index": 0, "duplicate_of": original.pk}
+        assert response.data["skipped"][1]["index"] == 2
+        assert Node.objects.count() == 2
+
+    def test_create_duplicates_flag(self, user):
+
+        original = Node.objects.create(user, text="Some highlight, worth keeping.")
+
+        url = reverse("node-list")
+        data = node_data(text="Some highlight worth keeping")
+        response = client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["duplicate_of"] == original.pk
+
+    def test_related_validated_at_once(self, user):
+
+        related = [Node.objects.create(user, text=f"Node {i}") for i in range(10)]
+
+        url = reverse("node-list")
+        data = node_data(text="Some text.", related=[str(n.pk) for n in related])
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data, format="json")
+
+        node_selects = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "nodes_node"')
+            and '"nodes_node"."id" IN' in query["sql"]
+        ]
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data["related"]) == 10
+        assert len(node_selects) == 1
+
+    def test_related_missing(self, user):
+
+        node = Node.objects.create(user, text="Some text.")
+        missing = ["00000000-0000-0000-0000-000000000001", str(uuid.uuid4())]
+
+        url = reverse("node-list")
+        data = node_data(text="Other text.", related=[str(node.pk)] + missing)
+        response = client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        for pk in missing:
+            assert pk in response.data["related"][0]
+
+
+@pytest.mark.django_db
+class TestNodeFilter:
+    @pytest.fixture
+    def nodes(self, user):
+        return {
+            "a": Node.objects.create(user, text="a", tags=["x", "y"], is_starred=True),
+            "b": Node.objects.create(user, text="b", tags=["x"], collections=["c"]),
+            "c": Node.objects.create(user, link="http://c.com", in_trash=True),
+        }
+
+    def get_ids(self, **params):
+        response = client.get(reverse("node-list"), params)
+        assert response.status_code == status.HTTP_200_OK
+        return {node["id"] for node in response.data}
+
+    def test_tags(self, nodes):
+        assert self.get_ids(tags="x,y") == {str(nodes["a"].pk), str(nodes["b"].pk)}
+        assert self.get_ids(tags_all="x,y") == {str(nodes["a"].pk)}
+        assert self.get_ids(tags_all="x,y,z") == set()
+
+    def test_collections(self, nodes):
+        assert self.get_ids(collections="c") == {str(nodes["b"].pk)}
+
+    def test_flags(self, nodes):
+        assert self.get_ids(is_starred="true") == {str(nodes["a"].pk)}
+        assert self.get_ids(in_trash="false", tags="x") == {
+            str(nodes["a"].pk),
+            str(nodes["b"].pk),
+        }
+
+    def test_node_type(self, nodes):
+        assert self.get_ids(node_type="link") == {str(nodes["c"].pk)}
+
+    def test_dates(self, nodes):
+        assert len(self.get_ids(created_after="2000-01-01")) == 3
+        assert self.get_ids(created_before="2000-01-01") == set()
+
+    def test_invalid(self, nodes):
+        response = client.get(reverse("node-list"), {"is_starred": "maybe"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestNodeGraph:
+    def test_graph(self, user, django_assert_num_queries):
+
+        a, b, c, d = [Node.objects.create(user, text=text) for text in "abcd"]
+        a.related.add(b)
+        b.related.add(c)
+        c.related.add(a)
+        c.auto_related.add(d)
+
+        url = reverse("node-graph", args=[a.pk])
+
+        response = client.get(url, {"depth": 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert {n["id"] for n in response.data["nodes"]} == {a.pk, b.pk, c.pk}
+        assert len(response.data["edges"]) == 3
+
+        response = client.get(url, {"depth": 2})
+        nodes = {n["id"]: n["depth"] for n in response.data["nodes"]}
+        assert nodes == {a.pk: 0, b.pk: 1, c.pk: 1, d.pk: 2}
+        edge = {"source": min(c.pk, d.pk), "target": max(c.pk, d.pk)}
+        assert {**edge, "type": "auto_related"} in response.data["edges"]
+
+        response = client.get(url, {"depth": 3, "limit": 2})
+        assert len(response.data["nodes"]) == 2
+        assert response.data["nodes"][0]["id"] == a.pk
+
+        with django_assert_num_queries(1):
+            Node.objects.get_graph(user, a.pk, depth=3, limit=100)
+
+    def test_graph_unique_to_user(self, user):
+
+        other_user = get_user_model().objects.create_user(
+            email="other@email.com", password="password"
+        )
+        node = Node.objects.create(other_user, text="Node")
+
+        response = client.get(reverse("node-graph", args=[node.pk]))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestNodeBulk:
+    def test_update(self, user):
+
+        a = Node.objects.create(user, text="a", tags=["x"])
+        b = Node.objects.create(user, text="b", collections=["old"])
+        c = Node.objects.create(user, text="c")
+
+        data = {
+            "ids": [str(a.pk), str(b.pk)],
+            "set": {"is_starred": True},
+            "add": {"tags": ["x", "y"], "collections": ["new"]},
+            "remove": {"collections": ["old"]},
+        }
+        response = client.patch(reverse("node-bulk"), data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "matched": 2,
+            "updated": 2,
+            "tags_added": 3,
+            "collections_added": 2,
+            "collections_removed": 1,
+        }
+        assert set(Node.objects.filter(is_starred=True)) == {a, b}
+        assert set(b.tags.values_list("name", flat=True)) == {"x", "y"}
+        assert Tag.objects.get(name="x").node_count == 2
+        assert Collection.objects.get(name="old").node_count == 0
+        assert Collection.objects.get(name="new").node_count == 2
+        assert not c.tags.exists()
+
+    def test_delete(self, user):
+
+        a = Node.objects.create(user, text="a", tags=["x"], origin="app")
+        b = Node.objects.create(user, text="b", tags=["x"], in_trash=True)
+        b.related.add(a)
+
+        data = {"filter": {"in_trash": "true"}}
+        response = client.delete(reverse("node-bulk"), data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"deleted": 1}
+        assert list(Node.objects.all()) == [a]
+        assert not a.related.exists()
+        assert Tag.objects.get(name="x").node_count == 1
+
+    def test_unique_to_user(self, user):
+
+        other_user = get_user_model().objects.create_user(
+            email="other@email.com", password="password"
+        )
+        node = Node.objects.create(other_user, text="Node")
+
+        data = {"ids": [str(node.pk)]}
+        response = client.delete(reverse("node-bulk"), data, format="json")
+
+        assert response.data == {"deleted": 0}
+        assert Node.objects.filter(pk=node.pk).exists()
+
+    def test_invalid(self, user):
+
+        response = client.delete(reverse("node-bulk"), {}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -1,21 +1,58 @@
-from rest_framework import views, viewsets, status
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
+from rest_framework import exceptions, filters, views, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from .models import Collection, Individual, Node, Origin, Source, Tag
+from ..api.media import serve_media
+from . import deletion, quota
+from .filters import NodeFilter
+from .models import (
+    Collection,
+    DeletionJob,
+    Individual,
+    Node,
+    Origin,
+    Source,
+    Tag,
+)
 from .serializers import (
     CollectionSerializer,
+    DeletionJobSerializer,
     IndividualSerializer,
     MergeSerializer,
+    NodeBulkSerializer,
     NodeSerializer,
     OriginSerializer,
     SourceSerializer,
     TagSerializer,
 )
+from .simhash import SimHash
 
 
 class QuerysetMixin:
+
+    # Relations read by the serializer. Loaded up front when listing or
+    # retrieving so the number of queries does not grow with the number of
+    # objects. See apps.api.tests.test_queries
+    select_related = ()
+    prefetch_related = ()
+
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action in ("list", "retrieve"):
+            queryset = queryset.select_related(*self.select_related)
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+
+        return queryset
 
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
@@ -27,31 +64,344 @@ class QuerysetMixin:
 class SourcesViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Source.objects.all()
     serializer_class = SourceSerializer
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ("name", "node_count", "date_created")
+    prefetch_related = (
+        "individuals",
+        Prefetch("node_set", queryset=Node.objects.only("id", "source")),
+    )
+
+    def destroy(self, request, *args, **kwargs):
+        """ Deleting a Source deletes its Nodes. They are deleted in the
+        background. Responds with the queued job. See apps.nodes.deletion """
+
+        source = self.get_object()
+        job = deletion.queue(request.user, DeletionJob.SOURCE, source.pk)
+
+        return Response(
+            DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=True, methods=["post"])
+    def link(self, request, pk=None):
+        """ Relates every Node of the Source to every other one through
+        'auto_related' in a single query. Existing relations are kept. See
+        apps.nodes.models.NodeManager.link_source()
+
+        {"linked": <relations written, counting each direction>}
+        """
+
+        source = self.get_object()
+
+        return Response({"linked": Node.objects.link_source(request.user, source)})
 
 
 class IndividualsViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Individual.objects.all()
     serializer_class = IndividualSerializer
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ("name", "source_count", "date_created")
+    prefetch_related = (
+        "aka",
+        Prefetch("source_set", queryset=Source.objects.only("id")),
+    )
 
 
 class TagsViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ("name", "node_count", "date_created")
+    prefetch_related = (Prefetch("node_set", queryset=Node.objects.only("id")),)
 
 
 class CollectionsViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ("name", "node_count", "date_created")
+    prefetch_related = (Prefetch("node_set", queryset=Node.objects.only("id")),)
 
 
 class OriginsViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Origin.objects.all()
     serializer_class = OriginSerializer
+    filter_backends = (filters.OrderingFilter,)
+    ordering_fields = ("name", "node_count", "date_created")
+    prefetch_related = (
+        Prefetch("node_set", queryset=Node.objects.only("id", "origin")),
+    )
 
 
 class NodesViewSet(QuerysetMixin, viewsets.ModelViewSet):
     queryset = Node.objects.all()
     serializer_class = NodeSerializer
+    filter_backends = (NodeFilter,)
+    # Set by expensive actions. See apps.api.throttling
+    throttle_scope = None
+    select_related = ("source", "origin")
+    prefetch_related = (
+        "source__individuals",
+        "tags",
+        "collections",
+        "auto_tags",
+        Prefetch("related", queryset=Node.objects.only("id")),
+        Prefetch("auto_related", queryset=Node.objects.only("id")),
+    )
+
+    def initial(self, request, *args, **kwargs):
+        """ Refuses media uploads over the user's storage quota before the file
+        is read, whenever the body is parsed. See apps.nodes.quota """
+
+        if self.action in ("create", "update", "partial_update"):
+            request.upload_handlers.insert(
+                0,
+                quota.QuotaUploadHandler(
+                    request._request, get_freed=self.get_freed_media
+                ),
+            )
+
+        super().initial(request, *args, **kwargs)
+
+    def get_freed_media(self, user):
+        """ Returns the bytes freed by replacing the media of the Node being
+        updated. """
+
+        if self.action == "create":
+            return 0
+
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+        try:
+            sizes = Node.objects.filter(pk=pk, user=user).values_list(
+                "media_size", flat=True
+            )
+            return sizes.first() or 0
+        except ValidationError:
+            return 0
+
+    def create(self, request, *args, **kwargs):
+        """ Creates a single Node or, when passed a list, many Nodes in one
+        transaction. Near-duplicates of existing Nodes are flagged with
+        'duplicate_of'. Passing '?duplicates=skip' skips them instead and
+        reports the existing Node each skipped item matched.
+
+        Bulk response:
+        {
+            "created": [<node>, ...],
+            "skipped": [{"index": 3, "duplicate_of": "<uuid>"}, ...]
+        }
+        """
+
+        many = isinstance(request.data, list)
+        skip_duplicates = request.query_params.get("duplicates") == "skip"
+
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+
+        node_serializer = serializer.child if many else serializer
+        items = serializer.validated_data if many else [serializer.validated_data]
+
+        created = []
+        skipped = []
+
+        with transaction.atomic():
+            for index, data in enumerate(items):
+
+                simhash = SimHash.from_text(data.get("text"))
+                duplicate = Node.objects.get_duplicate(request.user, simhash)
+
+                if duplicate and skip_duplicates:
+                    skipped.append({"index": index, "duplicate_of": duplicate.pk})
+                    continue
+
+                obj = node_serializer.create(
+                    {**data, "user": request.user, "duplicate_of": duplicate}
+                )
+                created.append(node_serializer.to_representation(obj))
+
+        if many:
+            return Response(
+                {"created": created, "skipped": skipped},
+                status=status.HTTP_201_CREATED,
+            )
+
+        if skipped:
+            return Response(
+                {
+                    "detail": "Node is a near-duplicate of an existing Node.",
+                    "duplicate_of": skipped[0]["duplicate_of"],
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(created[0], status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["patch", "delete"], throttle_scope="bulk")
+    def bulk(self, request):
+        """ Updates or deletes many Nodes in a single transaction. Nodes are
+        selected by 'ids' or by a 'filter' of the list query parameters. See
+        apps.nodes.filters.NodeFilter
+
+        PATCH
+        {
+            "ids": ["<uuid>", ...],
+            "set": {"is_starred": true, "in_trash": false},
+            "add": {"tags": ["tag"], "collections": ["collection"]},
+            "remove": {"tags": ["tag"], "collections": ["collection"]}
+        }
+
+        DELETE
+        {
+            "filter": {"in_trash": "true"}
+        }
+
+        Responds with the number of affected rows.
+        """
+
+        serializer = NodeBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        queryset = self.get_queryset()
+
+        if data.get("ids"):
+            queryset = queryset.filter(pk__in=data["ids"])
+        else:
+            queryset = NodeFilter().filter_params(
+                request.user, data["filter"], queryset
+            )
+
+        if request.method == "DELETE":
+            return Response({"deleted": Node.objects.delete_many(queryset)})
+
+        results = Node.objects.update_many(
+            request.user,
+            queryset,
+            values=data.get("set"),
+            add=data.get("add"),
+            remove=data.get("remove"),
+        )
+
+        return Response(results)
+
+    @action(detail=False, methods=["post"], url_path="empty-trash")
+    def empty_trash(self, request):
+        """ Deletes every Node in the trash, and their media files, in the
+        background. Responds with the queued job. See apps.nodes.deletion """
+
+        job = deletion.queue(request.user, DeletionJob.TRASH)
+
+        return Response(
+            DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    GRAPH_DEPTH_DEFAULT = 1
+    GRAPH_DEPTH_MAX = 5
+    GRAPH_LIMIT_DEFAULT = 100
+    GRAPH_LIMIT_MAX = 1000
+
+    @action(detail=True)
+    def graph(self, request, pk=None):
+        """ Returns the Nodes reachable through 'related' and 'auto_related'
+        within '?depth=' hops, nearest first and at most '?limit=' Nodes, along
+        with the edges between them. The traversal is a single query. See
+        apps.nodes.models.NodeManager.get_graph()
+
+        {
+            "nodes": [{"id": "<uuid>", "depth": 0, ...}, ...],
+            "edges": [{"source": "<uuid>", "target": "<uuid>", "type": "related"}, ...]
+        }
+        """
+
+        depth = self._get_int_param(
+            "depth", self.GRAPH_DEPTH_DEFAULT, self.GRAPH_DEPTH_MAX
+        )
+        limit = self._get_int_param(
+            "limit", self.GRAPH_LIMIT_DEFAULT, self.GRAPH_LIMIT_MAX
+        )
+
+        try:
+            pk = Node._meta.pk.to_python(pk)
+        except ValidationError:
+            raise Http404
+
+        graph = Node.objects.get_graph(request.user, pk, depth, limit)
+
+        if graph is None:
+            raise Http404
+
+        nodes, edges = graph
+
+        return Response(
+            {
+                "nodes": [
+                    {
+                        "id": node.pk,
+                        "url": reverse("node-detail", args=[node.pk]),
+                        "depth": node.depth,
+                        "node_type": node.node_type,
+                        "display_name": node.display_name,
+                    }
+                    for node in nodes
+                ],
+                "edges": [
+                    {"source": source, "target": target, "type": kind}
+                    for source, target, kind in edges
+                ],
+            }
+        )
+
+    @action(detail=True)
+    def media(self, request, pk=None):
+        """ Sends the Node's media file. Range requests are supported so audio
+        and video can seek. See apps.api.media """
+
+        node = self.get_object()
+
+        if not node.media:
+            raise Http404
+
+        try:
+            path = node.media.path
+        except NotImplementedError:
+            # Storages without local files e.g. object storage.
+            raise Http404
+
+        # The name comes from the database. It must not point outside of
+        # MEDIA_ROOT.
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        path = os.path.realpath(path)
+        if os.path.commonpath([media_root, path]) != media_root:
+            raise Http404
+
+        if not os.path.isfile(path):
+            raise Http404
+
+        return serve_media(request, path, node.media.name)
+
+    def _get_int_param(self, name, default, maximum):
+
+        value = self.request.query_params.get(name, default)
+
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError({name: "Must be an integer."})
+
+        if not 0 <= value <= maximum:
+            raise exceptions.ValidationError(
+                {name: f"Must be between 0 and {maximum}."}
+            )
+
+        return value
+
+
+class DeletionJobsViewSet(QuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """ The progress of the user's queued deletions. """
+
+    queryset = DeletionJob.objects.order_by("-date_created")
+    serializer_class = DeletionJobSerializer
 
 
 # Actions Views
@@ -63,6 +413,7 @@ class MergeView(views.APIView):
     """
 
     serializer_class = MergeSerializer
+    throttle_scope = "merge"
 
     def post(self, request):
         """
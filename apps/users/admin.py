@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as UserAdminBase
 
+from ..nodes import deletion
+from ..nodes.models import DeletionJob
 from .models import User
 
 
@@ -11,6 +13,7 @@ class UserAdmin(UserAdminBase):
     fieldsets = (
         (None, {"fields": ("email", "password", "first_name", "last_name")}),
         ("Preferences", {"fields": ("theme",)}),
+        ("Storage", {"fields": ("storage_quota", "node_count", "media_bytes")}),
         (
             "Permissions",
             {
@@ -32,5 +35,24 @@ class UserAdmin(UserAdminBase):
     search_fields = ()
     list_filter = ()
     list_display = ("__str__", "is_active", "is_staff", "is_superuser", "last_login")
-    readonly_fields = ("last_login",)
+    readonly_fields = ("last_login", "node_count", "media_bytes")
     filter_horizontal = ("groups", "user_permissions")
+
+    # Deleting a User deletes everything they own. The confirmation page would
+    # load all of it to list it and the delete would run in the request, so
+    # Users are deactivated and deleted in the background instead. See
+    # apps.nodes.deletion
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+
+        obj.is_active = False
+        obj.save(update_fields=["is_active"])
+
+        deletion.queue(obj, DeletionJob.USER, obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
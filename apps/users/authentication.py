@@ -0,0 +1,201 @@
+""" Authentication classes that cache the authenticated user per process.
+
+Without a cache every API request decodes its JSON Web Token and loads the
+User, and a session-authenticated request reads the session table as well. The
+user is cached here keyed by the token or the session key for at most
+settings.AUTH_CACHE_TTL seconds, so a repeated request does no queries to
+authenticate.
+
+Entries of a user are dropped when their password, email or is_active changes
+or they log out. See apps.users.signals. Other worker processes keep serving
+their entries until those expire, which bounds how long a change takes to
+apply everywhere. A TTL of 0 disables the cache.
+
+A JSON Web Token stays valid until it expires whatever the cache does, but a
+session ends on logout. Sessions are therefore only cached with
+settings.AUTH_CACHE_SESSIONS, for deployments running a single process. """
+
+import threading
+import time
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import authentication, exceptions
+from rest_framework_jwt.authentication import (
+    JSONWebTokenAuthentication,
+    jwt_decode_handler,
+)
+
+from ..api import metrics
+
+
+class UserCache:
+    """ A thread-safe mapping of key to User with a time to live. Users are
+    stored as their field values and a fresh instance is built on every hit so
+    requests never share one. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key: (expires, user pk, field values)
+        self.entries = {}
+        # user pk: {key, ...}
+        self.keys = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "AUTH_CACHE_TTL", 0)
+
+    @property
+    def max_size(self):
+        return getattr(settings, "AUTH_CACHE_MAX_SIZE", 10_000)
+
+    def get(self, key):
+
+        if not self.ttl:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+        if entry is not None and entry[0] <= time.monotonic():
+            self.discard(key)
+            entry = None
+
+        metrics.cache_lookup("auth", entry is not None)
+
+        if entry is None:
+            return None
+
+        User = get_user_model()
+        names, values = zip(*entry[2])
+
+        return User.from_db("default", names, values)
+
+    def set(self, key, user, expires=None):
+        """ Caches `user` under `key` until the TTL or `expires`, a
+        time.time() timestamp, whichever comes first. """
+
+        if not self.ttl:
+            return
+
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        if expires is not None:
+            expires_at = min(expires_at, now + expires - time.time())
+
+        values = tuple(
+            (field.attname, getattr(user, field.attname))
+            for field in user._meta.concrete_fields
+        )
+
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                self._evict(now)
+            self.entries[key] = (expires_at, user.pk, values)
+            self.keys.setdefault(user.pk, set()).add(key)
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self._unindex(entry[1], key)
+
+    def invalidate(self, user_pk):
+        """ Drops every entry of a user. """
+        with self.lock:
+            for key in self.keys.pop(user_pk, ()):
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys.clear()
+
+    def _evict(self, now):
+        """ Drops the expired entries, or the oldest half if none are. Called
+        with the lock held. """
+
+        expired = [key for key, entry in self.entries.items() if entry[0] <= now]
+        if not expired:
+            expired = list(self.entries)[: len(self.entries) // 2 or 1]
+
+        for key in expired:
+            self._unindex(self.entries.pop(key)[1], key)
+
+    def _unindex(self, user_pk, key):
+        keys = self.keys.get(user_pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys[user_pk]
+
+
+cache = UserCache()
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """ JSONWebTokenAuthentication that skips decoding the token and loading
+    the User when the token has been seen before. Keyed by the whole token
+    rather than its signature alone so a token with a tampered payload never
+    matches a cached one. """
+
+    def authenticate(self, request):
+
+        jwt_value = self.get_jwt_value(request)
+        if jwt_value is None:
+            return None
+
+        key = f"jwt:{jwt_value}"
+
+        user = cache.get(key)
+        if user is not None:
+            return (user, jwt_value)
+
+        try:
+            payload = jwt_decode_handler(jwt_value)
+        except jwt.ExpiredSignature:
+            raise exceptions.AuthenticationFailed("Signature has expired.")
+        except jwt.DecodeError:
+            raise exceptions.AuthenticationFailed("Error decoding signature.")
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed()
+
+        user = self.authenticate_credentials(payload)
+
+        cache.set(key, user, expires=payload.get("exp"))
+
+        return (user, jwt_value)
+
+
+class CachedSessionAuthentication(authentication.SessionAuthentication):
+    """ SessionAuthentication that skips reading the session and loading the
+    User when the session key has been seen before, if
+    settings.AUTH_CACHE_SESSIONS is set. CSRF is still enforced on every
+    request. """
+
+    def authenticate(self, request):
+
+        if not getattr(settings, "AUTH_CACHE_SESSIONS", False):
+            return super().authenticate(request)
+
+        # Set by SessionMiddleware from the cookie without loading the session.
+        session = getattr(request._request, "session", None)
+        session_key = session.session_key if session is not None else None
+
+        if not session_key:
+            return super().authenticate(request)
+
+        key = f"session:{session_key}"
+
+        user = cache.get(key)
+        if user is None:
+            result = super().authenticate(request)
+            if result is not None:
+                # AuthenticationMiddleware sets the user as a SimpleLazyObject.
+                cache.set(key, getattr(result[0], "_wrapped", result[0]))
+            return result
+
+        self.enforce_csrf(request)
+
+        return (user, None)
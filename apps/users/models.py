@@ -6,7 +6,7 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 
 
-from ..helpers import UpdateFieldsMixin
+from ..helpers import DirtyFieldsMixin, UpdateFieldsMixin
 
 
 class UserManager(UpdateFieldsMixin, BaseUserManager):
@@ -53,7 +53,7 @@ class UserManager(UpdateFieldsMixin, BaseUserManager):
         return instance
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(DirtyFieldsMixin, AbstractBaseUser, PermissionsMixin):
     """ References:
     https://docs.djangoproject.com/en/2.2/topics/auth/customizing/
     https://github.com/tmm/django-username-email/blob/master/cuser/models.py
@@ -74,6 +74,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
 
+    # Bytes of media allowed. Defaults to settings.STORAGE_QUOTA when unset.
+    # See apps.nodes.quota
+    storage_quota = models.BigIntegerField(null=True, blank=True)
+
+    # Denormalized. See apps.nodes.counters
+    node_count = models.PositiveIntegerField(default=0, editable=False)
+    media_bytes = models.BigIntegerField(default=0, editable=False)
+
     # QUESTION: Add date_created ?
     # QUESTION: When is this timestamped ?
 
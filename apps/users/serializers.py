@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import exceptions, serializers, validators
 
+from ..nodes import quota
+
 
 User = get_user_model()
 
@@ -24,6 +26,14 @@ class UserSerializer(serializers.Serializer):
         choices=User.THEME_CHOICES, default=User.THEME_DEFAULT
     )
 
+    # See apps.nodes.quota
+    node_count = serializers.IntegerField(read_only=True)
+    media_bytes = serializers.IntegerField(read_only=True)
+    storage_quota = serializers.SerializerMethodField()
+
+    def get_storage_quota(self, obj):
+        return quota.get_quota(obj)
+
     def update(self, instance, validated_data):
         return User.objects.update(instance, **validated_data)
 
@@ -0,0 +1,35 @@
+""" Drops the cached authentication of a user whose credentials change. See
+apps.users.authentication """
+
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import cache
+
+
+# Changing any of these must log the user out of cached requests.
+CREDENTIAL_FIELDS = {"password", "email", "is_active"}
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_on_save(sender, instance, created, update_fields, **kwargs):
+
+    if created:
+        return
+
+    # DirtyFieldsMixin saves only the changed fields. A save of every field
+    # may have changed any of them.
+    if update_fields is None or CREDENTIAL_FIELDS.intersection(update_fields):
+        cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_on_delete(sender, instance, **kwargs):
+    cache.invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        cache.invalidate(user.pk)
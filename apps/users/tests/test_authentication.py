@@ -0,0 +1,159 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.users.authentication import cache
+from apps.users.serializers import UserPasswordChangeSerializer
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+
+    model = get_user_model()
+
+    email = "user@email.com"
+    password = "password"
+
+    @pytest.fixture
+    def user(self, settings):
+        settings.AUTH_CACHE_TTL = 60
+        settings.AUTH_CACHE_SESSIONS = True
+        cache.clear()
+        return self.model.objects.create_user(email=self.email, password=self.password)
+
+    def get_jwt_client(self):
+
+        client = APIClient()
+        response = client.post(
+            "/api/auth/token/", {"email": self.email, "password": self.password}
+        )
+        client.credentials(HTTP_AUTHORIZATION=f"JWT {response.data['token']}")
+
+        return client
+
+    def get_session_client(self):
+
+        client = APIClient()
+        assert client.login(email=self.email, password=self.password)
+
+        return client
+
+    def count_queries(self, client):
+
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse("user"))
+
+        return response, len(captured)
+
+    @pytest.mark.parametrize("get_client", ["get_jwt_client", "get_session_client"])
+    def test_cached(self, user, get_client):
+
+        client = getattr(self, get_client)()
+
+        response, queries = self.count_queries(client)
+        assert response.status_code == 200
+        assert queries > 1
+
+        # Only the view's own read of the storage counters.
+        response, queries = self.count_queries(client)
+        assert response.status_code == 200
+        assert response.data["email"] == self.email
+        assert queries == 1
+
+    def test_disabled(self, user, settings):
+
+        settings.AUTH_CACHE_TTL = 0
+
+        client = self.get_jwt_client()
+        self.count_queries(client)
+
+        response, queries = self.count_queries(client)
+        assert response.status_code == 200
+        assert queries > 1
+
+    def test_sessions_disabled(self, user, settings):
+
+        settings.AUTH_CACHE_SESSIONS = False
+
+        client = self.get_session_client()
+        self.count_queries(client)
+
+        response, queries = self.count_queries(client)
+        assert response.status_code == 200
+        assert queries > 1
+        assert not cache.entries
+
+    def test_invalidate_on_update(self, user):
+
+        client = self.get_jwt_client()
+        self.count_queries(client)
+
+        # Not a credential.
+        self.model.objects.update(user, theme=1)
+        assert user.pk in cache.keys
+
+        self.model.objects.update(user, email="user-new@email.com")
+        assert user.pk not in cache.keys
+
+        # The token names the old e-mail.
+        response, queries = self.count_queries(client)
+        assert response.status_code == 401
+
+    def test_invalidate_on_password_change(self, user):
+
+        client = self.get_session_client()
+        self.count_queries(client)
+        assert user.pk in cache.keys
+
+        serializer = UserPasswordChangeSerializer(
+            data={
+                "email": self.email,
+                "password": self.password,
+                "password_new": "password-new-42",
+                "password_confirm": "password-new-42",
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        assert user.pk not in cache.keys
+
+        # The session was bound to the old password.
+        response, queries = self.count_queries(client)
+        assert response.status_code == 401
+
+    def test_invalidate_on_deactivate(self, user):
+
+        client = self.get_jwt_client()
+        self.count_queries(client)
+
+        user.is_active = False
+        user.save()
+
+        response, queries = self.count_queries(client)
+        assert response.status_code == 401
+
+    def test_invalidate_on_logout(self, user):
+
+        client = self.get_session_client()
+        self.count_queries(client)
+
+        client.logout()
+
+        assert user.pk not in cache.keys
+
+    def test_expires(self, user, monkeypatch):
+
+        client = self.get_jwt_client()
+        self.count_queries(client)
+
+        key = next(iter(cache.entries))
+        expires, pk, values = cache.entries[key]
+        monkeypatch.setitem(cache.entries, key, (0, pk, values))
+
+        response, queries = self.count_queries(client)
+        assert response.status_code == 200
+        assert queries > 1
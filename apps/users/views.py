@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import permissions, status, views
 from rest_framework.response import Response
+from rest_framework_jwt.views import ObtainJSONWebToken
 
 from ..users.serializers import UserPasswordChangeSerializer, UserSerializer
 
@@ -15,6 +16,9 @@ class UserView(views.APIView):
 
     def get(self, request):
 
+        # request.user may be a cached copy. See apps.users.authentication
+        request.user.refresh_from_db(fields=["node_count", "media_bytes"])
+
         serializer = self.serializer_class(request.user)
 
         return Response(serializer.data)
@@ -39,6 +43,7 @@ class UserPasswordChangeView(views.APIView):
     permission_classes = (permissions.AllowAny,)
     queryset = get_user_model().objects.all()
     serializer_class = UserPasswordChangeSerializer
+    throttle_scope = "password"
 
     def post(self, request):
         """
@@ -55,3 +60,11 @@ class UserPasswordChangeView(views.APIView):
             serializer.save()
 
         return Response(status=status.HTTP_200_OK)
+
+
+class ObtainTokenView(ObtainJSONWebToken):
+    """
+    Returns a JSON Web Token for an e-mail/password combination.
+    """
+
+    throttle_scope = "login"
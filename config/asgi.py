@@ -0,0 +1,72 @@
+""" ASGI entry point, served by e.g. uvicorn:
+
+    uvicorn config.asgi:application --workers 4
+
+Django 2.2 has no ASGI handler, async views or async ORM. Those arrived in
+Django 3.0, 3.1 and 4.1. Until then the WSGI application runs in a pool of
+ASGI_THREADS threads per process behind the ASGI server's event loop. Waiting
+on a slow client happens on the event loop and only takes a thread once the
+whole request body has arrived. Each thread keeps its own database connection,
+so the pool should fit within the database's connection limit.
+
+asgiref's WsgiToAsgi runs every request on one shared thread. That keeps
+thread-sensitive code safe but serializes requests, so requests here run on
+the pool instead. See scripts/bench_concurrency.py
+
+asgiref has no public hook for the executor of WsgiToAsgi, so this unwraps its
+run_wsgi_app(). asgiref is pinned in the Pipfile for that reason. Check this
+module before upgrading it. """
+
+import concurrent.futures
+import os
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        run = WsgiToAsgiInstance.__dict__["run_wsgi_app"].func
+        await sync_to_async(run, thread_sensitive=False, executor=self.executor)(
+            self, body
+        )
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="wsgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application, self.executor)(
+            scope, receive, send
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = ThreadPoolWsgiToAsgi(
+    get_wsgi_application(), threads=int(os.getenv("ASGI_THREADS", "16"))
+)
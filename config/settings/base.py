@@ -11,6 +11,21 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = SITE_ROOT / "media"
 MEDIA_URL = "/media/"
 
+# Who sends media files once access is checked: "python", "x-accel-redirect"
+# for nginx or "x-sendfile". See apps.api.media
+MEDIA_SERVING = os.getenv("MEDIA_SERVING", "python")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Where queued deletions of users, sources and trash run: "thread" or
+# "worker" i.e. 'manage.py run_deletions'. See apps.nodes.deletion
+DELETION_JOBS = os.getenv("DELETION_JOBS", "thread")
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "500"))
+DELETION_JOB_TIMEOUT = int(os.getenv("DELETION_JOB_TIMEOUT", "300"))
+
+# Bytes of media each user may store unless User.storage_quota is set. 0 is
+# unlimited. See apps.nodes.quota
+STORAGE_QUOTA = int(os.getenv("STORAGE_QUOTA", str(1024 ** 3)))
+
 FIXTURE_DIRS = [SITE_ROOT / "fixtures"]
 
 WSGI_APPLICATION = "config.wsgi.application"
@@ -36,6 +51,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First so it times every other middleware. See SERVER_TIMING
+    "apps.api.middleware.ServerTimingMiddleware",
+    "apps.api.middleware.ProfilingMiddleware",
+    "apps.api.middleware.MetricsMiddleware",
+    "apps.api.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -75,10 +95,25 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         # via http://getblimp.github.io/django-rest-framework-jwt/
-        "rest_framework_jwt.authentication.JSONWebTokenAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        # Both cache the authenticated user. See AUTH_CACHE_TTL
+        "apps.users.authentication.CachedJSONWebTokenAuthentication",
+        "apps.users.authentication.CachedSessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # Only views naming a throttle_scope are throttled. See apps.api.throttling
+    "DEFAULT_THROTTLE_CLASSES": (
+        "apps.api.throttling.IPThrottle",
+        "apps.api.throttling.EmailThrottle",
+        "apps.api.throttling.UserThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.getenv("THROTTLE_LOGIN_IP", "30/m"),
+        "login_email": os.getenv("THROTTLE_LOGIN_EMAIL", "10/m"),
+        "password_ip": os.getenv("THROTTLE_PASSWORD_IP", "10/m"),
+        "password_email": os.getenv("THROTTLE_PASSWORD_EMAIL", "5/m"),
+        "merge_user": os.getenv("THROTTLE_MERGE_USER", "30/m"),
+        "bulk_user": os.getenv("THROTTLE_BULK_USER", "60/m"),
+    },
     # "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
 }
 
@@ -87,8 +122,75 @@ JWT_AUTH = {
     "JWT_AUTH_HEADER_PREFIX": "JWT",
 }
 
+# Check persistent connections are alive at the start of each request, unless
+# they served one in the last DATABASE_HEALTH_CHECK_IDLE seconds. See
+# apps.api.signals
+DATABASE_HEALTH_CHECKS = os.getenv("DATABASE_HEALTH_CHECKS", "1") == "1"
+DATABASE_HEALTH_CHECK_IDLE = float(os.getenv("DATABASE_HEALTH_CHECK_IDLE", "5"))
+
+# Aliases in DATABASES that are read replicas of "default". See
+# apps.api.replicas
+DATABASE_ROUTERS = ["apps.api.replicas.ReplicaRouter"]
+REPLICA_DATABASES = []
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
+# Throttle buckets are shared by every worker process through the file system.
+# Point THROTTLE_CACHE_BACKEND at e.g. memcached to share them between hosts.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "throttle": {
+        "BACKEND": os.getenv(
+            "THROTTLE_CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv(
+            "THROTTLE_CACHE_LOCATION", str(SITE_ROOT / "tmp" / "throttle")
+        ),
+    },
+}
+
+# Seconds an authenticated user is cached per process, keyed by token or session
+# key. 0 disables the cache. See apps.users.authentication
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+
+# Also cache session-authenticated users. A logout only drops the entries of
+# the process serving it, so other workers accept the session until their entry
+# expires. Only enable it with a single worker process.
+AUTH_CACHE_SESSIONS = os.getenv("AUTH_CACHE_SESSIONS", "") == "1"
+
+# The "default" cache is per process, so a cached session engine would keep a
+# flushed session valid in the other workers. Only select
+# "django.contrib.sessions.backends.cached_db" with a shared default cache.
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.db")
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
 USE_L10N = True
 USE_TZ = True
+
+# Per-request query count and timings as 'Server-Timing' and 'X-Query-Count'
+# headers. See apps.api.middleware.ServerTimingMiddleware
+SERVER_TIMING = os.getenv("SERVER_TIMING", "") == "1"
+
+# Sampled cProfile dumps. See apps.api.middleware.ProfilingMiddleware
+PROFILING = os.getenv("PROFILING", "") == "1"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(SITE_ROOT / "tmp" / "profiles"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+# Prometheus metrics served at /metrics. METRICS_DIR is shared by all worker
+# processes. See apps.api.metrics
+METRICS = os.getenv("METRICS", "") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "apps.api.middleware": {"handlers": ["console"], "level": "INFO"}
+    },
+}
@@ -1,10 +1,22 @@
+import os
+
 from .base import *
 
 DEBUG = True
 
+SERVER_TIMING = True
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(SITE_ROOT / "tmp" / "db.sqlite3"),
     }
 }
+
+# A replica copied from the primary by 'manage.py sync_replicas --every 5'.
+if os.getenv("DATABASE_REPLICA", "") == "1":
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(SITE_ROOT / "tmp" / "db-replica.sqlite3"),
+    }
+    REPLICA_DATABASES = ["replica"]
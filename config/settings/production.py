@@ -1,3 +1,5 @@
+import os
+
 import dj_database_url
 
 from .base import *
@@ -5,4 +7,22 @@ from .base import *
 
 DEBUG = False
 
-DATABASES = {"default": dj_database_url.config()}
+# Proxies in front of the app, whose 'X-Forwarded-For' entries are trusted for
+# the client's address. Heroku's router is one. See apps.api.throttling
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
+}
+
+# Seconds a connection is kept open between requests.
+CONN_MAX_AGE = int(os.getenv("CONN_MAX_AGE", "600"))
+
+DATABASES = {"default": dj_database_url.config(conn_max_age=CONN_MAX_AGE)}
+
+# Comma separated URLs of read replicas of DATABASE_URL.
+for index, url in enumerate(os.getenv("DATABASE_REPLICA_URLS", "").split(",")):
+    if url.strip():
+        DATABASES[f"replica_{index}"] = dj_database_url.parse(
+            url.strip(), conn_max_age=CONN_MAX_AGE
+        )
+        REPLICA_DATABASES.append(f"replica_{index}")
@@ -0,0 +1,35 @@
+""" Production on a single host with SQLite. See apps.api.sqlite3 """
+
+import os
+
+from .base import *
+
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "apps.api.sqlite3",
+        "NAME": os.getenv("SQLITE_PATH", str(SITE_ROOT / "db.sqlite3")),
+        # Spares every request opening the file and applying the pragmas.
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", "600")),
+    }
+}
+
+# Applied to every new connection.
+SQLITE_PRAGMAS = {
+    # Readers and the writer no longer block each other.
+    "journal_mode": "WAL",
+    # Safe with WAL. A power loss may drop the last commits but never corrupts.
+    "synchronous": "NORMAL",
+    # Milliseconds a writer waits for the lock.
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+    # Bytes of the file read through memory mapping.
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB of page cache per connection.
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+SQLITE_BEGIN_RETRIES = 5
+SQLITE_BEGIN_BACKOFF = 0.05
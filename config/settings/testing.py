@@ -1,3 +1,18 @@
 from .base import *
 
 DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+    },
+}
+
+# Buckets would carry over between tests. Tests of throttling set their rates.
+REST_FRAMEWORK = {**REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+
+# Threads would not see the data of a test's transaction. Tests run jobs with
+# apps.nodes.deletion.run_pending()
+DELETION_JOBS = "worker"
@@ -0,0 +1,45 @@
+""" Does the work each worker process would otherwise do on its first
+requests. Run in the gunicorn master before forking with preload_app, so
+every worker starts warm and shares the memory. See gunicorn.conf.py """
+
+from django.apps import apps
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+
+def warmup():
+
+    # Every URLconf and with it every view and serializer module.
+    get_resolver().reverse_dict
+
+    # Built on first access of each model's relations.
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.related_objects
+
+    # Imported on first access.
+    for name in (
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+        "DEFAULT_THROTTLE_CLASSES",
+        "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+        "DEFAULT_PAGINATION_CLASS",
+        "DEFAULT_FILTER_BACKENDS",
+    ):
+        getattr(api_settings, name)
+
+    # Field classes, their validators and regexes.
+    from apps.api.urls import router
+
+    for prefix, viewset, basename in router.registry:
+        viewset.serializer_class().fields
+
+    # The browsable API.
+    get_template("rest_framework/api.html")
+
+    # Forked processes must never share a connection.
+    connections.close_all()
@@ -0,0 +1,86 @@
+""" gunicorn settings. See https://docs.gunicorn.org/en/stable/settings.html
+
+    gunicorn config.wsgi --config gunicorn.conf.py
+
+Each worker process runs GUNICORN_THREADS threads, so a worker waiting on the
+database or a client still serves other requests. Every thread keeps its own
+persistent database connection, so workers * threads connections per host
+must fit within the database's limit. See settings.CONN_MAX_AGE """
+
+import multiprocessing
+import os
+import pathlib
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Heroku sets WEB_CONCURRENCY from the dyno's memory.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+# Loads and warms the application once in the master before forking so workers
+# start warm and share its memory. See config.warmup
+preload_app = True
+
+# Recycles workers to bound memory growth. The jitter keeps them from all
+# restarting at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    """ Clears the metrics snapshots of the previous run's workers. See
+    apps.api.metrics """
+
+    directory = os.getenv("METRICS_DIR")
+    if not directory:
+        return
+
+    for path in pathlib.Path(directory).glob("*.json*"):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def worker_exit(server, worker):
+    """ Writes the final metrics of an exiting worker. """
+
+    if os.getenv("METRICS_DIR"):
+        from apps.api.metrics import registry
+
+        registry.flush(force=True)
+
+
+def child_exit(server, worker):
+    """ Folds an exited worker's metrics into one file, in the master. See
+    apps.api.metrics """
+
+    if os.getenv("METRICS_DIR"):
+        from apps.api.metrics import registry
+
+        registry.fold(worker.pid)
+
+
+def when_ready(server):
+
+    from config.warmup import warmup
+
+    warmup()
+
+
+def post_worker_init(worker):
+    """ Resumes deletion jobs interrupted by a restart, e.g. by max_requests.
+    See apps.nodes.deletion """
+
+    from django.conf import settings
+
+    if settings.DELETION_JOBS == "thread":
+        from apps.nodes import deletion
+
+        deletion.watch()
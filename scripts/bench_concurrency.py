@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+""" Compares the throughput of servers under many concurrent connections, some
+of them slow clients, e.g. the WSGI and the ASGI deployment. See config.asgi
+
+    gunicorn config.wsgi --workers 4 --bind :8000 &
+    uvicorn config.asgi:application --workers 4 --port 8001 &
+
+    python scripts/bench_concurrency.py \\
+        http://localhost:8000/api/nodes http://localhost:8001/api/nodes \\
+        --token <jwt> --connections 64 --slow 16 --duration 10
+
+Each of --connections threads sends requests back to back over its own
+keep-alive connection for --duration seconds. Each of --slow connections
+trickles its request headers one line per second, as a client on a poor
+network would, holding whatever the server assigns to it. """
+
+import argparse
+import http.client
+import socket
+import threading
+import time
+import urllib.parse
+
+
+def worker(url, headers, deadline, latencies, errors):
+
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    path = url.path + (f"?{url.query}" if url.query else "")
+
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            connection.close()
+            continue
+        if response.status >= 400:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    connection.close()
+
+
+def slow_client(url, deadline):
+    """ Sends a request one header line per second until the deadline. """
+
+    try:
+        sock = socket.create_connection((url.hostname, url.port), timeout=30)
+    except OSError:
+        return
+
+    with sock:
+        try:
+            sock.sendall(f"GET {url.path or '/'} HTTP/1.1\r\n".encode())
+            sock.sendall(f"Host: {url.hostname}\r\n".encode())
+            index = 0
+            while time.monotonic() < deadline:
+                sock.sendall(f"X-Slow-{index}: 1\r\n".encode())
+                index += 1
+                time.sleep(1)
+        except OSError:
+            return
+
+
+def run(target, options):
+
+    url = urllib.parse.urlsplit(target)
+    headers = {"Authorization": f"JWT {options.token}"} if options.token else {}
+
+    deadline = time.monotonic() + options.duration
+    latencies = []
+    errors = []
+
+    threads = [
+        threading.Thread(target=slow_client, args=(url, deadline), daemon=True)
+        for _ in range(options.slow)
+    ]
+    threads += [
+        threading.Thread(
+            target=worker, args=(url, headers, deadline, latencies, errors)
+        )
+        for _ in range(options.connections)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads[options.slow :]:
+        thread.join()
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / options.duration,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--token", default=None, help="A JSON Web Token.")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--slow", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=10)
+    options = parser.parse_args()
+
+    print(
+        f"{options.connections} connections, {options.slow} slow clients, "
+        f"{options.duration:g}s per server.\n"
+    )
+    print(
+        f"{'url':<40} {'req/s':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+
+    for target in options.urls:
+        result = run(target, options)
+        print(
+            f"{target:<40} {result['rps']:>8.1f} {result['errors']:>7} "
+            f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+""" Compares the write throughput of concurrent worker processes on the plain
+SQLite backend against the tuned one. See apps.api.sqlite3
+
+    python scripts/bench_sqlite.py --workers 8 --duration 10
+
+Each worker repeatedly reads then creates a Node in one transaction, as the
+API does, for --duration seconds. Runs against a fresh database file per
+profile in a temporary directory. """
+
+import argparse
+import multiprocessing
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent
+
+PROFILES = ("default", "tuned")
+
+
+def setup(profile, path):
+
+    sys.path.insert(0, str(ROOT_DIR))
+    os.environ["DJANGO_SETTINGS_MODULE"] = "config.settings.sqlite"
+    os.environ["SQLITE_PATH"] = str(path)
+    os.environ.setdefault("SECRET_KEY", "bench_sqlite")
+
+    from django.conf import settings
+
+    if profile == "default":
+        settings.DATABASES["default"]["ENGINE"] = "django.db.backends.sqlite3"
+        settings.SQLITE_PRAGMAS = {}
+
+    import django
+
+    django.setup()
+
+
+def worker(profile, path, email, start, duration, results):
+
+    setup(profile, path)
+
+    from django.contrib.auth import get_user_model
+    from django.db import OperationalError, transaction
+
+    from apps.nodes.models import Node, Tag
+
+    user = get_user_model().objects.get(email=email)
+
+    # Every worker starts writing at the same time.
+    time.sleep(max(start - time.time(), 0))
+    deadline = start + duration
+
+    writes = 0
+    errors = 0
+    index = 0
+
+    while time.time() < deadline:
+        index += 1
+        try:
+            with transaction.atomic():
+                Tag.objects.filter(user=user).count()
+                Node.objects.create(
+                    user, text=f"Node {os.getpid()} {index}.", tags=["bench"]
+                )
+            writes += 1
+        except OperationalError:
+            errors += 1
+
+    results.put((writes, errors))
+
+
+def run(profile, workers, duration):
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        path = pathlib.Path(directory) / "db.sqlite3"
+        email = "bench@example.com"
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+
+        prepare = context.Process(target=migrate, args=(profile, path, email))
+        prepare.start()
+        prepare.join()
+
+        # Leaves time for every worker to start up.
+        start = time.time() + 3
+        processes = [
+            context.Process(
+                target=worker, args=(profile, path, email, start, duration, results)
+            )
+            for _ in range(workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        totals = [results.get() for _ in processes]
+
+        for process in processes:
+            process.join()
+
+    writes = sum(writes for writes, _ in totals)
+    errors = sum(errors for _, errors in totals)
+
+    return writes, errors
+
+
+def migrate(profile, path, email):
+
+    setup(profile, path)
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    get_user_model().objects.create_user(email=email, password="password")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=PROFILES)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers for {args.duration:g}s.\n")
+    print(f"{'profile':<10} {'writes/s':>10} {'errors':>8}")
+
+    for profile in args.profiles:
+        writes, errors = run(profile, args.workers, args.duration)
+        print(f"{profile:<10} {writes / args.duration:>10.1f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
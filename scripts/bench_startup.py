@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+""" Measures how long a server takes to start answering, the latency of the
+first requests its workers serve and the latency once warm.
+
+    python scripts/bench_startup.py http://localhost:8000/api/nodes --token <jwt> \\
+        -- gunicorn config.wsgi --config gunicorn.conf.py
+
+    python scripts/bench_startup.py http://localhost:8000/api/nodes --token <jwt> \\
+        -- gunicorn config.wsgi --config /dev/null --env CONN_MAX_AGE=0
+
+The command after '--' is started, polled until it answers, then stopped.
+Cold requests each open a new connection so they spread over the workers.
+Warm requests reuse one connection. """
+
+import argparse
+import http.client
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+
+
+def request(connection, url, headers):
+
+    path = url.path + (f"?{url.query}" if url.query else "")
+
+    start = time.perf_counter()
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    response.read()
+
+    return response.status, time.perf_counter() - start
+
+
+def connect(url):
+    return http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+
+
+def wait_ready(url, headers, process, timeout):
+
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < timeout:
+
+        if process.poll() is not None:
+            raise SystemExit(f"The server exited with {process.returncode}.")
+
+        try:
+            status, _ = request(connect(url), url, headers)
+        except OSError:
+            time.sleep(0.05)
+            continue
+
+        if status < 500:
+            return time.perf_counter() - start
+
+    raise SystemExit(f"The server did not answer within {timeout}s.")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("url")
+    parser.add_argument("--token", default=None, help="A JSON Web Token.")
+    parser.add_argument("--cold", type=int, default=32)
+    parser.add_argument("--warm", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60)
+
+    if "--" not in sys.argv:
+        parser.error("Pass the server command after '--'.")
+
+    split = sys.argv.index("--")
+    args = parser.parse_args(sys.argv[1:split])
+    command = sys.argv[split + 1 :]
+
+    url = urllib.parse.urlsplit(args.url)
+    headers = {"Authorization": f"JWT {args.token}"} if args.token else {}
+
+    process = subprocess.Popen(command)
+
+    try:
+        ready = wait_ready(url, headers, process, args.timeout)
+
+        cold = [request(connect(url), url, headers)[1] for _ in range(args.cold)]
+
+        connection = connect(url)
+        warm = [request(connection, url, headers)[1] for _ in range(args.warm)]
+
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+    def ms(seconds):
+        return f"{seconds * 1000:.1f}ms"
+
+    print(f"ready after      {ms(ready)}")
+    print(
+        f"cold requests    p50 {ms(statistics.median(cold))} max {ms(max(cold))}"
+    )
+    print(
+        f"warm requests    p50 {ms(statistics.median(warm))} max {ms(max(warm))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
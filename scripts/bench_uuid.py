@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+""" Compares insert throughput and primary key index size of random uuid4 keys
+against time-ordered uuid7 keys. See apps.helpers.uuid7
+
+    python scripts/bench_uuid.py --settings=config.settings.development
+    python scripts/bench_uuid.py --settings=config.settings.production --rows 500000
+
+Runs against whichever database the settings point at i.e. SQLite or
+Postgres. The benchmark tables are created and dropped by the script. """
+
+import argparse
+import os
+import pathlib
+import sys
+import time
+import uuid
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent
+
+TABLE = "bench_uuid"
+
+
+def create_table(cursor, vendor):
+
+    id_type = "uuid" if vendor == "postgresql" else "char(32)"
+
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(
+        f"CREATE TABLE {TABLE} (id {id_type} PRIMARY KEY, payload varchar(64))"
+    )
+
+
+def index_size(cursor, vendor):
+    """ Returns the size in bytes of the benchmark table's primary key index. """
+
+    if vendor == "postgresql":
+        cursor.execute(f"SELECT pg_relation_size('{TABLE}_pkey')")
+        return cursor.fetchone()[0]
+
+    cursor.execute("PRAGMA page_size")
+    page_size = cursor.fetchone()[0]
+
+    try:
+        cursor.execute(
+            "SELECT COUNT(*) FROM dbstat WHERE name = %s",
+            [f"sqlite_autoindex_{TABLE}_1"],
+        )
+    except Exception:
+        # SQLite builds without SQLITE_ENABLE_DBSTAT_VTAB. Falls back to the
+        # size of the whole database.
+        cursor.execute("PRAGMA page_count")
+
+    return cursor.fetchone()[0] * page_size
+
+
+def run(connection, generate, rows, batch):
+
+    vendor = connection.vendor
+
+    with connection.cursor() as cursor:
+
+        create_table(cursor, vendor)
+
+        def value(key):
+            return str(key) if vendor == "postgresql" else key.hex
+
+        start = time.perf_counter()
+
+        for offset in range(0, rows, batch):
+            params = [
+                (value(generate()), "payload")
+                for _ in range(min(batch, rows - offset))
+            ]
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (id, payload) VALUES (%s, %s)", params
+            )
+
+        elapsed = time.perf_counter() - start
+
+        if vendor == "postgresql":
+            cursor.execute(f"ANALYZE {TABLE}")
+
+        size = index_size(cursor, vendor)
+
+        cursor.execute(f"DROP TABLE {TABLE}")
+
+    return elapsed, size
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--settings", default="config.settings.development")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_DIR))
+    os.environ["DJANGO_SETTINGS_MODULE"] = args.settings
+
+    import django
+
+    django.setup()
+
+    from django.db import connection, transaction
+
+    from apps.helpers import uuid7
+
+    print(f"{connection.vendor}: {args.rows} rows in batches of {args.batch}")
+
+    for name, generate in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+
+        with transaction.atomic():
+            elapsed, size = run(connection, generate, args.rows, args.batch)
+
+        print(
+            f"{name}: {args.rows / elapsed:>10.0f} rows/s "
+            f"{size / 1024:>10.0f} KiB index"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -88,6 +88,11 @@ def main():
                     --settings=config.settings.development"
             )
 
+    os.system(
+        f"python manage.py recount \
+        --settings=config.settings.development"
+    )
+
     print(f"{APP_NAME} successfully reset!")
 
     # os.system(